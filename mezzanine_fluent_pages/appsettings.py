@@ -0,0 +1,38 @@
+from django.conf import settings
+
+
+# Configure if the rendered output of page placeholders is cached.
+MEZZANINE_PAGES_CACHE_PLACEHOLDER_OUTPUT = getattr(
+    settings,
+    'MEZZANINE_PAGES_CACHE_PLACEHOLDER_OUTPUT',
+    True
+)
+
+# Configure the soft and hard timeouts of placeholder output that is served while it is rendered
+# again, by `'<layout key>:<slot>'` with `*` matching any layout or slot.
+MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE = getattr(
+    settings,
+    'MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE',
+    {}
+)
+
+# Configure the number of seconds pages are kept in the page cache.
+MEZZANINE_PAGES_PAGE_CACHE_TIMEOUT = getattr(
+    settings,
+    'MEZZANINE_PAGES_PAGE_CACHE_TIMEOUT',
+    60 * 60 * 24
+)
+
+# Configure if cached pages expire when any page is changed, as menus show the page tree.
+MEZZANINE_PAGES_PAGE_CACHE_TREE_DEPENDENCY = getattr(
+    settings,
+    'MEZZANINE_PAGES_PAGE_CACHE_TREE_DEPENDENCY',
+    True
+)
+
+# Configure if `ServerTimingMiddleware` adds a `Server-Timing` header to page responses.
+MEZZANINE_PAGES_SERVER_TIMING = getattr(
+    settings,
+    'MEZZANINE_PAGES_SERVER_TIMING',
+    False
+)
@@ -0,0 +1,289 @@
+"""
+Caching of the rendered output of page placeholders and pages.
+
+The placeholder output is stored per page, placeholder slot and language.
+The signal receivers in `receivers.py` remove the stored output when the
+content items, placeholders, page or layout it was rendered from change.
+Placeholders configured in `MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE`
+keep serving their stored output for a while after it became stale, while
+a single process renders it again.
+
+Cached pages record the versions of the tags (the page, its layout, ...)
+they depend on. The receivers expire tags by giving them a new version,
+which makes every page recorded with the old version stale.
+"""
+import collections
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from fluent_contents import appsettings as fluent_contents_appsettings
+from fluent_contents.rendering import markers
+
+from . import appsettings
+
+
+def may_cache_placeholder_output(request):
+    """
+    Whether the placeholder output cache can be used for a request.
+
+    The cache is bypassed in the front end edit mode of `fluent_contents`
+    as the output is decorated for that mode.
+
+    :param request: Django request object or `None`.
+    :return: Boolean.
+    """
+    return (
+        appsettings.MEZZANINE_PAGES_CACHE_PLACEHOLDER_OUTPUT and
+        fluent_contents_appsettings.FLUENT_CONTENTS_CACHE_OUTPUT and
+        not (request is not None and markers.is_edit_mode(request))
+    )
+
+
+def get_cache_languages():
+    """
+    Return the language codes placeholder output can be stored for.
+
+    :return: Set of language codes.
+    """
+    languages = {settings.LANGUAGE_CODE}
+    if settings.USE_I18N:
+        languages.update(code for code, name in settings.LANGUAGES)
+    return languages
+
+
+def get_placeholder_cache_key(page_id, slot, language_code=None):
+    """
+    Return the cache key for the output of a page placeholder.
+
+    :param page_id: Primary key of the page.
+    :param slot: Slot name of the placeholder.
+    :param language_code: Language code, defaults to the active language.
+    :return: Cache key string.
+    """
+    if language_code is None:
+        language_code = translation.get_language() or settings.LANGUAGE_CODE
+    return 'mezzanine_fluent_pages.placeholder.{0}.{1}.{2}'.format(page_id, slot, language_code)
+
+
+# Placeholder output stored with the time it becomes stale, see `get_revalidated_output`.
+RevalidatedOutput = collections.namedtuple('RevalidatedOutput', ('output', 'stale_at'))
+
+# Number of seconds the render of stale placeholder output is reserved for one process.
+REVALIDATION_LOCK_TIMEOUT = 30
+
+
+def get_revalidation_timeouts(page, slot):
+    """
+    Return the timeouts of the output of a page placeholder that is served
+    while stale.
+
+    The most specific entry of `MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE`
+    applies, matched on `'<layout key>:<slot>'`, `'<layout key>:*'`,
+    `'*:<slot>'` and `'*:*'` in that order.
+
+    :param page: Page object, the layout of a layout page is used, or `None`.
+    :param slot: Slot name of the placeholder.
+    :return: Tuple of the soft and hard timeout in seconds, or `None` when
+    stale output is not served.
+    """
+    timeouts = appsettings.MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE
+    if not timeouts:
+        return None
+
+    layout = getattr(page, 'layout', None)
+    patterns = ['*:{1}', '*:*']
+    if layout is not None:
+        patterns = ['{0}:{1}', '{0}:*'] + patterns
+    for pattern in patterns:
+        entry = timeouts.get(pattern.format(getattr(layout, 'key', None), slot))
+        if entry is not None:
+            return tuple(entry)
+    return None
+
+
+def get_placeholder_output(request, page_id, slot, render, cachable=True, timeouts=None):
+    """
+    Return the output of a page placeholder, from the cache when possible.
+
+    :param request: Django request object.
+    :param page_id: Primary key of the page.
+    :param slot: Slot name of the placeholder.
+    :param render: Function rendering the placeholder, returning a
+    `ContentItemOutput` or `None` when there is nothing to render.
+    :param cachable: Whether the output may be cached at all.
+    :param timeouts: Tuple of the soft and hard timeout in seconds to serve
+    stale output with, see `get_revalidated_output`.
+    :return: `ContentItemOutput` or `None`.
+    """
+    if not cachable or not may_cache_placeholder_output(request):
+        return render()
+
+    cache_key = get_placeholder_cache_key(page_id, slot)
+    if timeouts is not None:
+        return get_revalidated_output(cache_key, render, timeouts)
+
+    output = cache.get(cache_key)
+    if isinstance(output, RevalidatedOutput):
+        # Stored while stale output was served for the placeholder.
+        output = output.output
+    if output is None:
+        output = render()
+        if output is not None and output.cacheable:
+            cache.set(cache_key, output, output.cache_timeout)
+    return output
+
+
+def get_revalidated_output(cache_key, render, timeouts):
+    """
+    Return placeholder output that is served while stale.
+
+    The output is fresh for the soft timeout (or the cache timeout of its
+    plugins when that is shorter) and kept for the hard timeout. The first
+    request for stale output renders it again, holding a lock in the cache
+    meanwhile, while other requests get the stale output. Output removed
+    by the signal receivers is always rendered again.
+
+    :param cache_key: Cache key of the placeholder output.
+    :param render: Function rendering the placeholder, returning a
+    `ContentItemOutput` or `None` when there is nothing to render.
+    :param timeouts: Tuple of the soft and hard timeout in seconds.
+    :return: `ContentItemOutput` or `None`.
+    """
+    entry = cache.get(cache_key)
+    if entry is not None and not isinstance(entry, RevalidatedOutput):
+        # Stored before stale output was served for the placeholder, fresh until it expires.
+        return entry
+    if entry is not None and entry.stale_at > time.time():
+        return entry.output
+    if entry is None:
+        return set_revalidated_output(cache_key, render(), timeouts)
+
+    lock_key = '{0}.lock'.format(cache_key)
+    if not cache.add(lock_key, True, REVALIDATION_LOCK_TIMEOUT):
+        # Another process renders the placeholder again.
+        return entry.output
+    try:
+        return set_revalidated_output(cache_key, render(), timeouts)
+    finally:
+        cache.delete(lock_key)
+
+
+def set_revalidated_output(cache_key, output, timeouts):
+    """
+    Store placeholder output that is served while stale.
+
+    :param cache_key: Cache key of the placeholder output.
+    :param output: `ContentItemOutput` or `None`.
+    :param timeouts: Tuple of the soft and hard timeout in seconds.
+    :return: The output.
+    """
+    if output is None or not output.cacheable:
+        return output
+
+    soft_timeout, hard_timeout = timeouts
+    if isinstance(output.cache_timeout, int):
+        soft_timeout = min(soft_timeout, output.cache_timeout)
+    cache.set(cache_key, RevalidatedOutput(output, time.time() + soft_timeout), hard_timeout)
+    return output
+
+
+def clear_placeholder_output(placeholders):
+    """
+    Remove the cached output of placeholders in every language.
+
+    :param placeholders: Iterable of `(page_id, slot)` tuples.
+    :return: None.
+    """
+    languages = get_cache_languages()
+    cache_keys = [
+        get_placeholder_cache_key(page_id, slot, language_code)
+        for page_id, slot in placeholders
+        for language_code in languages
+    ]
+    if cache_keys:
+        cache.delete_many(cache_keys)
+
+
+# Tag expired along with every other tag, to detect changes while a page renders.
+ANY_TAG = '*'
+
+# Tag expired whenever any page is changed.
+TREE_TAG = 'tree'
+
+
+def get_page_tag(page_id):
+    """
+    Return the tag of a page.
+
+    :param page_id: Primary key of the page.
+    :return: Tag string.
+    """
+    return 'page.{0}'.format(page_id)
+
+
+def get_layout_tag(layout_id):
+    """
+    Return the tag of a page layout.
+
+    :param layout_id: Primary key of the layout.
+    :return: Tag string.
+    """
+    return 'layout.{0}'.format(layout_id)
+
+
+def get_page_dependencies(page):
+    """
+    Return the tags and template files the rendered page depends on.
+
+    :param page: Page object of one of the page models.
+    :return: Tuple of a list of tags and a list of template file paths.
+    """
+    tags, file_paths = page.get_cache_dependencies()
+    if appsettings.MEZZANINE_PAGES_PAGE_CACHE_TREE_DEPENDENCY:
+        tags.append(TREE_TAG)
+    return tags, file_paths
+
+
+def get_tag_cache_key(tag):
+    """
+    Return the cache key of the version of a tag.
+
+    :param tag: Tag string.
+    :return: Cache key string.
+    """
+    return 'mezzanine_fluent_pages.tag.{0}'.format(tag)
+
+
+def get_tag_versions(tags):
+    """
+    Return the current versions of tags.
+
+    Tags without a version, because they were never expired or were
+    evicted from the cache, are given a new version.
+
+    :param tags: Iterable of tag strings.
+    :return: Dictionary of versions by tag.
+    """
+    tag_cache_keys = {get_tag_cache_key(tag): tag for tag in tags}
+    versions = cache.get_many(list(tag_cache_keys))
+    missing = {
+        cache_key: uuid.uuid4().hex for cache_key in tag_cache_keys if cache_key not in versions
+    }
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {tag_cache_keys[cache_key]: version for cache_key, version in versions.items()}
+
+
+def expire_tags(tags):
+    """
+    Give tags a new version, making the pages that depend on them stale.
+
+    :param tags: Iterable of tag strings.
+    :return: None.
+    """
+    versions = {get_tag_cache_key(tag): uuid.uuid4().hex for tag in set(tags) | {ANY_TAG}}
+    cache.set_many(versions, None)
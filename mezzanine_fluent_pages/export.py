@@ -0,0 +1,214 @@
+"""
+Streaming export of the fluent pages of a site.
+
+The layouts and the pages of both page types are written as JSON lines,
+one object per line, in the format of `dumpdata` with the placeholders and
+content items of a page nested in its record:
+
+    {"model": "mezzanine_layout_page.pagelayout", "pk": 1, "fields": {...}}
+    {"model": "mezzanine_layout_page.fluentcontentslayoutpage", "pk": 2, "fields": {...},
+     "placeholders": [{"slot": "main", "role": "m", "title": "Main",
+                       "content_items": [{"model": "rawhtml.rawhtmlitem", "pk": 3,
+                                          "fields": {...}}]}]}
+
+The fields of a content item combine those of `ContentItem` and of its
+own model. Pages are read in chunks ordered by primary key, with a query
+per chunk for the placeholders and a query per chunk and content item
+type, so memory use does not grow with the size of the site.
+"""
+import collections
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.serializers.python import Serializer
+from fluent_contents.models import ContentItem, Placeholder
+from mezzanine.pages.models import Page
+
+from . import utils
+
+# Fields of a layout that are exported, the others are derived from its template.
+LAYOUT_FIELDS = ('key', 'title', 'template_path', 'modified')
+
+# Fields of the pages that are derived from their content, see the `search` module.
+PAGE_DERIVED_FIELDS = ('search_text',)
+
+# Fields of `ContentItem` that are exported, the others follow from the placeholder.
+CONTENT_ITEM_FIELDS = ('sort_order', 'language_code')
+
+# The number of objects written by an export.
+ExportResult = collections.namedtuple(
+    'ExportResult', ('layouts', 'pages', 'placeholders', 'content_items')
+)
+
+
+def serialize(objs, fields=None):
+    """
+    Return objects as `dumpdata` records.
+
+    Only the fields of the own table of multi-table inherited objects are
+    included.
+
+    :param objs: Iterable of model objects.
+    :param fields: Names of the fields to include, all by default.
+    :return: List of dictionaries with the `model`, `pk` and `fields`.
+    """
+    return Serializer().serialize(objs, fields=fields)
+
+
+def get_own_fields(model):
+    """
+    Return the names of the fields of the own table of a model.
+
+    :param model: Model class.
+    :return: List of field names, without the link to the parent table.
+    """
+    return [field.name for field in model._meta.local_fields if field.serialize]
+
+
+def iter_layouts():
+    """
+    Yield the records of all layouts.
+
+    :return: Iterator of dictionaries.
+    """
+    try:
+        PageLayout = apps.get_model('mezzanine_layout_page', 'PageLayout')
+    except LookupError:
+        return
+
+    for layout in PageLayout.objects.order_by('pk').iterator():
+        yield serialize([layout], fields=LAYOUT_FIELDS)[0]
+
+
+def iter_pages(site_ids=None, chunk_size=500):
+    """
+    Yield the records of the pages of both page types with their content.
+
+    :param site_ids: Only include pages of these sites.
+    :param chunk_size: Number of pages read per query.
+    :return: Iterator of dictionaries.
+    """
+    page_models = {model._meta.model_name: model for model in utils.get_page_models()}
+    if not page_models:
+        return
+    content_types = ContentType.objects.get_for_models(*page_models.values())
+    page_type_ids = [content_type.pk for content_type in content_types.values()]
+
+    pages = Page._base_manager.filter(content_model__in=list(page_models)).order_by('pk')
+    if site_ids:
+        pages = pages.filter(site_id__in=site_ids)
+
+    last_pk = None
+    while True:
+        chunk = pages if last_pk is None else pages.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1].pk
+
+        records = collections.OrderedDict(
+            (record['pk'], record) for record in serialize(chunk)
+        )
+        for page, record in zip(chunk, records.values()):
+            model = page_models[page.content_model]
+            record['model'] = '{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+            record['placeholders'] = []
+
+        # The fields of the own tables of the page models, a query per page type.
+        by_content_model = collections.defaultdict(list)
+        for page in chunk:
+            by_content_model[page.content_model].append(page.pk)
+        for content_model, page_ids in by_content_model.items():
+            model = page_models[content_model]
+            fields = [
+                field for field in get_own_fields(model) if field not in PAGE_DERIVED_FIELDS
+            ]
+            if fields:
+                for record in serialize(model._base_manager.filter(pk__in=page_ids), fields):
+                    records[record['pk']]['fields'].update(record['fields'])
+
+        placeholders = {}
+        for placeholder in Placeholder.objects.filter(
+            parent_type_id__in=page_type_ids, parent_id__in=list(records)
+        ).order_by('pk'):
+            placeholders[placeholder.pk] = {
+                'slot': placeholder.slot,
+                'role': placeholder.role,
+                'title': placeholder.title,
+                'content_items': [],
+            }
+            records[placeholder.parent_id]['placeholders'].append(placeholders[placeholder.pk])
+
+        for placeholder_id, content_item in iter_content_items(list(placeholders)):
+            placeholders[placeholder_id]['content_items'].append(content_item)
+
+        for record in records.values():
+            yield record
+
+
+def iter_content_items(placeholder_ids):
+    """
+    Yield the records of the content items of placeholders.
+
+    The `ContentItem` rows are read first, then the rows of every content
+    item type with a query per type.
+
+    :param placeholder_ids: List of placeholder ids.
+    :return: Iterator of tuples of a placeholder id and a dictionary, in
+    order of placeholder and sort order.
+    """
+    content_items = []
+    for ids in utils.batches(placeholder_ids):
+        content_items.extend(ContentItem._base_manager.filter(placeholder_id__in=ids).values_list(
+            'pk', 'polymorphic_ctype_id', 'placeholder_id', *CONTENT_ITEM_FIELDS
+        ))
+
+    by_type = collections.defaultdict(list)
+    for content_item in content_items:
+        by_type[content_item[1]].append(content_item[0])
+    records = {}
+    for content_type_id, content_item_ids in by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            # The plugin of the content items is no longer installed.
+            continue
+        fields = get_own_fields(model)
+        for ids in utils.batches(content_item_ids):
+            for record in serialize(model._base_manager.filter(pk__in=ids), fields):
+                records[record['pk']] = record
+
+    content_items.sort(key=lambda content_item: (content_item[2], content_item[3], content_item[0]))
+    for content_item in content_items:
+        # Content items of uninstalled plugins are left out.
+        record = records.get(content_item[0])
+        if record is None:
+            continue
+        record['fields'].update(zip(CONTENT_ITEM_FIELDS, content_item[3:]))
+        yield content_item[2], record
+
+
+def export_pages(stream, site_ids=None, chunk_size=500):
+    """
+    Write the layouts and the pages of both page types as JSON lines.
+
+    :param stream: File-like object to write to.
+    :param site_ids: Only include pages of these sites.
+    :param chunk_size: Number of pages read per query.
+    :return: `ExportResult` tuple.
+    """
+    encoder = DjangoJSONEncoder(sort_keys=True)
+    counts = collections.Counter()
+    for record in iter_layouts():
+        stream.write(encoder.encode(record) + '\n')
+        counts['layouts'] += 1
+    for record in iter_pages(site_ids=site_ids, chunk_size=chunk_size):
+        stream.write(encoder.encode(record) + '\n')
+        counts['pages'] += 1
+        counts['placeholders'] += len(record['placeholders'])
+        counts['content_items'] += sum(
+            len(placeholder['content_items']) for placeholder in record['placeholders']
+        )
+    return ExportResult(
+        counts['layouts'], counts['pages'], counts['placeholders'], counts['content_items']
+    )
@@ -0,0 +1,267 @@
+"""
+Measuring the cost of rendering fluent pages.
+
+A `PageRender` context manager counts the SQL queries and the time spent
+while it is active, the placeholder template tags add the time spent per
+placeholder slot and the layout page code the time spent per phase. When
+the rendered page is a fluent page the results are logged and added to
+statistics per layout key, available through `get_layout_stats()`.
+
+`middleware.PageRenderInstrumentationMiddleware` measures every request,
+`middleware.ServerTimingMiddleware` reports the durations in the
+`Server-Timing` header of the response.
+
+The timers cost a thread local lookup while no render is measured.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import connections
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+# The phases of a render measured apart from the placeholders, with their descriptions.
+PHASES = OrderedDict((
+    ('layout_page', 'Layout page query'),
+    ('layout', 'Layout template load'),
+    ('placeholder_data', 'Placeholder data fetch'),
+))
+
+_local = threading.local()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_current_render():
+    """
+    Return the `PageRender` active in the current thread.
+
+    :return: `PageRender` object or `None`.
+    """
+    return getattr(_local, 'render', None)
+
+
+class Timer(object):
+    """
+    Add the time spent in a block to a dictionary of durations by name.
+    """
+    def __init__(self, durations, name):
+        """
+        :param durations: Dictionary of durations in seconds by name.
+        :param name: Name to add the duration to.
+        :return: None.
+        """
+        self.durations = durations
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.durations[self.name] = self.durations.get(self.name, 0) + time.time() - self.start
+
+
+class NullTimer(object):
+    """
+    A timer which does nothing, used while no render is measured.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+null_timer = NullTimer()
+
+
+def placeholder_timer(slot):
+    """
+    Add the time spent in the block to the active `PageRender`, if any.
+
+    :param slot: Slot name of the placeholder being rendered.
+    :return: Context manager.
+    """
+    render = get_current_render()
+    if render is None:
+        return null_timer
+    return Timer(render.placeholders, slot)
+
+
+def phase_timer(phase):
+    """
+    Add the time spent in the block to a phase of the active `PageRender`,
+    if any.
+
+    :param phase: Name of the phase, one of the `PHASES` keys.
+    :return: Context manager.
+    """
+    render = get_current_render()
+    if render is None:
+        return null_timer
+    return Timer(render.phases, phase)
+
+
+class PageRender(object):
+    """
+    Measure the queries and time spent rendering a page.
+
+    The page can be set when the render starts or at any time before it
+    ends, renders without a fluent page are not recorded.
+    """
+    def __init__(self, page=None, path=None, count_queries=True, record=True):
+        """
+        :param page: Page object being rendered.
+        :param path: Path of the request.
+        :param count_queries: Whether to count the SQL queries, which
+        forces the debug cursor of the database connections.
+        :param record: Whether to log the render and add it to the
+        statistics of the layout.
+        :return: None.
+        """
+        self.page = page
+        self.path = path
+        self.count_queries = count_queries
+        self.recorded = record
+        self.queries = 0
+        self.duration = None
+        self.phases = OrderedDict()
+        self.placeholders = OrderedDict()
+        self._start = None
+        self._previous = None
+        self._query_counts = None
+        self._force_debug_cursors = None
+
+    def __enter__(self):
+        if self.count_queries:
+            # Queries are only logged by the connections while they use a debug cursor.
+            databases = list(connections.all())
+            self._force_debug_cursors = [database.force_debug_cursor for database in databases]
+            for database in databases:
+                database.force_debug_cursor = True
+            self._query_counts = [len(database.queries_log) for database in databases]
+        self._start = time.time()
+        self._previous = get_current_render()
+        _local.render = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.time() - self._start
+        _local.render = self._previous
+        if self.count_queries:
+            databases = list(connections.all())
+            self.queries = sum(
+                len(database.queries_log) - query_count
+                for database, query_count in zip(databases, self._query_counts)
+            )
+            for database, force_debug_cursor in zip(databases, self._force_debug_cursors):
+                database.force_debug_cursor = force_debug_cursor
+
+        if self.recorded and exc_type is None:
+            self.record()
+
+    def get_content_model(self):
+        """
+        Return the fluent page that was rendered.
+
+        :return: Page object or `None`.
+        """
+        if self.page is None:
+            return None
+        content_model = self.page.get_content_model() or self.page
+        if not isinstance(content_model, tuple(utils.get_page_models())):
+            return None
+        return content_model
+
+    def as_dict(self):
+        """
+        Return the measurements of a fluent page render.
+
+        :return: Dictionary or `None` when no fluent page was rendered.
+        """
+        content_model = self.get_content_model()
+        if content_model is None:
+            return None
+
+        layout = getattr(content_model, 'layout', None)
+        return {
+            'page_id': content_model.pk,
+            'path': self.path,
+            'content_model': content_model._meta.model_name,
+            'layout': layout.key if layout is not None else None,
+            'queries': self.queries,
+            'duration': self.duration,
+            'phases': dict(self.phases),
+            'placeholders': dict(self.placeholders),
+        }
+
+    def record(self):
+        """
+        Log the measurements and add them to the statistics of the layout.
+
+        :return: None.
+        """
+        data = self.as_dict()
+        if data is None:
+            return
+
+        logger.info(
+            'Rendered page %(page_id)s (%(path)s) with layout %(layout)s: %(queries)d queries in '
+            '%(duration).3f s',
+            data,
+            extra={'page_render': data}
+        )
+        with _stats_lock:
+            stats = _stats.setdefault(data['layout'], {
+                'renders': 0,
+                'queries': 0,
+                'duration': 0,
+                'max_duration': 0,
+                'phases': {},
+                'placeholders': {},
+            })
+            stats['renders'] += 1
+            stats['queries'] += data['queries']
+            stats['duration'] += data['duration']
+            stats['max_duration'] = max(stats['max_duration'], data['duration'])
+            for phase, duration in data['phases'].items():
+                stats['phases'][phase] = stats['phases'].get(phase, 0) + duration
+            for slot, duration in data['placeholders'].items():
+                stats['placeholders'][slot] = stats['placeholders'].get(slot, 0) + duration
+
+
+def get_layout_stats():
+    """
+    Return the statistics of the recorded renders per layout key.
+
+    Pages without a layout are counted under the key `None`. Query
+    counts and durations (in seconds) are totals, divide them by
+    `renders` for the mean.
+
+    :return: Dictionary of statistics dictionaries by layout key.
+    """
+    with _stats_lock:
+        return {
+            layout: dict(
+                stats,
+                phases=dict(stats['phases']),
+                placeholders=dict(stats['placeholders'])
+            )
+            for layout, stats in _stats.items()
+        }
+
+
+def reset_layout_stats():
+    """
+    Forget the recorded statistics.
+
+    :return: None.
+    """
+    with _stats_lock:
+        _stats.clear()
@@ -1,26 +1,69 @@
+import calendar
+import hashlib
+
 from django.conf.urls import url
-from django.contrib import admin
-from fluent_contents.admin import PlaceholderEditorAdmin
-from fluent_contents.analyzer import get_template_placeholder_data
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.actions import delete_selected as delete_selected_action
+from django.contrib.admin.utils import unquote
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.urlresolvers import reverse
+from django.http import HttpResponseNotModified, HttpResponseRedirect
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.response import TemplateResponse
+from django.utils.cache import patch_cache_control
+from django.utils.encoding import force_text
+from django.utils.functional import cached_property
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.translation import ugettext_lazy as _
+from fluent_contents.admin import PlaceholderEditorAdmin, PlaceholderEditorInline
+from fluent_contents.admin.placeholdereditor import PlaceholderInlineFormSet
 from fluent_utils.ajax import JsonResponse
 from mezzanine.pages.admin import PageAdmin
+from mezzanine.utils.sites import current_site_id
+
+from . import appsettings, forms, layoutdata, models, relayout, widgets
+
+
+class LayoutPlaceholderInlineFormSet(PlaceholderInlineFormSet):
+    """
+    Placeholder formset that looks up the other languages of the page once.
+
+    The placeholder editor shows them in the tab of every placeholder,
+    which would otherwise cost a query per placeholder.
+    """
+    @cached_property
+    def other_instance_languages(self):
+        return super(LayoutPlaceholderInlineFormSet, self).other_instance_languages
 
-from . import models, widgets
+
+class LayoutPlaceholderEditorInline(PlaceholderEditorInline):
+    """
+    Placeholder editor inline using `LayoutPlaceholderInlineFormSet`.
+    """
+    formset = LayoutPlaceholderInlineFormSet
 
 
 class FluentContentsLayoutPageAdmin(PlaceholderEditorAdmin, PageAdmin):
     """
     Admin configuration for `FluentContentsLayoutPage`.
+
+    The layouts are loaded once per request, for the layout selector, the
+    layout of the page and the placeholders of the editor, so the change
+    and add views make the same number of queries whatever the number of
+    layouts and placeholders.
     """
     # The `change_form_template` is overwritten to include the content type id in the JS which is
     # used in the fluent ajax calls.
     change_form_template = 'admin/fluent_mezzanine/change_form.html'
+    placeholder_inline = LayoutPlaceholderEditorInline
 
     class Media:
         # This is a custom JS adaption of the `fluent_layouts.js` found in
-        # `fluent_pages.fluentpage`. The only modification is to change the `app_root` variable
-        # declaration to a new endpoint. The rest of the code has been used here so `fluent_pages`
-        # is not a requirement to use this package.
+        # `fluent_pages.fluentpage`. The modifications are to change the `app_root` variable
+        # declaration to a new endpoint and to prefetch all layouts from `get_layouts/`. The rest
+        # of the code has been used here so `fluent_pages` is not a requirement to use this
+        # package.
         js = ('fluent_mezzanine/fluent_layouts.js',)
 
     def get_placeholder_data(self, request, obj=None):
@@ -32,32 +75,76 @@ class FluentContentsLayoutPageAdmin(PlaceholderEditorAdmin, PageAdmin):
         :param obj: Object to get place holder data from.
         :return: list of `~fluent_contents.models.PlaceholderData`
         """
-        template = self.get_page_template(obj)
-        if not template:
-            return []  # No template means no data!
+        layout = self.get_page_layout(obj, request)
+        if not layout:
+            return []  # No layout means no data!
         else:
-            return get_template_placeholder_data(template)
+            return layout.get_placeholder_data()
 
-    def get_page_template(self, page):
+    def get_layouts(self, request):
         """
-        Return the template that is associated with the page.
+        Return all layouts, loaded once per request.
 
-        If no page is provided then the first available template will
+        :param request: Django request object.
+        :return: List of `PageLayout` objects in their default order.
+        """
+        try:
+            return request._page_layouts
+        except AttributeError:
+            request._page_layouts = list(models.PageLayout.objects.all())
+            return request._page_layouts
+
+    def get_page_layout(self, page, request=None):
+        """
+        Return the layout that is associated with the page.
+
+        If no page is provided then the first available layout will
         be used as defined in `PageLayout`. If not `PageLayout` exists
         then `None` will be returned.
 
-        :param page: Page object to obtain the template from.
-        :return: Template object or None.
+        :param page: Page object to obtain the layout from.
+        :param request: Django request object, to use the layouts loaded
+        for the request.
+        :return: `PageLayout` object or None.
         """
+        if request is None:
+            layouts = None
+        else:
+            layouts = self.get_layouts(request)
+
         if page is None:
-            # Add page. start with default template.
+            # Add page. start with default layout.
+            if layouts is not None:
+                return layouts[0] if layouts else None
             try:
-                return models.PageLayout.objects.all()[0].get_template()
+                return models.PageLayout.objects.all()[0]
             except IndexError:
                 return None
         else:
-            # Change page, honor template of object.
-            return page.layout.get_template()
+            # Change page, honor layout of object.
+            for layout in layouts or ():
+                if layout.pk == page.layout_id:
+                    page.layout = layout
+                    break
+            return page.layout
+
+    def get_page_template(self, page, request=None):
+        """
+        Return the template that is associated with the page.
+
+        If no page is provided then the first available template will
+        be used as defined in `PageLayout`. If not `PageLayout` exists
+        then `None` will be returned.
+
+        :param page: Page object to obtain the template from.
+        :param request: Django request object, to use the layouts loaded
+        for the request.
+        :return: Template object or None.
+        """
+        layout = self.get_page_layout(page, request)
+        if not layout:
+            return None
+        return layout.get_template()
 
     # ---- Layout selector code ----
 
@@ -65,6 +152,9 @@ class FluentContentsLayoutPageAdmin(PlaceholderEditorAdmin, PageAdmin):
         """
         Overwrite the widget for the `layout` foreign key.
 
+        The choices of the layout selector are the layouts loaded for the
+        request, instead of a query each time the field is rendered.
+
         :param db_field: Field on the object.
         :param request: Django request object.
         :param kwargs: Extra keyword arguments.
@@ -72,25 +162,39 @@ class FluentContentsLayoutPageAdmin(PlaceholderEditorAdmin, PageAdmin):
         """
         if db_field.name == 'layout':
             kwargs['widget'] = widgets.LayoutSelector
-        return super(FluentContentsLayoutPageAdmin, self).formfield_for_foreignkey(
+        formfield = super(FluentContentsLayoutPageAdmin, self).formfield_for_foreignkey(
             db_field,
             request,
             **kwargs
         )
+        if db_field.name == 'layout' and request is not None and formfield is not None:
+            choices = [('', formfield.empty_label)] if formfield.empty_label is not None else []
+            formfield.choices = choices + [
+                (layout.pk, formfield.label_from_instance(layout))
+                for layout in self.get_layouts(request)
+            ]
+        return formfield
 
     def get_urls(self):
         """
-        Add URL pattern for obtaining layout information.
+        Add URL patterns for obtaining layout information.
 
         :return: List of URL patterns.
         """
         urls = super(FluentContentsLayoutPageAdmin, self).get_urls()
+        # The layout metadata may be cached by the browser, it is revalidated on every
+        # request through the `ETag` and `Last-Modified` headers.
         my_urls = [
             url(
                 r'^get_layout/(?P<id>\d+)/$',
-                self.admin_site.admin_view(self.get_layout_view),
+                self.admin_site.admin_view(self.get_layout_view, cacheable=True),
                 name='get_layout',
-            )
+            ),
+            url(
+                r'^get_layouts/$',
+                self.admin_site.admin_view(self.get_layouts_view, cacheable=True),
+                name='get_layouts',
+            ),
         ]
         return my_urls + urls
 
@@ -100,28 +204,148 @@ class FluentContentsLayoutPageAdmin(PlaceholderEditorAdmin, PageAdmin):
 
         :param request: Django request object.
         :param id: Id integer value (pk) for the layout referenced.
-        :return: JsonResponse with layout information or error message.
+        :return: JsonResponse with layout information or error message,
+        or a not modified response if the client has the current version.
         """
         # Get the layout or if it does not exist return an error message.
         try:
-            layout = models.PageLayout.objects.get(pk=id)
+            entry = self.get_cached_layout_data(id)
         except models.PageLayout.DoesNotExist:
             json = {'success': False, 'error': 'Layout not found'}
-            status = 404
+            return JsonResponse(json, status=404)
+        except layoutdata.AnalysisBusy:
+            json = {'success': False, 'error': 'Too many layouts are being analysed'}
+            response = JsonResponse(json, status=503)
+            response['Retry-After'] = '1'
+            return response
+
+        return self.get_conditional_response(request, entry['json'], entry['last_modified'])
+
+    def get_cached_layout_data(self, id):
+        """
+        Return the metadata about a layout from the cache, analysing the
+        layout when the cached metadata is missing or stale.
+
+        Serving the cached metadata needs no query and no template
+        analysis. Analyses are limited by `layoutdata.analysis_limiter`,
+        so a burst of requests does not occupy every admin thread.
+
+        :param id: Id integer value (pk) for the layout referenced.
+        :return: Dictionary with the `json` data and the `last_modified`
+        datetime of the layout.
+        :raises PageLayout.DoesNotExist: When the layout does not exist.
+        :raises AnalysisBusy: When no analysis slot became available in time.
+        """
+        entry = layoutdata.get_cached_layout_data(id)
+        if entry is not None:
+            return entry
+
+        with layoutdata.analysis_limiter.slot(
+            id, appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT
+        ):
+            # Another request may have analysed the layout while this one waited.
+            entry = layoutdata.get_cached_layout_data(id)
+            if entry is None:
+                version = layoutdata.get_layout_version(id)
+                layout = models.PageLayout.objects.get(pk=id)
+                entry = layoutdata.set_cached_layout_data(
+                    layout, version, self.get_layout_data(layout), layout.get_last_modified()
+                )
+        return entry
+
+    def get_layouts_view(self, request):
+        """
+        Return the metadata about all layouts in a single response.
+
+        This allows the layout selector to switch layouts without a
+        request per layout. The metadata is read from the cache, see
+        `get_cached_layout_data`.
+
+        :param request: Django request object.
+        :return: JsonResponse with the information of every layout, or a
+        not modified response if the client has the current version.
+        """
+        entries = []
+        for layout_id in models.PageLayout.objects.values_list('pk', flat=True):
+            try:
+                entries.append(self.get_cached_layout_data(layout_id))
+            except (
+                models.PageLayout.DoesNotExist,
+                layoutdata.AnalysisBusy,
+                TemplateDoesNotExist,
+                TemplateSyntaxError,
+            ):
+                # Leave the layout out, the client falls back to `get_layout_view`.
+                pass
+
+        json = {
+            'layouts': [entry['json'] for entry in entries],
+        }
+        last_modified = max([entry['last_modified'] for entry in entries] or [None])
+        return self.get_conditional_response(request, json, last_modified)
+
+    def get_layout_data(self, layout):
+        """
+        Return the metadata about a layout for client-side use.
+
+        :param layout: `PageLayout` object.
+        :return: Dictionary with layout information.
+        """
+        placeholders = layout.get_placeholder_data()
+
+        # Set useful information regarding the layout.
+        return {
+            'id': layout.id,
+            'key': layout.key,
+            'title': layout.title,
+            'placeholders': [p.as_dict() for p in placeholders],
+        }
+
+    def get_conditional_response(self, request, json, last_modified=None):
+        """
+        Return a JSON response that supports conditional requests.
+
+        The `ETag` is a hash of the response data, which is derived from
+        the layout row and the analysis of the template file. A not
+        modified response is returned when it matches `If-None-Match`, or
+        when the data did not change since `If-Modified-Since`.
+
+        :param request: Django request object.
+        :param json: Data for the JSON response.
+        :param last_modified: Aware datetime the data was last changed.
+        :return: JsonResponse or HttpResponseNotModified.
+        """
+        content = DjangoJSONEncoder(sort_keys=True).encode(json)
+        etag = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        if last_modified is not None:
+            last_modified = calendar.timegm(last_modified.utctimetuple())
+
+        meta = getattr(request, 'META', {})
+        if_none_match = meta.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(meta.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if if_none_match:
+            etags = [
+                tag.strip().replace('W/', '', 1).strip('"') for tag in if_none_match.split(',')
+            ]
+            not_modified = etag in etags or '*' in etags
         else:
-            template = layout.get_template()
-            placeholders = get_template_placeholder_data(template)
-
-            status = 200
-            # Set useful information regarding the layout.
-            json = {
-                'id': layout.id,
-                'key': layout.key,
-                'title': layout.title,
-                'placeholders': [p.as_dict() for p in placeholders],
-            }
+            not_modified = (
+                last_modified is not None and
+                if_modified_since is not None and
+                last_modified <= if_modified_since
+            )
+
+        if not_modified:
+            response = HttpResponseNotModified()
+        else:
+            response = JsonResponse(json)
 
-        return JsonResponse(json, status=status)
+        response['ETag'] = '"{0}"'.format(etag)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Allow the browser to store the response, but always revalidate it.
+        patch_cache_control(response, private=True, no_cache=True, must_revalidate=True)
+        return response
 
     # ---- Layout permission hooks ----
 
@@ -161,8 +385,15 @@ class FluentContentsLayoutPageAdmin(PlaceholderEditorAdmin, PageAdmin):
         the layout; False if the user does not have permission to
         change the layout).
         """
-        codename = '{0}.change_page_layout'.format(obj._meta.app_label)
-        return request.user.has_perm(codename, obj=obj)
+        # The permission is checked by every call of `get_readonly_fields`, ask the backends once.
+        checked = getattr(request, '_change_page_layout_permissions', None)
+        if checked is None:
+            checked = request._change_page_layout_permissions = {}
+        key = (request.user.pk, obj.pk)
+        if key not in checked:
+            codename = '{0}.change_page_layout'.format(obj._meta.app_label)
+            checked[key] = request.user.has_perm(codename, obj=obj)
+        return checked[key]
 
 
 class PageLayoutAdmin(admin.ModelAdmin):
@@ -170,7 +401,7 @@ class PageLayoutAdmin(admin.ModelAdmin):
     Admin configuration for `PageLayout` model.
     """
     # Config list page:
-    list_display = ['title', 'key', ]
+    list_display = ['title', 'key', 'page_count', 'site_page_count']
     fieldsets = (
         (
             None, {
@@ -187,6 +418,142 @@ class PageLayoutAdmin(admin.ModelAdmin):
             'title',
         )
     }
+    actions = ['delete_selected', 'move_pages']
+
+    def get_queryset(self, request):
+        """
+        Annotate the number of pages using the layouts, for the list page.
+
+        :param request: Django request object.
+        :return: QuerySet.
+        """
+        queryset = super(PageLayoutAdmin, self).get_queryset(request)
+        return queryset.with_page_counts(site_id=current_site_id())
+
+    def page_count(self, obj):
+        """
+        Return the number of pages of all sites using a layout.
+
+        :param obj: `PageLayout` object annotated by `get_queryset()`.
+        :return: Integer.
+        """
+        return obj.page_count
+    page_count.short_description = _('Pages')
+    page_count.admin_order_field = 'page_count'
+
+    def site_page_count(self, obj):
+        """
+        Return the number of pages of the current site using a layout.
+
+        :param obj: `PageLayout` object annotated by `get_queryset()`.
+        :return: Integer.
+        """
+        return obj.site_page_count
+    site_page_count.short_description = _('Pages on this site')
+    site_page_count.admin_order_field = 'site_page_count'
+
+    def delete_view(self, request, object_id, extra_context=None):
+        """
+        Refuse to delete a layout in use before collecting the objects to delete.
+
+        Deleting a layout would delete its pages, listing them with all
+        their content is slow on large sites.
+
+        :param request: Django request object.
+        :param object_id: Primary key of the layout.
+        :param extra_context: Additional template context.
+        :return: Django response object.
+        """
+        layout = self.get_object(request, unquote(object_id))
+        if layout is not None and layout.is_in_use():
+            self.message_user(
+                request,
+                _('The layout {0} is used by pages, move them to another layout first.').format(
+                    layout
+                ),
+                messages.ERROR
+            )
+            return HttpResponseRedirect(reverse(
+                'admin:{0}_{1}_change'.format(self.opts.app_label, self.opts.model_name),
+                args=[layout.pk]
+            ))
+        return super(PageLayoutAdmin, self).delete_view(request, object_id, extra_context)
+
+    def delete_selected(self, request, queryset):
+        """
+        Admin action deleting the selected layouts when no page uses them.
+
+        :param request: Django request object.
+        :param queryset: Queryset of the selected layouts.
+        :return: Response of the `delete_selected` action of Django, or
+        `None` to return to the list of layouts.
+        """
+        in_use = list(queryset.in_use())
+        if in_use:
+            self.message_user(
+                request,
+                _('These layouts are used by pages, move them to another layout first: '
+                  '{0}.').format(', '.join(force_text(layout) for layout in in_use)),
+                messages.ERROR
+            )
+            return None
+        return delete_selected_action(self, request, queryset)
+    delete_selected.short_description = delete_selected_action.short_description
+
+    def move_pages(self, request, queryset):
+        """
+        Admin action moving the pages of the selected layouts to another layout.
+
+        The layout is chosen on an intermediate page, the placeholders of
+        the pages are remapped as the page admin does when the layout of a
+        single page is changed.
+
+        :param request: Django request object.
+        :param queryset: Queryset of the selected layouts.
+        :return: Template response of the intermediate page, or `None` to
+        return to the list of layouts.
+        """
+        codename = '{0}.change_page_layout'.format(models.FluentContentsLayoutPage._meta.app_label)
+        if not request.user.has_perm(codename):
+            self.message_user(
+                request, _('You do not have permission to change page layouts.'), messages.ERROR
+            )
+            return None
+
+        form = forms.RelayoutForm(
+            models.PageLayout.objects.exclude(pk__in=[layout.pk for layout in queryset]),
+            request.POST if 'apply' in request.POST else None
+        )
+        if form.is_valid():
+            new_layout = form.cleaned_data['layout']
+            try:
+                # The templates of all layouts are analysed before any page is moved.
+                relayouts = [relayout.Relayout(layout, new_layout) for layout in queryset]
+            except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+                self.message_user(
+                    request,
+                    _('The template of a layout could not be analysed, no pages were moved: '
+                      '{0}').format(e),
+                    messages.ERROR
+                )
+                return None
+            pages = sum(layout_relayout.run().pages for layout_relayout in relayouts)
+            self.message_user(request, _('Moved {0} pages to the layout {1}.').format(
+                pages, new_layout
+            ))
+            return None
+
+        context = dict(
+            self.admin_site.each_context(request),
+            title=_('Move the pages to another layout'),
+            opts=self.model._meta,
+            layouts=queryset,
+            pages=models.FluentContentsLayoutPage._base_manager.filter(layout__in=queryset).count(),
+            form=form,
+            action_checkbox_name=helpers.ACTION_CHECKBOX_NAME,
+        )
+        return TemplateResponse(request, 'admin/fluent_mezzanine/move_pages.html', context)
+    move_pages.short_description = _('Move the pages to another layout')
 
 
 # Admin registration.
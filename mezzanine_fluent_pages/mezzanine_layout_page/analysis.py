@@ -0,0 +1,113 @@
+"""
+Sharing the placeholder analysis of layout templates between processes.
+
+Analysing a template for its placeholders compiles it and walks its node
+tree. The results are stored in the Django cache by template path and
+content hash, so every process serving the site (and every layout using
+the same template) reuses the analysis made by the first one for that
+version of the template. With `MEZZANINE_PAGES_LAYOUT_ANALYSIS_CACHE_DIR`
+the results are also written to files in that directory, which outlive
+restarts of the cache.
+"""
+import hashlib
+import json
+import os
+
+from django.core.cache import cache as django_cache
+
+from .. import utils
+from . import appsettings
+
+
+def get_analysis_cache_key(template_path, template_hash):
+    """
+    Return the cache key of the analysis of a version of a template.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :param template_hash: Hash of the contents of the template file.
+    :return: Cache key string.
+    """
+    path_hash = hashlib.sha1(template_path.encode('utf-8')).hexdigest()
+    return 'mezzanine_fluent_pages.analysis.{0}.{1}'.format(path_hash, template_hash)
+
+
+def get_analysis_file_path(template_path, template_hash):
+    """
+    Return the path of the file holding the analysis of a version of a template.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :param template_hash: Hash of the contents of the template file.
+    :return: File path, or `None` when no cache directory is configured.
+    """
+    cache_dir = appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_CACHE_DIR
+    if not cache_dir:
+        return None
+    return os.path.join(
+        cache_dir, '{0}.json'.format(get_analysis_cache_key(template_path, template_hash))
+    )
+
+
+def get_cached_analysis(template_path, template_hash):
+    """
+    Return the stored analysis of a version of a template.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :param template_hash: Hash of the contents of the template file.
+    :return: List of placeholder dictionaries, or `None`.
+    """
+    cache_key = get_analysis_cache_key(template_path, template_hash)
+    placeholders = django_cache.get(cache_key)
+    if placeholders is not None:
+        return placeholders
+
+    file_path = get_analysis_file_path(template_path, template_hash)
+    if file_path is None:
+        return None
+    try:
+        with open(file_path) as analysis_file:
+            placeholders = json.load(analysis_file)
+    except (IOError, OSError, ValueError):
+        return None
+    django_cache.set(cache_key, placeholders, None)
+    return placeholders
+
+
+def set_cached_analysis(template_path, template_hash, placeholders):
+    """
+    Store the analysis of a version of a template.
+
+    The file is written atomically, so other processes never read a
+    partial file.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :param template_hash: Hash of the contents of the template file.
+    :param placeholders: List of placeholder dictionaries.
+    :return: None.
+    """
+    django_cache.set(get_analysis_cache_key(template_path, template_hash), placeholders, None)
+
+    file_path = get_analysis_file_path(template_path, template_hash)
+    if file_path is None:
+        return
+    utils.write_file_atomically(file_path, json.dumps(placeholders).encode('utf-8'))
+
+
+def get_placeholders(template_path, template_hash, analyse):
+    """
+    Return the analysis of a version of a template, analysing it when needed.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :param template_hash: Hash of the contents of the template file, the
+    analysis is not shared when it is empty.
+    :param analyse: Function returning the list of placeholder dictionaries
+    of the template.
+    :return: List of placeholder dictionaries.
+    """
+    if not template_hash:
+        return analyse()
+
+    placeholders = get_cached_analysis(template_path, template_hash)
+    if placeholders is None:
+        placeholders = analyse()
+        set_cached_analysis(template_path, template_hash, placeholders)
+    return placeholders
@@ -7,3 +7,11 @@ class FluentMezzanineLayoutPageConfig(AppConfig):
     """
     label = 'mezzanine_layout_page'
     name = 'mezzanine_fluent_pages.mezzanine_layout_page'
+
+    def ready(self):
+        """
+        Connect the signal receivers and register the system checks.
+
+        :return: None.
+        """
+        from . import checks, receivers  # NOQA
@@ -1,15 +1,5 @@
-import os
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from django.utils.translation import ugettext_lazy as _
-
-
-# Configure the directory that the templates for for the layouts are available at.
-MEZZANINE_PAGES_TEMPLATE_DIR = getattr(
-    settings,
-    'MEZZANINE_PAGES_TEMPLATE_DIR',
-    settings.TEMPLATE_DIRS[0] if settings.TEMPLATE_DIRS else None
-)
 
 # Configure if relative directory templates should be used.
 MEZZANINE_PAGES_RELATIVE_TEMPLATE_DIR = getattr(
@@ -18,29 +8,106 @@ MEZZANINE_PAGES_RELATIVE_TEMPLATE_DIR = getattr(
     True
 )
 
+# Configure how many directory levels below the template dir are searched for layouts.
+MEZZANINE_PAGES_TEMPLATE_MAX_DEPTH = getattr(
+    settings,
+    'MEZZANINE_PAGES_TEMPLATE_MAX_DEPTH',
+    None
+)
+
+# Configure glob patterns of template paths that are never offered as layouts.
+MEZZANINE_PAGES_TEMPLATE_EXCLUDE = getattr(
+    settings,
+    'MEZZANINE_PAGES_TEMPLATE_EXCLUDE',
+    ()
+)
+
+# Configure the number of seconds between checks for changes in the template dir.
+MEZZANINE_PAGES_TEMPLATE_INDEX_CHECK_INTERVAL = getattr(
+    settings,
+    'MEZZANINE_PAGES_TEMPLATE_INDEX_CHECK_INTERVAL',
+    0
+)
+
+# Configure the number of layout templates analysed at the same time per process.
+MEZZANINE_PAGES_LAYOUT_ANALYSIS_CONCURRENCY = getattr(
+    settings,
+    'MEZZANINE_PAGES_LAYOUT_ANALYSIS_CONCURRENCY',
+    2
+)
+
+# Configure the number of seconds a layout metadata request waits for an analysis slot.
+MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT = getattr(
+    settings,
+    'MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT',
+    5
+)
+
+# Configure a directory to store the placeholder analysis of layout templates in, besides the cache.
+MEZZANINE_PAGES_LAYOUT_ANALYSIS_CACHE_DIR = getattr(
+    settings,
+    'MEZZANINE_PAGES_LAYOUT_ANALYSIS_CACHE_DIR',
+    None
+)
+
+
+# The template backend whose directories layouts can be chosen from.
+DJANGO_TEMPLATES_BACKEND = 'django.template.backends.django.DjangoTemplates'
+
+# The error when no directory of the layout templates is configured.
+TEMPLATE_DIR_MISSING = (
+    "The setting `MEZZANINE_PAGES_TEMPLATE_DIR`, `TEMPLATES[...]['DIRS']` or "
+    "`TEMPLATE_DIRS[0]` need to be defined!"
+)
+
+
+def get_template_dir_setting():
+    """
+    Return the setting the directory of the layout templates is read from.
 
-# Validate required settings.
-if not MEZZANINE_PAGES_TEMPLATE_DIR:
-    raise ImproperlyConfigured(
-        _('The setting `MEZZANINE_PAGES_TEMPLATE_DIR` or `TEMPLATE_DIRS[0]` need to be defined!')
-    )
-else:
-    # Clean settings
-    MEZZANINE_PAGES_TEMPLATE_DIR = MEZZANINE_PAGES_TEMPLATE_DIR.rstrip('/') + '/'
+    The directory is `MEZZANINE_PAGES_TEMPLATE_DIR` when it is defined,
+    otherwise the first directory of the first `DjangoTemplates` backend in
+    `TEMPLATES`, or else the first directory of `TEMPLATE_DIRS`.
 
-    # Test whether the template dir for page templates exists.
-    settingName = 'TEMPLATE_DIRS[0]'
+    :return: Tuple of the setting name and its value, which is `None`
+    when no directory is configured.
+    """
     if hasattr(settings, 'MEZZANINE_PAGES_TEMPLATE_DIR'):
-        settingName = 'MEZZANINE_PAGES_TEMPLATE_DIR'
-
-    if not os.path.isabs(MEZZANINE_PAGES_TEMPLATE_DIR):
-        raise ImproperlyConfigured(
-            'The setting `{0}` needs to be an absolute path!'.format(settingName)
-        )
-    if not os.path.exists(MEZZANINE_PAGES_TEMPLATE_DIR):
-        raise ImproperlyConfigured(
-            'The path `{0}` in the setting `{1}` does not exist!'.format(
-                MEZZANINE_PAGES_TEMPLATE_DIR,
-                settingName
-            )
-        )
+        return 'MEZZANINE_PAGES_TEMPLATE_DIR', settings.MEZZANINE_PAGES_TEMPLATE_DIR
+
+    for index, backend in enumerate(getattr(settings, 'TEMPLATES', None) or ()):
+        if backend.get('BACKEND') == DJANGO_TEMPLATES_BACKEND and backend.get('DIRS'):
+            return "TEMPLATES[{0}]['DIRS'][0]".format(index), backend['DIRS'][0]
+
+    template_dirs = getattr(settings, 'TEMPLATE_DIRS', None)
+    return 'TEMPLATE_DIRS[0]', template_dirs[0] if template_dirs else None
+
+
+def get_template_dir():
+    """
+    Return the directory the layout templates are chosen from.
+
+    The settings are read on every call, the directory is validated by the
+    system checks in `checks.py` instead of when the settings are loaded.
+
+    :return: Directory path ending with a slash, or `None`.
+    """
+    template_dir = get_template_dir_setting()[1]
+    if not template_dir:
+        return None
+    return template_dir.rstrip('/') + '/'
+
+
+def require_template_dir():
+    """
+    Return the directory the layout templates are chosen from, which needs
+    to be configured.
+
+    :return: Directory path ending with a slash.
+    :raises ImproperlyConfigured: When no directory is configured, as
+    reported by the `mezzanine_layout_page.E001` check.
+    """
+    template_dir = get_template_dir()
+    if template_dir is None:
+        raise ImproperlyConfigured(TEMPLATE_DIR_MISSING)
+    return template_dir
@@ -0,0 +1,520 @@
+"""
+Bulk import of layout pages and their content.
+
+Pages are read from JSON lines, one page per line:
+
+    {"id": "about", "title": "About", "layout": "default",
+     "placeholders": {"main": [{"model": "rawhtml.rawhtmlitem", "html": "<p>About</p>"}]}}
+    {"id": "team", "parent": "about", "title": "Team", "layout": "default"}
+
+`parent` refers to the `id` of a page earlier in the source. Records may
+also set the `slug`, `status`, `publish_date`, `expiry_date`,
+`login_required`, `in_sitemap` and `description` of a page. Content items
+name their model as `app_label.model_name`, their other keys are field
+values.
+
+Saving pages one at a time runs Mezzanine's tree, slug and ordering logic
+for every page, costing several queries each. The importer works out the
+slugs, titles and ordering in memory instead, and creates the pages,
+placeholders and content items of `batch_size` records in bulk inside a
+transaction.
+"""
+import collections
+import json
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, router, transaction
+from django.template import TemplateDoesNotExist
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from fluent_contents import appsettings as fluent_contents_appsettings
+from fluent_contents.models import ContentItem, Placeholder
+from mezzanine.pages.models import Page
+from mezzanine.utils.sites import current_site_id
+from mezzanine.utils.urls import slugify
+
+from .. import cache, search, utils
+from . import models
+
+# Page fields which can be set by a record, besides the title, layout and parent.
+PAGE_FIELDS = (
+    'slug', 'status', 'publish_date', 'expiry_date', 'login_required', 'in_sitemap', 'description'
+)
+
+# Keys of a record which are not page fields.
+RECORD_KEYS = ('id', 'parent', 'title', 'layout', 'placeholders')
+
+# The number of objects created by an import.
+ImportResult = collections.namedtuple('ImportResult', ('pages', 'placeholders', 'content_items'))
+
+# What the children of a created page need of it, kept instead of its `ImportedPage`.
+CreatedPage = collections.namedtuple('CreatedPage', ('pk', 'slug', 'titles'))
+
+
+class BulkImportError(ValueError):
+    """
+    A record of the source can not be imported.
+    """
+    def __init__(self, line_number, message):
+        """
+        :param line_number: Line number of the record in the source.
+        :param message: Description of the problem.
+        :return: None.
+        """
+        super(BulkImportError, self).__init__('Line {0}: {1}'.format(line_number, message))
+        self.line_number = line_number
+
+
+class ImportedPage(object):
+    """
+    A page read from the source, waiting to be created.
+    """
+    def __init__(self, import_id, page, layout, parent, placeholders):
+        """
+        :param import_id: Id of the record in the source, or `None`.
+        :param page: Unsaved `Page` object.
+        :param layout: `PageLayout` object.
+        :param parent: `ImportedPage` or `CreatedPage` of the parent page,
+        or `None`.
+        :param placeholders: List of tuples of a slot name and a list of
+        unsaved content items.
+        :return: None.
+        """
+        self.import_id = import_id
+        self.page = page
+        self.layout = layout
+        self.parent = parent
+        self.placeholders = placeholders
+
+    @property
+    def pk(self):
+        """
+        :return: Primary key of the page, `None` until it is created.
+        """
+        return self.page.pk
+
+    @property
+    def slug(self):
+        """
+        :return: Slug of the page.
+        """
+        return self.page.slug
+
+    @property
+    def titles(self):
+        """
+        :return: Titles of the page and its ancestors.
+        """
+        return self.page.titles
+
+
+def insert_rows(model, objs, using):
+    """
+    Insert the rows of the own table of multi-table inherited objects.
+
+    `bulk_create()` refuses multi-table inherited models, so the rows of
+    the parent table are created in bulk first and the rows pointing to
+    them are inserted here, in batches the way `bulk_create()` does.
+
+    :param model: Model class.
+    :param objs: List of objects with their parent link set.
+    :param using: Database alias.
+    :return: None.
+    """
+    fields = model._meta.local_concrete_fields
+    batch_size = max(connections[using].ops.bulk_batch_size(fields, objs), 1)
+    for start in range(0, len(objs), batch_size):
+        model._base_manager._insert(objs[start:start + batch_size], fields=fields, using=using)
+
+
+class LayoutPageImporter(object):
+    """
+    Create layout pages and their content from JSON lines in bulk.
+    """
+    def __init__(self, site_id=None, batch_size=500, using=None):
+        """
+        :param site_id: Id of the site the pages are created for, the
+        current site by default.
+        :param batch_size: Number of pages created per transaction.
+        :param using: Database alias, the default for pages by default.
+        :return: None.
+        """
+        self.site_id = site_id or current_site_id()
+        self.batch_size = batch_size
+        self.using = using or router.db_for_write(Page)
+        self.layouts = {layout.key: layout for layout in models.PageLayout.objects.all()}
+        self.layout_slots = {}
+        self.item_models = {}
+        self.page_type = ContentType.objects.get_for_model(models.FluentContentsLayoutPage)
+        self.language_code = fluent_contents_appsettings.FLUENT_CONTENTS_DEFAULT_LANGUAGE_CODE
+
+        pages = Page._base_manager.using(self.using).filter(site_id=self.site_id)
+        self.slugs = set(pages.values_list('slug', flat=True))
+        self.orders = collections.Counter()
+        self.orders[None] = pages.filter(parent=None, _order__isnull=False).count()
+
+        # `ImportedPage` or `CreatedPage` objects by the id of their record.
+        self.pages = {}
+        self.pending = []
+        self.counts = collections.Counter()
+
+    def import_lines(self, lines):
+        """
+        Import the pages of a JSON lines source.
+
+        Every batch of pages is committed on its own, so the pages of the
+        batches before an invalid record are kept.
+
+        :param lines: Iterable of lines, such as an open file.
+        :return: `ImportResult` tuple.
+        :raises BulkImportError: When a record can not be imported.
+        """
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise BulkImportError(line_number, 'Invalid JSON: {0}'.format(e))
+            self.add(line_number, record)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        self.flush()
+
+        # The new pages show up in the menus of all pages.
+        if self.counts['pages']:
+            cache.expire_tags([cache.TREE_TAG])
+        return ImportResult(
+            self.counts['pages'], self.counts['placeholders'], self.counts['content_items']
+        )
+
+    def add(self, line_number, record):
+        """
+        Validate a record and queue its page for creation.
+
+        :param line_number: Line number of the record.
+        :param record: Dictionary read from the source.
+        :return: None.
+        :raises BulkImportError: When the record is invalid.
+        """
+        if not isinstance(record, dict):
+            raise BulkImportError(line_number, 'A record needs to be a JSON object.')
+        unknown_keys = sorted(set(record) - set(RECORD_KEYS) - set(PAGE_FIELDS))
+        if unknown_keys:
+            raise BulkImportError(line_number, 'Unknown keys: {0}.'.format(', '.join(unknown_keys)))
+
+        import_id = record.get('id')
+        if import_id is not None and import_id in self.pages:
+            raise BulkImportError(line_number, 'Duplicate id `{0}`.'.format(import_id))
+        title = record.get('title')
+        if not title:
+            raise BulkImportError(line_number, 'A record needs a title.')
+        layout = self.layouts.get(record.get('layout'))
+        if layout is None:
+            raise BulkImportError(line_number, 'Unknown layout `{0}`.'.format(record.get('layout')))
+        parent = None
+        if record.get('parent') is not None:
+            parent = self.pages.get(record['parent'])
+            if parent is None:
+                raise BulkImportError(
+                    line_number,
+                    'Unknown parent `{0}`, parents need to precede their children.'.format(
+                        record['parent']
+                    )
+                )
+
+        fields = {name: record[name] for name in PAGE_FIELDS if name in record}
+        for name in ('publish_date', 'expiry_date'):
+            if fields.get(name):
+                try:
+                    fields[name] = parse_datetime(fields[name])
+                except (TypeError, ValueError):
+                    fields[name] = None
+                if fields[name] is None:
+                    raise BulkImportError(line_number, 'Invalid `{0}`.'.format(name))
+                if timezone.is_naive(fields[name]):
+                    fields[name] = timezone.make_aware(fields[name])
+
+        # The fields `Page.save()` would set.
+        now = timezone.now()
+        fields.setdefault('description', title)
+        if not fields.get('publish_date'):
+            fields['publish_date'] = now
+        page = Page(
+            title=title,
+            site_id=self.site_id,
+            parent=None,
+            content_model=models.FluentContentsLayoutPage._meta.model_name,
+            created=now,
+            updated=now,
+            **fields
+        )
+        page.slug = self.get_unique_slug(record.get('slug') or self.get_slug(title, parent))
+        page.titles = ' / '.join(
+            [parent.titles, title] if parent is not None else [title]
+        )
+        # Siblings are counted by the slug of their parent, which is unique on the site.
+        parent_slug = parent.slug if parent is not None else None
+        page._order = self.orders[parent_slug]
+        self.orders[parent_slug] += 1
+
+        imported_page = ImportedPage(
+            import_id, page, layout, parent, self.get_placeholders(line_number, record)
+        )
+        if import_id is not None:
+            self.pages[import_id] = imported_page
+        self.pending.append(imported_page)
+
+    def get_slug(self, title, parent):
+        """
+        Return the slug Mezzanine generates for a page.
+
+        :param title: Title of the page.
+        :param parent: `ImportedPage` or `CreatedPage` of the parent page,
+        or `None`.
+        :return: Slug string.
+        """
+        slug = slugify(title)
+        if parent is not None:
+            return '{0}/{1}'.format(parent.slug, slug)
+        return slug
+
+    def get_unique_slug(self, slug):
+        """
+        Return a slug no other page of the site uses, appending a number when needed.
+
+        :param slug: Slug string.
+        :return: Slug string.
+        """
+        slug = slug.strip('/')
+        unique_slug = slug
+        index = 1
+        while unique_slug in self.slugs:
+            unique_slug = '{0}-{1}'.format(slug, index)
+            index += 1
+        self.slugs.add(unique_slug)
+        return unique_slug
+
+    def get_placeholders(self, line_number, record):
+        """
+        Return the content items of a record by slot.
+
+        :param line_number: Line number of the record.
+        :param record: Dictionary read from the source.
+        :return: List of tuples of a slot name and a list of unsaved
+        content items.
+        :raises BulkImportError: When a content item is invalid.
+        """
+        placeholders = record.get('placeholders') or {}
+        if not isinstance(placeholders, dict):
+            raise BulkImportError(line_number, '`placeholders` needs to be a JSON object.')
+
+        result = []
+        for slot, items in sorted(placeholders.items()):
+            content_items = []
+            for sort_order, item in enumerate(items or ()):
+                item = dict(item)
+                model = self.get_item_model(line_number, item.pop('model', None))
+                try:
+                    content_item = model(**item)
+                except TypeError as e:
+                    raise BulkImportError(line_number, 'Invalid content item: {0}'.format(e))
+                content_item.sort_order = sort_order
+                content_items.append(content_item)
+            result.append((slot, content_items))
+        return result
+
+    def get_item_model(self, line_number, name):
+        """
+        Return the content item model with a name.
+
+        :param line_number: Line number of the record.
+        :param name: Model name as `app_label.model_name`.
+        :return: `ContentItem` subclass.
+        :raises BulkImportError: When the model is not a content item.
+        """
+        if name not in self.item_models:
+            try:
+                model = apps.get_model(name)
+            except (LookupError, ValueError, TypeError):
+                model = None
+            # Only content items that directly extend `ContentItem` have a single parent row.
+            if model is None or list(model._meta.parents) != [ContentItem]:
+                raise BulkImportError(line_number, 'Unknown content item model `{0}`.'.format(name))
+            self.item_models[name] = model
+        return self.item_models[name]
+
+    def get_layout_slots(self, layout):
+        """
+        Return the role and title of the placeholders of a layout.
+
+        :param layout: `PageLayout` object.
+        :return: Dictionary of tuples of role and title by slot.
+        """
+        if layout.pk not in self.layout_slots:
+            try:
+                placeholders = layout.get_placeholder_data()
+            except TemplateDoesNotExist:
+                placeholders = []
+            self.layout_slots[layout.pk] = {
+                placeholder.slot: (placeholder.role, placeholder.title)
+                for placeholder in placeholders
+            }
+        return self.layout_slots[layout.pk]
+
+    def flush(self):
+        """
+        Create the queued pages and their content in a transaction.
+
+        Only what their children need is kept of the created pages, so the
+        memory used does not grow with the content of the source.
+
+        :return: None.
+        """
+        if not self.pending:
+            return
+        with transaction.atomic(using=self.using):
+            self.create_pages(self.pending)
+            self.create_content(self.pending)
+            # The content items are inserted without signals, store the search text here.
+            search.update_search_texts(
+                models.FluentContentsLayoutPage,
+                [imported_page.pk for imported_page in self.pending]
+            )
+        for imported_page in self.pending:
+            if imported_page.import_id is not None:
+                self.pages[imported_page.import_id] = CreatedPage(
+                    imported_page.pk, imported_page.slug, imported_page.titles
+                )
+        self.pending = []
+
+    def create_pages(self, imported_pages):
+        """
+        Create the rows of pages.
+
+        Pages are created parents first, as the rows of children refer to
+        the primary keys of their parents.
+
+        :param imported_pages: List of `ImportedPage` objects.
+        :return: None.
+        """
+        remaining = imported_pages
+        while remaining:
+            level = [
+                imported_page for imported_page in remaining
+                if imported_page.parent is None or imported_page.parent.pk is not None
+            ]
+            level_ids = set(id(imported_page) for imported_page in level)
+            remaining = [
+                imported_page for imported_page in remaining if id(imported_page) not in level_ids
+            ]
+            for imported_page in level:
+                if imported_page.parent is not None:
+                    imported_page.page.parent_id = imported_page.parent.pk
+
+            Page._base_manager.using(self.using).bulk_create(
+                [imported_page.page for imported_page in level]
+            )
+            # Not every database returns the primary keys of bulk created rows, find them by slug.
+            by_slug = {imported_page.page.slug: imported_page for imported_page in level}
+            for slugs in utils.batches(list(by_slug)):
+                for slug, pk in Page._base_manager.using(self.using).filter(
+                    site_id=self.site_id, slug__in=slugs
+                ).values_list('slug', 'pk'):
+                    by_slug[slug].page.pk = pk
+
+        insert_rows(
+            models.FluentContentsLayoutPage,
+            [
+                models.FluentContentsLayoutPage(
+                    page_ptr_id=imported_page.page.pk,
+                    layout_id=imported_page.layout.pk
+                )
+                for imported_page in imported_pages
+            ],
+            self.using
+        )
+        self.counts['pages'] += len(imported_pages)
+
+    def create_content(self, imported_pages):
+        """
+        Create the placeholders and content items of pages.
+
+        :param imported_pages: List of `ImportedPage` objects with their
+        rows created.
+        :return: None.
+        """
+        placeholders = []
+        for imported_page in imported_pages:
+            slots = self.get_layout_slots(imported_page.layout)
+            for slot, content_items in imported_page.placeholders:
+                role, title = slots.get(slot, (Placeholder.MAIN, slot))
+                placeholders.append(Placeholder(
+                    slot=slot,
+                    role=role,
+                    title=title,
+                    parent_type_id=self.page_type.pk,
+                    parent_id=imported_page.page.pk
+                ))
+        if not placeholders:
+            return
+        Placeholder.objects.using(self.using).bulk_create(placeholders)
+        self.counts['placeholders'] += len(placeholders)
+
+        page_ids = [imported_page.page.pk for imported_page in imported_pages]
+        placeholder_ids = {}
+        for ids in utils.batches(page_ids):
+            for parent_id, slot, pk in Placeholder.objects.using(self.using).filter(
+                parent_type=self.page_type, parent_id__in=ids
+            ).values_list('parent_id', 'slot', 'pk'):
+                placeholder_ids[parent_id, slot] = pk
+
+        content_items = []
+        base_content_items = []
+        for imported_page in imported_pages:
+            for slot, page_content_items in imported_page.placeholders:
+                for content_item in page_content_items:
+                    content_item.placeholder_id = placeholder_ids[imported_page.page.pk, slot]
+                    content_items.append(content_item)
+                    base_content_items.append(ContentItem(
+                        polymorphic_ctype_id=ContentType.objects.get_for_model(content_item).pk,
+                        parent_type_id=self.page_type.pk,
+                        parent_id=imported_page.page.pk,
+                        language_code=self.language_code,
+                        placeholder_id=content_item.placeholder_id,
+                        sort_order=content_item.sort_order
+                    ))
+        if not content_items:
+            return
+        ContentItem._base_manager.using(self.using).bulk_create(base_content_items)
+        content_item_ids = {}
+        base_manager = ContentItem._base_manager.using(self.using)
+        for ids in utils.batches(list(placeholder_ids.values())):
+            for placeholder_id, sort_order, pk in base_manager.filter(
+                placeholder_id__in=ids
+            ).values_list('placeholder_id', 'sort_order', 'pk'):
+                content_item_ids[placeholder_id, sort_order] = pk
+
+        by_model = collections.defaultdict(list)
+        for content_item in content_items:
+            content_item.pk = content_item_ids[content_item.placeholder_id, content_item.sort_order]
+            by_model[type(content_item)].append(content_item)
+        for model, model_content_items in by_model.items():
+            insert_rows(model, model_content_items, self.using)
+        self.counts['content_items'] += len(content_items)
+
+
+def import_layout_pages(lines, site_id=None, batch_size=500):
+    """
+    Import layout pages and their content from JSON lines in bulk.
+
+    :param lines: Iterable of lines, such as an open file.
+    :param site_id: Id of the site the pages are created for, the
+    current site by default.
+    :param batch_size: Number of pages created per transaction.
+    :return: `ImportResult` tuple.
+    :raises BulkImportError: When a record can not be imported.
+    """
+    return LayoutPageImporter(site_id=site_id, batch_size=batch_size).import_lines(lines)
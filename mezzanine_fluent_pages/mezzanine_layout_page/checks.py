@@ -0,0 +1,37 @@
+import os
+
+from django.core import checks
+
+from . import appsettings
+
+
+@checks.register()
+def check_template_dir(app_configs, **kwargs):
+    """
+    Check the directory the layout templates are chosen from.
+
+    The directory is validated here instead of when the settings are
+    loaded, so importing the app does not touch the file system.
+
+    :param app_configs: App configs to check, `None` for all apps.
+    :param kwargs: Additional keyword arguments.
+    :return: List of errors.
+    """
+    setting_name, template_dir = appsettings.get_template_dir_setting()
+    if not template_dir:
+        return [checks.Error(appsettings.TEMPLATE_DIR_MISSING, id='mezzanine_layout_page.E001')]
+
+    if not os.path.isabs(template_dir):
+        return [checks.Error(
+            'The setting `{0}` needs to be an absolute path!'.format(setting_name),
+            id='mezzanine_layout_page.E002'
+        )]
+    if not os.path.exists(template_dir):
+        return [checks.Error(
+            'The path `{0}` in the setting `{1}` does not exist!'.format(
+                template_dir.rstrip('/') + '/',
+                setting_name
+            ),
+            id='mezzanine_layout_page.E003'
+        )]
+    return []
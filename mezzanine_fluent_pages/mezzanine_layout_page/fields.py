@@ -16,7 +16,8 @@ class TemplateFilePathField(models.FilePathField):
         This enforces recursive lookups for the field.
 
         :param verbose_name: Verbose name for the field.
-        :param path: The directory for file lookups.
+        :param path: The directory for file lookups, or a callable
+        returning it when the form field is created.
         :param kwargs: Extra keyword arguments.
         :return: None.
         """
@@ -33,6 +34,8 @@ class TemplateFilePathField(models.FilePathField):
         """
         # Like the FilePathField, the formfield does the actual work
         defaults = {'form_class': forms.TemplateFilePathFieldForm}
+        if callable(self.path):
+            defaults['path'] = self.path()
         defaults.update(kwargs)
         return super(TemplateFilePathField, self).formfield(**defaults)
 
@@ -1,7 +1,9 @@
 import os
+import re
 from django import forms
+from django.utils.translation import ugettext_lazy as _
 
-from . import appsettings
+from . import appsettings, templatefiles
 
 
 class TemplateFilePathFieldForm(forms.FilePathField):
@@ -27,7 +29,15 @@ class TemplateFilePathFieldForm(forms.FilePathField):
         if kwargs['path'] is None:
             kwargs['path'] = ''
 
-        super(TemplateFilePathFieldForm, self).__init__(*args, **kwargs)
+        if (
+            not args and
+            kwargs.get('recursive') and
+            kwargs.get('allow_files', True) and
+            not kwargs.get('allow_folders')
+        ):
+            self._init_from_template_index(**kwargs)
+        else:
+            super(TemplateFilePathFieldForm, self).__init__(*args, **kwargs)
         # Make choices relative if requested.
         if appsettings.MEZZANINE_PAGES_RELATIVE_TEMPLATE_DIR:
             self.choices.sort(key=lambda choice: choice[1])
@@ -35,6 +45,34 @@ class TemplateFilePathFieldForm(forms.FilePathField):
                 (filename.replace(self.path, '', 1), title) for filename, title in self.choices
             ]
 
+    def _init_from_template_index(self, path, match=None, recursive=True, allow_files=True,
+                                  allow_folders=False, required=True, **kwargs):
+        """
+        Initialise the field with choices from the cached template index.
+
+        This replaces `FilePathField.__init__`, which walks the whole
+        directory on every instantiation.
+
+        :param path: The directory for file lookups.
+        :param match: Regular expression file names need to match.
+        :param recursive: Whether sub directories are searched.
+        :param allow_files: Whether files are selectable.
+        :param allow_folders: Whether folders are selectable.
+        :param required: Whether a value is required.
+        :param kwargs: Additional keyword arguments for `ChoiceField`.
+        :return: None
+        """
+        super(forms.FilePathField, self).__init__(choices=(), required=required, **kwargs)
+        self.path, self.match, self.recursive = path, match, recursive
+        self.allow_files, self.allow_folders = allow_files, allow_folders
+        if self.match is not None:
+            self.match_re = re.compile(self.match)
+
+        choices = [] if self.required else [('', '---------')]
+        for filename in templatefiles.get_template_index(path, match).get_files():
+            choices.append((filename, filename.replace(path, '', 1)))
+        self.choices = self.widget.choices = choices
+
     def prepare_value(self, value):
         """
         Allow effortlessly switching between relative and absolute paths.
@@ -55,3 +93,20 @@ class TemplateFilePathFieldForm(forms.FilePathField):
                 if not os.path.isabs(value):
                     value = os.path.join(self.path, value)
         return value
+
+
+class RelayoutForm(forms.Form):
+    """
+    Choose the layout to move the pages of other layouts to.
+    """
+    layout = forms.ModelChoiceField(queryset=None, label=_('New layout'))
+
+    def __init__(self, layouts, *args, **kwargs):
+        """
+        :param layouts: Queryset of the layouts that can be chosen.
+        :param args: Additional arguments.
+        :param kwargs: Additional keyword arguments.
+        :return: None.
+        """
+        super(RelayoutForm, self).__init__(*args, **kwargs)
+        self.fields['layout'].queryset = layouts
@@ -0,0 +1,178 @@
+"""
+Caching of the layout metadata served to the page admin.
+
+Switching layouts in the page admin requests the metadata of a layout,
+which needs the layout row and an analysis of its template. The metadata
+is kept in the shared cache, versioned by the layout tag that is expired
+when the layout is saved and by the version of the template file, so a
+request for unchanged metadata needs no query and no template analysis.
+
+Analysing templates is limited to one analysis per layout at a time and
+`MEZZANINE_PAGES_LAYOUT_ANALYSIS_CONCURRENCY` analyses per process, so
+a burst of editors switching layouts waits for a few analyses instead of
+occupying every thread serving the admin.
+"""
+import contextlib
+import threading
+import time
+
+from django.core.cache import cache as django_cache
+
+from .. import cache, utils
+from . import appsettings, templatefiles
+
+
+# Number of seconds between attempts to take a lock on Python 2, whose locks have no timeout.
+LOCK_POLL_INTERVAL = 0.05
+
+
+class AnalysisBusy(Exception):
+    """
+    No analysis slot became available in time.
+    """
+
+
+def get_layout_data_cache_key(layout_id):
+    """
+    Return the cache key of the metadata of a layout.
+
+    :param layout_id: Primary key of the layout.
+    :return: Cache key string.
+    """
+    return 'mezzanine_fluent_pages.layout_data.{0}'.format(layout_id)
+
+
+def get_cached_layout_data(layout_id):
+    """
+    Return the cached metadata of a layout, if it is still current.
+
+    :param layout_id: Primary key of the layout.
+    :return: Dictionary with the `json` data and the `last_modified`
+    datetime of the layout, or `None`.
+    """
+    tag_cache_key = cache.get_tag_cache_key(cache.get_layout_tag(layout_id))
+    cache_key = get_layout_data_cache_key(layout_id)
+    values = django_cache.get_many([cache_key, tag_cache_key])
+    entry = values.get(cache_key)
+    if (
+        entry is None or
+        entry['version'] != values.get(tag_cache_key) or
+        entry['file_version'] != utils.get_file_version(entry['file_path'])
+    ):
+        return None
+    return entry
+
+
+def set_cached_layout_data(layout, version, json, last_modified):
+    """
+    Store the metadata of a layout in the cache.
+
+    :param layout: `PageLayout` object.
+    :param version: Version of the layout tag read before the layout was
+    loaded, so metadata of a layout changed meanwhile is never current.
+    :param json: Metadata of the layout.
+    :param last_modified: Aware datetime the layout was last changed.
+    :return: Dictionary stored in the cache.
+    """
+    file_path = templatefiles.get_template_file_path(layout.template_path)
+    entry = {
+        'version': version,
+        'file_path': file_path,
+        'file_version': utils.get_file_version(file_path),
+        'json': json,
+        'last_modified': last_modified,
+    }
+    django_cache.set(get_layout_data_cache_key(layout.pk), entry, None)
+    return entry
+
+
+def get_layout_version(layout_id):
+    """
+    Return the current version of the layout tag.
+
+    :param layout_id: Primary key of the layout.
+    :return: Version string.
+    """
+    tag = cache.get_layout_tag(layout_id)
+    return cache.get_tag_versions([tag])[tag]
+
+
+def acquire(lock, timeout):
+    """
+    Take a lock or semaphore, waiting for at most `timeout` seconds.
+
+    :param lock: `Lock` or `Semaphore` object.
+    :param timeout: Number of seconds to wait.
+    :return: Whether it was taken.
+    """
+    try:
+        return lock.acquire(timeout=timeout)
+    except TypeError:
+        # Python 2 locks and semaphores do not accept a timeout, poll them instead.
+        deadline = time.time() + timeout
+        while not lock.acquire(False):
+            if time.time() >= deadline:
+                return False
+            time.sleep(LOCK_POLL_INTERVAL)
+        return True
+
+
+class AnalysisLimiter(object):
+    """
+    Limit the number of template analyses running at the same time.
+
+    Requests for a layout that is already being analysed wait for that
+    analysis instead of starting another one.
+    """
+    def __init__(self, concurrency):
+        """
+        :param concurrency: Number of analyses allowed at the same time.
+        :return: None.
+        """
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def slot(self, key, timeout):
+        """
+        Wait for the analysis of a key to be allowed.
+
+        Callers should check for a cached result again once the slot is
+        taken, as they may have waited for an analysis of the same key.
+
+        :param key: Key of the analysed object.
+        :param timeout: Number of seconds to wait for the analysis of the
+        same key and a free slot.
+        :return: Context manager.
+        :raises AnalysisBusy: When no slot became available in time.
+        """
+        deadline = time.time() + timeout
+        with self.lock:
+            key_lock, users = self.locks.get(key, (None, 0))
+            if key_lock is None:
+                key_lock = threading.Lock()
+            self.locks[key] = (key_lock, users + 1)
+        try:
+            # Waiting for the analysis of the same key does not take up a slot.
+            if not acquire(key_lock, timeout):
+                raise AnalysisBusy
+            try:
+                if not acquire(self.semaphore, max(deadline - time.time(), 0)):
+                    raise AnalysisBusy
+                try:
+                    yield
+                finally:
+                    self.semaphore.release()
+            finally:
+                key_lock.release()
+        finally:
+            with self.lock:
+                key_lock, users = self.locks[key]
+                if users > 1:
+                    self.locks[key] = (key_lock, users - 1)
+                else:
+                    del self.locks[key]
+
+
+analysis_limiter = AnalysisLimiter(appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_CONCURRENCY)
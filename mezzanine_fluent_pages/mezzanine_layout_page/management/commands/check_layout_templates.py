@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import validation
+
+
+class Command(BaseCommand):
+    """
+    Compile and analyse the layout templates, reporting the broken ones.
+
+    See the `validation` module for the checks made.
+    """
+    help = 'Compile and analyse the layout templates, reporting the broken ones.'
+
+    def add_arguments(self, parser):
+        """
+        Add the command options.
+
+        :param parser: Argument parser.
+        :return: None.
+        """
+        parser.add_argument(
+            '--all', action='store_true', dest='all_templates',
+            help='Also check every .html file in MEZZANINE_PAGES_TEMPLATE_DIR.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of worker processes checking templates (default: 4).'
+        )
+        parser.add_argument(
+            '--write', action='store_true',
+            help='Store the analysis of the templates for the layouts and web server processes.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Check the templates and report the results.
+
+        :param args: Additional arguments.
+        :param options: Command options.
+        :return: None.
+        :raises CommandError: When a template has errors.
+        """
+        verbosity = options['verbosity']
+        template_paths = validation.get_template_paths(all_templates=options['all_templates'])
+        if verbosity:
+            self.stdout.write('Checking {0} templates.'.format(len(template_paths)))
+
+        failures = []
+        stored = 0
+        start = time.time()
+        for result in sorted(
+            validation.check_templates(template_paths, workers=options['workers'])
+        ):
+            if result.errors:
+                failures.append(result)
+            if options['write'] and result.placeholders is not None:
+                stored += validation.store_analysis(result)
+            if verbosity > 1 or (verbosity and result.errors):
+                self.stdout.write('{0} {1} ({2} placeholders, {3:.0f} ms)'.format(
+                    'ERROR' if result.errors else 'OK',
+                    result.template_path,
+                    len(result.placeholders) if result.placeholders is not None else '?',
+                    result.duration * 1000,
+                ))
+        elapsed = time.time() - start
+
+        if verbosity:
+            self.stdout.write('Checked {0} templates in {1:.1f} s, {2} failed.'.format(
+                len(template_paths), elapsed, len(failures)
+            ))
+            if options['write']:
+                self.stdout.write('Stored the analysis for {0} layouts.'.format(stored))
+        for result in failures:
+            for error in result.errors:
+                self.stderr.write('{0}: {1}'.format(result.template_path, error))
+        if failures:
+            raise CommandError('{0} templates have errors.'.format(len(failures)))
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from .... import export
+
+
+class Command(BaseCommand):
+    """
+    Write the layouts and fluent pages with their content as JSON lines.
+
+    See the `export` module for the format of the records.
+    """
+    help = 'Write the layouts and fluent pages with their content as JSON lines.'
+
+    def add_arguments(self, parser):
+        """
+        Add the command arguments and options.
+
+        :param parser: Argument parser.
+        :return: None.
+        """
+        parser.add_argument(
+            '--output', metavar='PATH',
+            help='Path of the file to write (default: standard output).'
+        )
+        parser.add_argument(
+            '--site', type=int, action='append', metavar='ID', dest='sites',
+            help='Only export the pages of the site with this id, can be repeated.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500, dest='chunk_size',
+            help='Number of pages read per query (default: 500).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Export the pages and report the result.
+
+        :param args: Additional arguments.
+        :param options: Command options.
+        :return: None.
+        """
+        if options['output'] is None:
+            # The records are the only output, so it can be piped to a file.
+            export.export_pages(
+                self.stdout, site_ids=options['sites'], chunk_size=options['chunk_size']
+            )
+            return
+
+        try:
+            stream = open(options['output'], 'w')
+        except IOError as e:
+            raise CommandError(e)
+        with stream:
+            result = export.export_pages(
+                stream, site_ids=options['sites'], chunk_size=options['chunk_size']
+            )
+
+        if options['verbosity']:
+            self.stdout.write(
+                'Exported {0} layouts, {1} pages, {2} placeholders and {3} content items.'.format(
+                    *result
+                )
+            )
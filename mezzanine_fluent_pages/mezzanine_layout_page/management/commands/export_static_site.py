@@ -0,0 +1,102 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .... import staticsite
+
+
+class Command(BaseCommand):
+    """
+    Export the published fluent pages as static HTML files.
+
+    See the `staticsite` module for the files written and the incremental
+    export.
+    """
+    help = 'Export the published fluent pages as static HTML files.'
+
+    def add_arguments(self, parser):
+        """
+        Add the command options.
+
+        :param parser: Argument parser.
+        :return: None.
+        """
+        parser.add_argument('output_dir', help='Directory the pages are written to.')
+        parser.add_argument(
+            '--site', action='append', dest='sites', type=int, metavar='ID',
+            help='Only export pages of the site with this id, can be repeated.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of pages rendered at the same time (default: 4).'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Use worker processes instead of threads.'
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only export the pages that changed since the previous export.'
+        )
+        parser.add_argument(
+            '--scheme', choices=('http', 'https'),
+            help='Scheme the pages are requested with (default: https when '
+                 '`SECURE_SSL_REDIRECT` or `SESSION_COOKIE_SECURE` is set, otherwise http).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Export the pages and report the results.
+
+        :param args: Additional arguments.
+        :param options: Command options.
+        :return: None.
+        :raises CommandError: When pages failed to export.
+        """
+        verbosity = options['verbosity']
+        backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+        if options['incremental'] and backend.endswith(('LocMemCache', 'DummyCache')):
+            self.stderr.write(
+                'The default cache backend `{0}` does not keep the versions of the pages between '
+                'exports, every page will be exported again.'.format(backend)
+            )
+
+        # `None` leaves the scheme to the settings of the project.
+        secure = {'http': False, 'https': True}.get(options['scheme'])
+        start = time.time()
+        summary = staticsite.export_site(
+            options['output_dir'],
+            site_ids=options['sites'],
+            workers=options['workers'],
+            processes=options['processes'],
+            incremental=options['incremental'],
+            secure=secure,
+        )
+        elapsed = time.time() - start
+
+        failures = [result for result in summary.results if result.error is not None]
+        if verbosity > 1:
+            for result in sorted(summary.results, key=lambda result: result.page_id):
+                self.stdout.write('{0} {1} -> {2} ({3:.0f} ms)'.format(
+                    result.status_code or 'ERROR',
+                    result.url,
+                    result.file_path,
+                    result.duration * 1000,
+                ))
+        if verbosity:
+            self.stdout.write(
+                'Exported {0} pages in {1:.1f} s, {2} unchanged, {3} removed, {4} failed.'.format(
+                    len(summary.results) - len(failures),
+                    elapsed,
+                    summary.unchanged,
+                    summary.removed,
+                    len(failures),
+                )
+            )
+        for result in failures:
+            self.stderr.write('Failed to export {0} (page {1}): {2}'.format(
+                result.url, result.page_id, result.error
+            ))
+        if failures:
+            raise CommandError('{0} pages failed to export.'.format(len(failures)))
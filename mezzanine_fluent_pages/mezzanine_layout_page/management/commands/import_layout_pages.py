@@ -0,0 +1,68 @@
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import bulkimport
+
+
+class Command(BaseCommand):
+    """
+    Create layout pages and their content in bulk from a JSON lines file.
+
+    See the `bulkimport` module for the format of the records.
+    """
+    help = 'Create layout pages and their content in bulk from a JSON lines file.'
+
+    def add_arguments(self, parser):
+        """
+        Add the command arguments and options.
+
+        :param parser: Argument parser.
+        :return: None.
+        """
+        parser.add_argument(
+            'path',
+            help='Path of the JSON lines file, `-` to read from standard input.'
+        )
+        parser.add_argument(
+            '--site', type=int, metavar='ID',
+            help='Create the pages for the site with this id (default: the current site).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500, dest='batch_size',
+            help='Number of pages created per transaction (default: 500).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Import the pages and report the result.
+
+        :param args: Additional arguments.
+        :param options: Command options.
+        :return: None.
+        """
+        if options['path'] == '-':
+            lines = sys.stdin
+        else:
+            try:
+                lines = io.open(options['path'], encoding='utf-8')
+            except IOError as e:
+                raise CommandError(e)
+
+        try:
+            result = bulkimport.import_layout_pages(
+                lines, site_id=options['site'], batch_size=options['batch_size']
+            )
+        except bulkimport.BulkImportError as e:
+            raise CommandError(
+                '{0} The pages of the batches before this line have been created.'.format(e)
+            )
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+
+        if options['verbosity']:
+            self.stdout.write('Created {0} pages, {1} placeholders and {2} content items.'.format(
+                *result
+            ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from .... import search
+
+
+class Command(BaseCommand):
+    """
+    Store the search text of all fluent pages again.
+
+    Both `FluentContentsPage` and `FluentContentsLayoutPage` objects are
+    updated, when their apps are installed. See the `search` module.
+    """
+    help = 'Store the search text of all fluent pages again.'
+
+    def add_arguments(self, parser):
+        """
+        Add the command options.
+
+        :param parser: Argument parser.
+        :return: None.
+        """
+        parser.add_argument(
+            '--chunk-size', type=int, default=500, dest='chunk_size',
+            help='Number of pages whose text is built at once (default: 500).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Store the search text and report the number of pages.
+
+        :param args: Additional arguments.
+        :param options: Command options.
+        :return: None.
+        """
+        count = search.rebuild_search_texts(chunk_size=options['chunk_size'])
+        if options['verbosity']:
+            self.stdout.write('Stored the search text of {0} pages.'.format(count))
@@ -0,0 +1,127 @@
+import collections
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from .... import rendering
+
+
+class Command(BaseCommand):
+    """
+    Render the published fluent pages to fill the page and placeholder caches.
+
+    Both `FluentContentsPage` and `FluentContentsLayoutPage` objects are
+    rendered, when their apps are installed.
+    """
+    help = 'Render the published fluent pages to fill the page and placeholder caches.'
+
+    def add_arguments(self, parser):
+        """
+        Add the command options.
+
+        :param parser: Argument parser.
+        :return: None.
+        """
+        parser.add_argument(
+            '--layout', action='append', dest='layouts', metavar='KEY',
+            help='Only render layout pages using the layout with this key, can be repeated.'
+        )
+        parser.add_argument(
+            '--site', action='append', dest='sites', type=int, metavar='ID',
+            help='Only render pages of the site with this id, can be repeated.'
+        )
+        parser.add_argument(
+            '--subtree', metavar='SLUG',
+            help='Only render the page with this slug and its descendants.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of pages rendered at the same time (default: 4).'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Use worker processes instead of threads.'
+        )
+        parser.add_argument(
+            '--scheme', choices=('http', 'https'),
+            help='Scheme the pages are requested with (default: https when '
+                 '`SECURE_SSL_REDIRECT` or `SESSION_COOKIE_SECURE` is set, otherwise http).'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Render the pages and report the results.
+
+        :param args: Additional arguments.
+        :param options: Command options.
+        :return: None.
+        """
+        verbosity = options['verbosity']
+        backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+        if backend.endswith(('LocMemCache', 'DummyCache')):
+            self.stderr.write(
+                'The default cache backend `{0}` is not shared with the web server processes, '
+                'rendering the pages will not warm their caches.'.format(backend)
+            )
+
+        # `None` leaves the scheme to the settings of the project.
+        secure = {'http': False, 'https': True}.get(options['scheme'])
+        tasks = rendering.get_page_tasks(
+            layout_keys=options['layouts'],
+            site_ids=options['sites'],
+            subtree=options['subtree'],
+            secure=secure,
+        )
+        if verbosity:
+            self.stdout.write('Rendering {0} pages.'.format(len(tasks)))
+
+        durations = collections.defaultdict(list)
+        failures = []
+        start = time.time()
+        for result in rendering.render_pages(
+            tasks, workers=options['workers'], processes=options['processes']
+        ):
+            durations[result.layout].append(result.duration)
+            if result.error is not None:
+                failures.append(result)
+            if verbosity > 1:
+                self.stdout.write('{0} {1} ({2:.0f} ms)'.format(
+                    result.status_code or 'ERROR', result.url, result.duration * 1000
+                ))
+        elapsed = time.time() - start
+
+        if verbosity:
+            self.stdout.write(
+                'Rendered {0} pages in {1:.1f} s ({2:.1f} pages/s), {3} failed.'.format(
+                    len(tasks), elapsed, len(tasks) / elapsed if elapsed else 0, len(failures)
+                )
+            )
+            self.write_layout_timings(durations)
+        for result in failures:
+            self.stderr.write('Failed to render {0} (page {1}): {2}'.format(
+                result.url, result.page_id, result.error
+            ))
+
+    def write_layout_timings(self, durations):
+        """
+        Write the render time statistics per layout.
+
+        :param durations: Dictionary of lists of render times in seconds
+        by layout key, `None` for pages without a layout.
+        :return: None.
+        """
+        if not durations:
+            return
+
+        self.stdout.write('{0:<30} {1:>8} {2:>10} {3:>10}'.format(
+            'Layout', 'Pages', 'Mean (ms)', 'Max (ms)'
+        ))
+        for layout in sorted(durations, key=lambda key: key or ''):
+            layout_durations = durations[layout]
+            self.stdout.write('{0:<30} {1:>8} {2:>10.0f} {3:>10.0f}'.format(
+                layout or '(no layout)',
+                len(layout_durations),
+                sum(layout_durations) / len(layout_durations) * 1000,
+                max(layout_durations) * 1000,
+            ))
@@ -0,0 +1,47 @@
+from django.db.models import Case, Count, IntegerField, QuerySet, Sum, Value, When
+from mezzanine.pages.managers import PageManager
+
+
+class FluentContentsLayoutPageManager(PageManager):
+    """
+    Manager for `FluentContentsLayoutPage`.
+    """
+    def with_layout(self):
+        """
+        Return a queryset that loads the layout along with the pages.
+
+        :return: QuerySet.
+        """
+        return self.get_queryset().select_related('layout')
+
+
+class PageLayoutQuerySet(QuerySet):
+    """
+    QuerySet of `PageLayout`.
+    """
+    def with_page_counts(self, site_id=None):
+        """
+        Annotate the number of pages using each layout, in a single query.
+
+        The pages of all sites are counted in `page_count`, those of a
+        site in `site_page_count` when a site is given.
+
+        :param site_id: Primary key of the site to count the pages of.
+        :return: QuerySet.
+        """
+        counts = {'page_count': Count('fluentcontentslayoutpage')}
+        if site_id is not None:
+            counts['site_page_count'] = Sum(Case(
+                When(fluentcontentslayoutpage__site_id=site_id, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            ))
+        return self.annotate(**counts)
+
+    def in_use(self):
+        """
+        Return the layouts used by pages of any site.
+
+        :return: QuerySet.
+        """
+        return self.filter(fluentcontentslayoutpage__isnull=False).distinct()
@@ -0,0 +1,48 @@
+from django.template import TemplateDoesNotExist
+
+from .. import instrumentation
+
+try:
+    from django.utils.deprecation import MiddlewareMixin
+except ImportError:
+    # `Django<1.10` middleware are plain classes.
+    MiddlewareMixin = object
+
+
+class LayoutTemplateMiddleware(MiddlewareMixin):
+    """
+    Render layout pages with the compiled template cached on the layout.
+
+    Mezzanine's page view hands a list of template names to its
+    `TemplateResponse`, which makes the template loaders find, read and
+    parse the layout template on every request unless the cached template
+    loader is enabled. This middleware swaps in the template kept by
+    `PageLayout.get_template()`.
+    """
+    def process_template_response(self, request, response):
+        """
+        Replace the template names of a layout page response.
+
+        :param request: Django request object.
+        :param response: TemplateResponse object.
+        :return: TemplateResponse object.
+        """
+        template_name = response.template_name
+        page = getattr(request, 'page', None)
+        if (
+            not isinstance(template_name, (list, tuple)) or
+            not template_name or
+            page is None or
+            page.content_model != 'fluentcontentslayoutpage'
+        ):
+            return response
+
+        layout = page.get_content_model().layout
+        # Only responses of the page view start with the layout template.
+        if template_name[0] == layout.template_path:
+            try:
+                with instrumentation.phase_timer('layout'):
+                    response.template_name = layout.get_template()
+            except TemplateDoesNotExist:
+                pass
+        return response
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mezzanine_layout_page', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagelayout',
+            name='placeholder_data',
+            field=models.TextField(editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='pagelayout',
+            name='template_hash',
+            field=models.CharField(max_length=40, editable=False, blank=True),
+        ),
+    ]
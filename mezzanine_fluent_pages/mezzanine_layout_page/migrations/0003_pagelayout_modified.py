@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mezzanine_layout_page', '0002_pagelayout_placeholder_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagelayout',
+            name='modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='modified', auto_now=True),
+            preserve_default=False,
+        ),
+    ]
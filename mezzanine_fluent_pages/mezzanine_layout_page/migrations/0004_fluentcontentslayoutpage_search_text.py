@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mezzanine_layout_page', '0003_pagelayout_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fluentcontentslayoutpage',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
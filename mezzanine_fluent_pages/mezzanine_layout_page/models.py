@@ -1,10 +1,18 @@
+import datetime
+import json
+
 from django.db import models
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
 from django.template.loader import get_template
+from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
+from fluent_contents.analyzer import get_template_placeholder_data
+from fluent_contents.models import PlaceholderData
 from mezzanine.pages.models import Page
 
-from . import appsettings, fields
+from .. import cache
+from . import analysis, appsettings, fields, managers, templatefiles
 
 
 @python_2_unicode_compatible
@@ -24,16 +32,134 @@ class PageLayout(models.Model):
     )
     template_path = fields.TemplateFilePathField(
         'template file',
-        path=appsettings.MEZZANINE_PAGES_TEMPLATE_DIR
+        path=appsettings.get_template_dir
+    )
+    # Denormalised results of the template analysis, see `get_placeholder_data`.
+    placeholder_data = models.TextField(
+        editable=False,
+        blank=True
+    )
+    template_hash = models.CharField(
+        max_length=40,
+        editable=False,
+        blank=True
     )
+    modified = models.DateTimeField(
+        _('modified'),
+        auto_now=True,
+        editable=False
+    )
+
+    objects = managers.PageLayoutQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        """
+        Analyse the template before saving the layout.
+
+        A missing or broken template is not an error here, the analysis is
+        retried when the placeholder data is requested.
+
+        :param args: Additional arguments.
+        :param kwargs: Additional keyword arguments.
+        :return: None.
+        """
+        try:
+            self.update_placeholder_data()
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            self.placeholder_data = ''
+            self.template_hash = ''
+        super(PageLayout, self).save(*args, **kwargs)
 
     def get_template(self):
         """
         Return the template to render this layout.
 
+        The compiled template is kept in memory and reused until the layout
+        is saved or the template file changes.
+
         :return: Template object.
         """
-        return get_template(self.template_path)
+        if self.pk is None:
+            return get_template(self.template_path)
+        return templatefiles.layout_templates.get(self.pk, self.template_path, get_template)
+
+    def get_last_modified(self):
+        """
+        Return when the layout or its template file was last changed.
+
+        :return: Aware datetime.
+        """
+        last_modified = self.modified
+        if last_modified is not None and timezone.is_naive(last_modified):
+            last_modified = timezone.make_aware(last_modified, timezone.get_default_timezone())
+        mtime = templatefiles.get_template_file_mtime(self.template_path)
+        if mtime is not None:
+            template_modified = datetime.datetime.fromtimestamp(mtime, timezone.utc)
+            if last_modified is None or template_modified > last_modified:
+                last_modified = template_modified
+        return last_modified
+
+    def get_placeholder_data(self):
+        """
+        Return the placeholders that are defined in the layout template.
+
+        The stored analysis is used unless the template file changed since
+        it was made, in which case the template is analysed and the result
+        stored again.
+
+        :return: list of `~fluent_contents.models.PlaceholderData`
+        """
+        if (
+            not self.placeholder_data or
+            self.template_hash != (templatefiles.get_template_file_hash(self.template_path) or '')
+        ):
+            self.update_placeholder_data()
+            if self.pk:
+                PageLayout.objects.filter(pk=self.pk).update(
+                    placeholder_data=self.placeholder_data,
+                    template_hash=self.template_hash,
+                )
+
+        return [PlaceholderData(**data) for data in json.loads(self.placeholder_data)]
+
+    def update_placeholder_data(self):
+        """
+        Analyse the template and store the placeholders on the instance.
+
+        An analysis of the same version of the template made by another
+        process or layout is reused, see the `analysis` module. The
+        instance is not saved.
+
+        :return: None.
+        """
+        self.template_hash = templatefiles.get_template_file_hash(self.template_path) or ''
+        self.placeholder_data = json.dumps(analysis.get_placeholders(
+            self.template_path, self.template_hash, self.analyse_template
+        ))
+
+    def analyse_template(self):
+        """
+        Find the placeholders of the layout template.
+
+        :return: List of placeholder dictionaries.
+        """
+        return [
+            {
+                'slot': placeholder.slot,
+                'title': placeholder.title,
+                'role': placeholder.role,
+                'fallback_language': placeholder.fallback_language,
+            }
+            for placeholder in get_template_placeholder_data(self.get_template())
+        ]
+
+    def is_in_use(self):
+        """
+        Whether pages of any site use the layout.
+
+        :return: Boolean.
+        """
+        return FluentContentsLayoutPage._base_manager.filter(layout=self).exists()
 
     def __str__(self):
         return self.title
@@ -52,6 +178,15 @@ class FluentContentsLayoutPage(Page):
         'mezzanine_layout_page.PageLayout',
         verbose_name=_('Layout'),
     )
+    # Denormalised text of the content items, see the `search` module.
+    search_text = models.TextField(
+        editable=False,
+        blank=True
+    )
+
+    objects = managers.FluentContentsLayoutPageManager()
+
+    search_fields = ('search_text',)
 
     class Meta:
         permissions = (
@@ -65,3 +200,14 @@ class FluentContentsLayoutPage(Page):
         :return: Template file path.
         """
         return self.layout.template_path
+
+    def get_cache_dependencies(self):
+        """
+        Obtain what the rendered page depends on, for the page cache.
+
+        :return: Tuple of a list of tags and a list of template file paths.
+        """
+        return (
+            [cache.get_page_tag(self.pk), cache.get_layout_tag(self.layout_id)],
+            [templatefiles.get_template_file_path(self.layout.template_path)]
+        )
@@ -0,0 +1,30 @@
+from mezzanine.pages.models import Page
+from mezzanine.pages.page_processors import processor_for
+
+from .. import instrumentation
+from . import models
+
+
+@processor_for(models.FluentContentsLayoutPage)
+def load_layout(request, page):
+    """
+    Load the content model of a layout page together with its layout.
+
+    `PageMiddleware` fetches the `Page` without its content model, which
+    would otherwise cost a query for the content model and another one for
+    the layout when the page view asks for the template name. The content
+    model is stored in the cache of the `Page` relation so that
+    `get_content_model()` uses it.
+
+    :param request: Django request object.
+    :param page: `Page` object being rendered.
+    :return: None.
+    """
+    cache_name = Page._meta.get_field('fluentcontentslayoutpage').get_cache_name()
+    if not hasattr(page, cache_name):
+        with instrumentation.phase_timer('layout_page'):
+            setattr(
+                page,
+                cache_name,
+                models.FluentContentsLayoutPage.objects.with_layout().get(pk=page.pk)
+            )
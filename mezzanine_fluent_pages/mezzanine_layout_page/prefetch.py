@@ -0,0 +1,139 @@
+"""
+Loading the placeholders and content items of a page at once.
+
+Rendering a placeholder through `fluent_contents` costs a query for the
+placeholder, one for its content items and one per content item type in
+it, for every placeholder of the layout. The first placeholder of a page
+that is not served from the output cache instead loads the placeholders
+and content items of every slot of the page, in a query for the
+placeholders, one for the content items and one per content item type.
+They are kept for the rest of the template render, so the other
+placeholders render from memory.
+"""
+from fluent_contents.models import ContentItem, Placeholder
+from fluent_contents.rendering import markers
+from fluent_contents.rendering.core import PlaceholderRenderingPipe
+
+# Key of the placeholder content of parent objects in the render context.
+RENDER_CONTEXT_KEY = 'mezzanine_fluent_pages.placeholder_content'
+
+
+class PrefetchedItems(list):
+    """
+    The content items of a placeholder, already loaded as their own type.
+
+    The rendering pipe of `fluent_contents` uses the cached output of the
+    items of a queryset and loads the remaining items as their own type,
+    this list passes for such a queryset without querying again.
+    """
+    polymorphic_disabled = True
+    _result_cache = True
+
+    def non_polymorphic(self):
+        return self
+
+    def get_real_instances(self, items):
+        return items
+
+
+class PlaceholderContent(object):
+    """
+    The placeholders and content items of a parent object.
+    """
+    def __init__(self, parent):
+        """
+        Load the placeholders and content items of a parent object.
+
+        :param parent: Model object with placeholders.
+        :return: None.
+        """
+        placeholders = list(Placeholder.objects.parent(parent))
+        self.placeholders = {placeholder.slot: placeholder for placeholder in placeholders}
+        self.items = {placeholder.pk: PrefetchedItems() for placeholder in placeholders}
+        if not placeholders:
+            return
+
+        # A query for the content items and one per content item type.
+        by_id = {placeholder.pk: placeholder for placeholder in placeholders}
+        placeholder_cache_name = ContentItem._meta.get_field('placeholder').get_cache_name()
+        for item in ContentItem.objects.parent(parent, limit_parent_language=True):
+            placeholder = by_id.get(item.placeholder_id)
+            if placeholder is None:
+                continue
+            setattr(item, placeholder_cache_name, placeholder)
+            self.items[placeholder.pk].append(item)
+
+
+def get_placeholder_content(context, parent):
+    """
+    Return the placeholder content of a parent object, loading it on first use.
+
+    The content is kept in the render context, which lasts for the render
+    of a template and the templates it extends (an included template has a
+    render context of its own), so later renders of the same page object
+    load the content again.
+
+    :param context: Template context.
+    :param parent: Model object with placeholders.
+    :return: `PlaceholderContent` object.
+    """
+    contents = context.render_context.setdefault(RENDER_CONTEXT_KEY, {})
+    key = (parent._meta.concrete_model, parent.pk)
+    content = contents.get(key)
+    if content is None:
+        content = contents[key] = PlaceholderContent(parent)
+    return content
+
+
+class PrefetchedRenderingPipe(PlaceholderRenderingPipe):
+    """
+    Render placeholders from their prefetched content items.
+    """
+    def __init__(self, request, content, edit_mode=None):
+        """
+        :param request: Django request object.
+        :param content: `PlaceholderContent` of the parent object.
+        :param edit_mode: Whether to render for the front end edit mode.
+        :return: None.
+        """
+        super(PrefetchedRenderingPipe, self).__init__(request, edit_mode=edit_mode)
+        self.content = content
+
+    def _get_placeholder_items(
+        self, placeholder, parent_object, limit_parent_language, fallback_language, try_cache
+    ):
+        items = self.content.items.get(placeholder.pk)
+        if items is None or not limit_parent_language or (fallback_language and not items):
+            # Only the items in the language of the parent are prefetched.
+            return super(PrefetchedRenderingPipe, self)._get_placeholder_items(
+                placeholder, parent_object, limit_parent_language, fallback_language, try_cache
+            )
+        return items, False
+
+
+def render_placeholder(request, content, placeholder, parent, template_name=None, cachable=None,
+                       fallback_language=None):
+    """
+    Render a placeholder from the prefetched content of its parent.
+
+    :param request: Django request object.
+    :param content: `PlaceholderContent` of the parent object.
+    :param placeholder: `Placeholder` object of the content.
+    :param parent: Model object with placeholders.
+    :param template_name: Template used to join the output of the items.
+    :param cachable: Whether the output may be cached.
+    :param fallback_language: Language to render when the placeholder has
+    no items in the language of the parent, `True` for the default language.
+    :return: `ContentItemOutput`.
+    """
+    output = PrefetchedRenderingPipe(request, content).render_placeholder(
+        placeholder=placeholder,
+        parent_object=parent,
+        template_name=template_name,
+        cachable=cachable,
+        limit_parent_language=True,
+        fallback_language=fallback_language
+    )
+    if markers.is_edit_mode(request):
+        output.html = markers.wrap_placeholder_output(output.html, placeholder)
+    return output
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .. import cache
+from ..receivers import get_page_placeholders
+from . import models, templatefiles
+
+
+@receiver(post_save, sender=models.PageLayout)
+@receiver(post_delete, sender=models.PageLayout)
+def clear_layout_template(sender, instance, **kwargs):
+    """
+    Forget the compiled template and make the cached pages of a layout that changed stale.
+
+    :param sender: `PageLayout` class.
+    :param instance: `PageLayout` object that changed.
+    :param kwargs: Additional keyword arguments.
+    :return: None.
+    """
+    templatefiles.layout_templates.clear(instance.pk)
+    cache.expire_tags([cache.get_layout_tag(instance.pk)])
+
+
+@receiver(post_save, sender=models.PageLayout)
+def clear_layout_output(sender, instance, **kwargs):
+    """
+    Remove the cached placeholder output of the pages using a layout that changed.
+
+    :param sender: `PageLayout` class.
+    :param instance: `PageLayout` object that changed.
+    :param kwargs: Additional keyword arguments.
+    :return: None.
+    """
+    page_ids = models.FluentContentsLayoutPage._base_manager.filter(
+        layout=instance
+    ).values('pk')
+    cache.clear_placeholder_output(get_page_placeholders(page_ids))
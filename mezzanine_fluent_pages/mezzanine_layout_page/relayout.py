@@ -0,0 +1,244 @@
+"""
+Moving layout pages to another layout in bulk.
+
+Changing the layout of a page in the admin moves the content items of the
+placeholders the new layout lacks to another placeholder in the browser,
+see `cp_plugins.get_new_placeholder_pane` of `fluent_contents`. The same
+rules are applied here to every page of a layout at once:
+
+1. A placeholder keeps its slot when the new layout has it.
+2. Otherwise it moves to the placeholder of the new layout with the same
+   role, the n-th placeholder of a role in the old layout to the n-th one
+   of the role in the new layout (or the last one there is).
+3. Otherwise it moves to the only placeholder of the new layout.
+4. Otherwise it is left as it is, the admin shows its items as orphaned.
+
+A placeholder is moved by renaming it when the page has no placeholder
+for the new slot yet, or else by moving its content items to the end of
+that placeholder and deleting it. Each batch of pages is moved in a
+transaction with an update per new slot and an update of the moved
+content items, whatever the number of pages in the batch.
+"""
+import collections
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Min, Value, When
+from fluent_contents.models import ContentItem, Placeholder
+
+from .. import cache, utils
+from . import models
+
+# Number of moved placeholders per update of the content items, each costs four parameters.
+MOVE_BATCH_SIZE = utils.LOOKUP_BATCH_SIZE // 5
+
+# The number of objects changed by a relayout.
+RelayoutResult = collections.namedtuple(
+    'RelayoutResult', ('pages', 'placeholders', 'content_items')
+)
+
+
+def get_slot_mapping(old_placeholders, new_placeholders):
+    """
+    Return where the placeholders of the old layout move to in the new layout.
+
+    :param old_placeholders: List of `PlaceholderData` of the old layout.
+    :param new_placeholders: List of `PlaceholderData` of the new layout.
+    :return: Dictionary of the new `PlaceholderData` or `None` by old slot.
+    """
+    new_slots = {placeholder.slot: placeholder for placeholder in new_placeholders}
+    by_role = collections.defaultdict(list)
+    for placeholder in new_placeholders:
+        by_role[placeholder.role].append(placeholder)
+
+    mapping = {}
+    roles_seen = collections.Counter()
+    for placeholder in old_placeholders:
+        roles_seen[placeholder.role] += 1
+        if placeholder.slot in new_slots:
+            mapping[placeholder.slot] = new_slots[placeholder.slot]
+        elif by_role[placeholder.role]:
+            candidates = by_role[placeholder.role]
+            mapping[placeholder.slot] = candidates[
+                min(roles_seen[placeholder.role], len(candidates)) - 1
+            ]
+        elif len(new_placeholders) == 1:
+            mapping[placeholder.slot] = new_placeholders[0]
+        else:
+            mapping[placeholder.slot] = None
+    return mapping
+
+
+class Relayout(object):
+    """
+    Move the pages of a layout to another layout.
+    """
+    def __init__(self, old_layout, new_layout, batch_size=500):
+        """
+        :param old_layout: `PageLayout` the pages use.
+        :param new_layout: `PageLayout` to move the pages to.
+        :param batch_size: Number of pages moved per transaction.
+        :return: None.
+        :raises TemplateDoesNotExist: When a layout template is missing.
+        :raises TemplateSyntaxError: When a layout template has a syntax error.
+        """
+        self.old_layout = old_layout
+        self.new_layout = new_layout
+        self.batch_size = batch_size
+        self.page_type = ContentType.objects.get_for_model(models.FluentContentsLayoutPage)
+        self.new_placeholders = new_layout.get_placeholder_data()
+        old_placeholders = old_layout.get_placeholder_data()
+        self.mapping = get_slot_mapping(old_placeholders, self.new_placeholders)
+        self.positions = {placeholder.slot: i for i, placeholder in enumerate(old_placeholders)}
+
+    def get_target(self, slot, role):
+        """
+        Return where a placeholder of a page moves to.
+
+        :param slot: Slot name of the placeholder.
+        :param role: Role of the placeholder.
+        :return: `PlaceholderData` of the new layout or `None`.
+        """
+        if slot not in self.mapping:
+            # A placeholder the old layout does not define, moved like the first of its role.
+            placeholder = Placeholder(slot=slot, role=role)
+            self.mapping.update(get_slot_mapping([placeholder], self.new_placeholders))
+        return self.mapping[slot]
+
+    def run(self, page_ids=None):
+        """
+        Move the pages of the old layout to the new layout.
+
+        :param page_ids: Only move these pages of the old layout.
+        :return: `RelayoutResult` tuple.
+        """
+        pages = models.FluentContentsLayoutPage._base_manager.filter(
+            layout=self.old_layout
+        ).order_by('pk')
+        if page_ids is not None:
+            pages = pages.filter(pk__in=page_ids)
+
+        totals = collections.Counter()
+        last_pk = None
+        while True:
+            batch = pages if last_pk is None else pages.filter(pk__gt=last_pk)
+            batch = list(batch.values_list('pk', flat=True)[:self.batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1]
+            with transaction.atomic():
+                placeholders, content_items = self.move_pages(batch)
+            totals['pages'] += len(batch)
+            totals['placeholders'] += placeholders
+            totals['content_items'] += content_items
+        return RelayoutResult(totals['pages'], totals['placeholders'], totals['content_items'])
+
+    def move_pages(self, page_ids):
+        """
+        Move a batch of pages to the new layout.
+
+        :param page_ids: Primary keys of the pages.
+        :return: Tuple of the numbers of moved placeholders and content items.
+        """
+        placeholders = list(Placeholder.objects.filter(
+            parent_type=self.page_type, parent_id__in=page_ids
+        ).values_list('pk', 'parent_id', 'slot', 'role'))
+        # In the order of the old layout, so the first placeholder of a role is renamed.
+        placeholders.sort(key=lambda placeholder: (
+            self.positions.get(placeholder[2], len(self.positions)), placeholder[0]
+        ))
+        # The placeholders of the pages by slot, extended with the slots they are renamed to.
+        new_slots = {(parent_id, slot): pk for pk, parent_id, slot, role in placeholders}
+        updated = collections.defaultdict(list)
+        renamed = 0
+        moves = {}
+        for pk, parent_id, slot, role in placeholders:
+            target = self.get_target(slot, role)
+            if target is None:
+                continue
+            if target.slot == slot:
+                updated[slot].append(pk)
+            elif (parent_id, target.slot) in new_slots:
+                moves[pk] = new_slots[parent_id, target.slot]
+            else:
+                new_slots[parent_id, target.slot] = pk
+                updated[target.slot].append(pk)
+                renamed += 1
+
+        for placeholder in self.new_placeholders:
+            for ids in utils.batches(updated[placeholder.slot]):
+                Placeholder.objects.filter(pk__in=ids).update(
+                    slot=placeholder.slot, role=placeholder.role, title=placeholder.title
+                )
+        moved = self.move_content_items(moves)
+        if moves:
+            Placeholder.objects.filter(pk__in=list(moves)).delete()
+        models.FluentContentsLayoutPage._base_manager.filter(pk__in=page_ids).update(
+            layout=self.new_layout
+        )
+
+        # Bulk updates send no signals, clear the output of the pages as the receivers would.
+        cache.clear_placeholder_output(
+            [(parent_id, slot) for pk, parent_id, slot, role in placeholders] + list(new_slots)
+        )
+        cache.expire_tags([cache.get_page_tag(page_id) for page_id in page_ids])
+        return renamed + len(moves), moved
+
+    def move_content_items(self, moves):
+        """
+        Move the content items of placeholders to the end of other placeholders.
+
+        :param moves: Dictionary of target placeholder ids by source placeholder id.
+        :return: Number of moved content items.
+        """
+        if not moves:
+            return 0
+
+        # The range of sort orders of the sources and targets.
+        sort_orders = {}
+        for ids in utils.batches(list(moves) + list(set(moves.values()))):
+            # Without the default ordering, which would be added to the grouping.
+            rows = ContentItem._base_manager.filter(placeholder_id__in=ids).order_by().values_list(
+                'placeholder_id'
+            ).annotate(Min('sort_order'), Max('sort_order'))
+            for placeholder_id, min_sort_order, max_sort_order in rows:
+                sort_orders[placeholder_id] = (min_sort_order, max_sort_order)
+
+        # The items of every source follow those already in the target.
+        next_sort_orders = {
+            target: sort_orders[target][1] + 1 if target in sort_orders else 0
+            for target in moves.values()
+        }
+        offsets = {}
+        for source in sorted(moves):
+            if source not in sort_orders:
+                continue
+            target = moves[source]
+            min_sort_order, max_sort_order = sort_orders[source]
+            offsets[source] = next_sort_orders[target] - min_sort_order
+            next_sort_orders[target] = max_sort_order + offsets[source] + 1
+
+        moved = 0
+        for sources in utils.batches(sorted(offsets), MOVE_BATCH_SIZE):
+            targets = [When(placeholder_id=pk, then=Value(moves[pk])) for pk in sources]
+            shifts = [When(placeholder_id=pk, then=Value(offsets[pk])) for pk in sources]
+            moved += ContentItem._base_manager.filter(placeholder_id__in=sources).update(
+                placeholder=Case(*targets, output_field=IntegerField()),
+                sort_order=F('sort_order') + Case(*shifts, output_field=IntegerField())
+            )
+        return moved
+
+
+def relayout_pages(old_layout, new_layout, page_ids=None, batch_size=500):
+    """
+    Move the pages of a layout to another layout, remapping their placeholders.
+
+    :param old_layout: `PageLayout` the pages use.
+    :param new_layout: `PageLayout` to move the pages to.
+    :param page_ids: Only move these pages of the old layout.
+    :param batch_size: Number of pages moved per transaction.
+    :return: `RelayoutResult` tuple.
+    :raises TemplateDoesNotExist: When a layout template is missing.
+    :raises TemplateSyntaxError: When a layout template has a syntax error.
+    """
+    return Relayout(old_layout, new_layout, batch_size=batch_size).run(page_ids=page_ids)
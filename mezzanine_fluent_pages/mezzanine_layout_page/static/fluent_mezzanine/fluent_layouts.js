@@ -3,7 +3,8 @@
  * When a new layout is fetched, it is passed to the fluent_contents module to rebuild the tabs.
  */
 var fluent_layouts = {
-    'ct_id': null
+    'ct_id': null,
+    'layouts': {}
 };
 
 (function($)
@@ -11,6 +12,7 @@ var fluent_layouts = {
   var app_root = location.href.indexOf('/fluentcontentslayoutpage/') + 14;
   var ajax_root = location.href.substring(0, location.href.indexOf('/', app_root) + 1);
   var initial_layout_id = null;
+  var layouts_request = null;
 
   $.fn.ready( onReady );
 
@@ -26,6 +28,7 @@ var fluent_layouts = {
     if(layout_selector.length == 0)   // readonly field.
       return;
     fluent_layouts._select_single_option( layout_selector );
+    fluent_layouts.prefetch_layouts();
     layout_selector.change( fluent_layouts.onLayoutChange );
     fluent_contents.layout.onInitialize( fluent_layouts.fetch_layout_on_refresh );
   }
@@ -91,8 +94,45 @@ var fluent_layouts = {
   }
 
 
+  /**
+   * Fetch the metadata of all layouts at once,
+   * so switching layouts does not need a request.
+   */
+  fluent_layouts.prefetch_layouts = function()
+  {
+    var ct_id = parseInt(fluent_layouts.ct_id);
+    if(isNaN(ct_id))
+      return;
+
+    layouts_request = $.ajax({
+      url: ajax_root + "get_layouts/?ct_id=" + ct_id,
+      success: function(data, textStatus, xhr)
+      {
+        for( var i = 0; i < data.layouts.length; i++ )
+          fluent_layouts.layouts[ data.layouts[i].id ] = data.layouts[i];
+      },
+      dataType: 'json'
+    });
+  }
+
+
   fluent_layouts.fetch_layout = function(layout_id)
   {
+    // Use the prefetched layout info when available.
+    if( layouts_request && layouts_request.state() == 'pending' )
+    {
+      layouts_request.always(function() { fluent_layouts.fetch_layout(layout_id); });
+      return;
+    }
+
+    var layout = fluent_layouts.layouts[ parseInt(layout_id) ];
+    if( layout )
+    {
+      // Ask to update the tabs!
+      fluent_contents.layout.load( $.extend(true, {}, layout) );
+      return;
+    }
+
     // Get the ct_id from the template.
     var ct_id = parseInt(fluent_layouts.ct_id);
     if(isNaN(ct_id)) {
@@ -105,6 +145,8 @@ var fluent_layouts = {
       url: ajax_root + "get_layout/" + parseInt(layout_id) + "/?ct_id=" + ct_id,
       success: function(layout, textStatus, xhr)
       {
+        fluent_layouts.layouts[ layout.id ] = $.extend(true, {}, layout);
+
         // Ask to update the tabs!
         fluent_contents.layout.load(layout);
       },
@@ -0,0 +1,377 @@
+import fnmatch
+import hashlib
+import os
+import re
+import threading
+import time
+
+from .. import utils
+from . import appsettings
+
+
+class TemplateIndex(object):
+    """
+    An in memory index of the template files found below a directory.
+
+    The directory tree is walked once when the index is first used. The
+    modification time of every directory is recorded during the walk so
+    later lookups only need to `stat` the known directories; only the
+    directories which changed since they were last listed are listed
+    again.
+    """
+    # Directories modified this close (in seconds) to the moment they were
+    # listed are listed again on the next check, as a change within the
+    # timestamp granularity of the file system would go unnoticed otherwise.
+    racy_interval = 2
+
+    def __init__(self, path, match=None, max_depth=None, exclude=(), check_interval=0):
+        """
+        Configure the index, the directory is not read until it is used.
+
+        :param path: Directory to index.
+        :param match: Regular expression file names need to match.
+        :param max_depth: Number of directory levels below `path` to
+        descend into, `None` for no limit.
+        :param exclude: Glob patterns of relative paths to leave out,
+        patterns ending with a `/` match directories.
+        :param check_interval: Number of seconds between checks of the
+        directory modification times.
+        :return: None.
+        """
+        self.path = path
+        self.match_re = re.compile(match) if match is not None else None
+        self.max_depth = max_depth
+        self.exclude = tuple(exclude)
+        self.check_interval = check_interval
+
+        self._lock = threading.RLock()
+        self._directories = {}
+        self._files = None
+        self._checked_at = None
+
+    def get_files(self):
+        """
+        Return the absolute paths of the indexed files.
+
+        The index is built on first use and brought up to date when the
+        modification time of a known directory has changed.
+
+        :return: Sorted tuple of file paths.
+        """
+        with self._lock:
+            if self._files is None:
+                self.refresh()
+            elif time.time() - self._checked_at >= self.check_interval:
+                self._update()
+            return self._files
+
+    def refresh(self):
+        """
+        Discard the index and walk the directory again.
+
+        :return: None.
+        """
+        with self._lock:
+            self._directories = {}
+            self._list_directory('', 0)
+            self._collect()
+
+    def _update(self):
+        """
+        List the directories that changed since they were last listed.
+
+        :return: None.
+        """
+        changed = False
+        for relative_path in sorted(self._directories):
+            directory = self._directories.get(relative_path)
+            if directory is None:
+                # Removed along with a parent directory.
+                continue
+
+            try:
+                mtime = os.stat(os.path.join(self.path, relative_path)).st_mtime
+            except OSError:
+                self._remove_directory(relative_path)
+                changed = True
+                continue
+
+            if mtime != directory['mtime'] or directory['racy']:
+                self._list_directory(relative_path, directory['depth'])
+                changed = True
+
+        if changed:
+            self._collect()
+        self._checked_at = time.time()
+
+    def _list_directory(self, relative_path, depth):
+        """
+        Read a single directory and descend into any new sub directories.
+
+        :param relative_path: Directory path relative to the index root.
+        :param depth: Number of levels `relative_path` is below the root.
+        :return: None.
+        """
+        full_path = os.path.join(self.path, relative_path)
+        listed_at = time.time()
+        try:
+            mtime = os.stat(full_path).st_mtime
+            names = os.listdir(full_path)
+        except OSError:
+            self._remove_directory(relative_path)
+            return
+
+        files = []
+        sub_directories = []
+        for name in names:
+            name_path = os.path.join(full_path, name)
+            name_relative_path = os.path.join(relative_path, name)
+            if os.path.isdir(name_path):
+                if (
+                    not os.path.islink(name_path) and
+                    (self.max_depth is None or depth < self.max_depth) and
+                    not self._is_excluded(name_relative_path + '/')
+                ):
+                    sub_directories.append(name_relative_path)
+            elif (
+                (self.match_re is None or self.match_re.search(name)) and
+                not self._is_excluded(name_relative_path)
+            ):
+                files.append(name_path)
+
+        previous = self._directories.get(relative_path)
+        self._directories[relative_path] = {
+            'mtime': mtime,
+            'racy': listed_at - mtime < self.racy_interval,
+            'depth': depth,
+            'files': files,
+            'sub_directories': sub_directories,
+        }
+
+        if previous is not None:
+            for sub_directory in previous['sub_directories']:
+                if sub_directory not in sub_directories:
+                    self._remove_directory(sub_directory)
+
+        for sub_directory in sub_directories:
+            if sub_directory not in self._directories:
+                self._list_directory(sub_directory, depth + 1)
+
+    def _remove_directory(self, relative_path):
+        """
+        Drop a directory and everything below it from the index.
+
+        :param relative_path: Directory path relative to the index root.
+        :return: None.
+        """
+        directory = self._directories.pop(relative_path, None)
+        if directory is not None:
+            for sub_directory in directory['sub_directories']:
+                self._remove_directory(sub_directory)
+
+    def _is_excluded(self, relative_path):
+        """
+        Whether a relative path matches one of the exclude patterns.
+
+        The patterns are tested against both the full relative path and
+        the base name, so `includes/` excludes every directory named
+        `includes`.
+
+        :param relative_path: Path relative to the index root, with a
+        trailing `/` for directories.
+        :return: Boolean.
+        """
+        relative_path = relative_path.replace(os.sep, '/')
+        base_name = relative_path.rstrip('/').rsplit('/', 1)[-1]
+        if relative_path.endswith('/'):
+            base_name += '/'
+        for pattern in self.exclude:
+            if fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(base_name, pattern):
+                return True
+        return False
+
+    def _collect(self):
+        """
+        Rebuild the sorted file list from the indexed directories.
+
+        :return: None.
+        """
+        files = []
+        for directory in self._directories.values():
+            files.extend(directory['files'])
+        self._files = tuple(sorted(files))
+        self._checked_at = time.time()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_template_index(path, match=None):
+    """
+    Return the process wide `TemplateIndex` for a directory.
+
+    The index is configured from the `MEZZANINE_PAGES_TEMPLATE_*`
+    settings.
+
+    :param path: Directory to index.
+    :param match: Regular expression file names need to match.
+    :return: `TemplateIndex` instance.
+    """
+    exclude = tuple(appsettings.MEZZANINE_PAGES_TEMPLATE_EXCLUDE)
+    key = (
+        path,
+        match,
+        appsettings.MEZZANINE_PAGES_TEMPLATE_MAX_DEPTH,
+        exclude,
+        appsettings.MEZZANINE_PAGES_TEMPLATE_INDEX_CHECK_INTERVAL,
+    )
+    with _indexes_lock:
+        try:
+            return _indexes[key]
+        except KeyError:
+            index = _indexes[key] = TemplateIndex(
+                path,
+                match=match,
+                max_depth=appsettings.MEZZANINE_PAGES_TEMPLATE_MAX_DEPTH,
+                exclude=exclude,
+                check_interval=appsettings.MEZZANINE_PAGES_TEMPLATE_INDEX_CHECK_INTERVAL,
+            )
+            return index
+
+
+def refresh_template_indexes():
+    """
+    Walk the directories of every template index again.
+
+    :return: None.
+    """
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.refresh()
+
+
+def get_template_file_path(template_path):
+    """
+    Return the absolute file path of a layout template.
+
+    Relative template paths are resolved against
+    `MEZZANINE_PAGES_TEMPLATE_DIR`, the directory layouts are chosen from.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :return: Absolute file path.
+    :raises ImproperlyConfigured: When a relative path is given and no
+    template directory is configured.
+    """
+    if os.path.isabs(template_path):
+        return template_path
+    return os.path.join(appsettings.require_template_dir(), template_path)
+
+
+def get_template_file_version(template_path):
+    """
+    Return a version of a layout template file that changes with its content.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :return: Tuple of modification time and size, or `None` if the file
+    is missing.
+    """
+    return utils.get_file_version(get_template_file_path(template_path))
+
+
+def get_template_file_mtime(template_path):
+    """
+    Return the modification time of a layout template file.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :return: Timestamp or `None` if the file is missing.
+    """
+    version = get_template_file_version(template_path)
+    return version[0] if version is not None else None
+
+
+_hashes = {}
+_hashes_lock = threading.Lock()
+
+
+def get_template_file_hash(template_path):
+    """
+    Return a hash of the contents of a layout template file.
+
+    The hash is remembered per modification time and size of the file,
+    so an unchanged file costs a single `stat` call.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :return: Hexadecimal SHA1 string or `None` if the file is missing.
+    """
+    file_path = get_template_file_path(template_path)
+    version = get_template_file_version(template_path)
+    if version is None:
+        return None
+
+    with _hashes_lock:
+        cached = _hashes.get(file_path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    try:
+        with open(file_path, 'rb') as template_file:
+            file_hash = hashlib.sha1(template_file.read()).hexdigest()
+    except (IOError, OSError):
+        return None
+
+    with _hashes_lock:
+        _hashes[file_path] = (version, file_hash)
+    return file_hash
+
+
+class TemplateCache(object):
+    """
+    Compiled templates kept in memory per key (a layout pk).
+
+    A template is reused as long as the template path and the version of
+    the template file are unchanged. Templates which are not found below
+    `MEZZANINE_PAGES_TEMPLATE_DIR` have no version and are reused until
+    their key is cleared.
+    """
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, template_path, load):
+        """
+        Return the compiled template for a key, loading it when needed.
+
+        :param key: Key to store the template at.
+        :param template_path: Template path to load.
+        :param load: Function loading a template by path.
+        :return: Template object.
+        """
+        version = get_template_file_version(template_path)
+        with self._lock:
+            cached = self._templates.get(key)
+        if cached is not None and cached[:2] == (template_path, version):
+            return cached[2]
+
+        template = load(template_path)
+        with self._lock:
+            self._templates[key] = (template_path, version, template)
+        return template
+
+    def clear(self, key=None):
+        """
+        Forget the template of a key, or all templates.
+
+        :param key: Key to clear, `None` to clear everything.
+        :return: None.
+        """
+        with self._lock:
+            if key is None:
+                self._templates.clear()
+            else:
+                self._templates.pop(key, None)
+
+
+# The compiled templates of the `PageLayout` objects.
+layout_templates = TemplateCache()
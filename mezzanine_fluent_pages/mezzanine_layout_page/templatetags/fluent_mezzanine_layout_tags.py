@@ -0,0 +1,107 @@
+"""
+Template tags for layout templates, load them with:
+
+.. code-block:: html+django
+
+    {% load fluent_mezzanine_layout_tags %}
+
+`page_placeholder` takes the same arguments as the tag of
+`fluent_contents`, the output of the placeholder is cached per page, slot
+and language, and served while stale as configured by
+`MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE`. Output rendered with
+a `template` is left to the cache of `fluent_contents`. The content of every
+placeholder of a page is loaded at once when the first placeholder is
+rendered, see the `prefetch` module.
+"""
+from django.template import Library, TemplateSyntaxError
+from fluent_contents import rendering
+from fluent_contents.templatetags.fluent_contents_tags import PagePlaceholderNode
+from fluent_contents.utils.templatetags import extract_literal, is_true
+
+from ... import cache, instrumentation, utils
+from .. import prefetch
+
+register = Library()
+
+
+@register.tag
+def page_placeholder(parser, token):
+    """
+    Render a placeholder of a page. Syntax:
+
+    .. code-block:: html+django
+
+        {% page_placeholder page.get_content_model "slotname" title="Tab title" role="m" %}
+    """
+    return CachedPagePlaceholderNode.parse(parser, token)
+
+
+class CachedPagePlaceholderNode(PagePlaceholderNode):
+    """
+    The template node of the `page_placeholder` tag.
+
+    It is a `PagePlaceholderNode`, so the placeholders are still found by
+    the template analyser of `fluent_contents`.
+    """
+    def get_value(self, context, *tag_args, **tag_kwargs):
+        """
+        Render the placeholder, using the cached output when available.
+
+        :param context: Template context.
+        :param tag_args: Parent object and slot name.
+        :param tag_kwargs: Tag keyword arguments.
+        :return: HTML string.
+        """
+        request = self.get_request(context)
+        parent, slot = tag_args
+        template_name = tag_kwargs.get('template', None)
+        cachable = is_true(tag_kwargs.get('cachable', not bool(template_name)))
+        fallback_language = is_true(tag_kwargs.get('fallback', False))
+
+        if template_name and cachable and not extract_literal(self.kwargs['template']):
+            raise TemplateSyntaxError(
+                "{0} tag does not allow 'cachable' for variable template names!".format(
+                    self.tag_name
+                )
+            )
+
+        def render():
+            # The placeholders and items of every slot are loaded at the first slot rendered.
+            with instrumentation.phase_timer('placeholder_data'):
+                content = prefetch.get_placeholder_content(context, parent)
+            placeholder = content.placeholders.get(slot)
+            if placeholder is None:
+                return None
+            return prefetch.render_placeholder(
+                request,
+                content,
+                placeholder,
+                parent,
+                template_name=template_name,
+                cachable=cachable,
+                fallback_language=fallback_language
+            )
+
+        # Only the output of pages is cleared when content changes. Output rendered with a
+        # fallback language is not cached either, as it is not cleared when content is added in
+        # the requested language, nor output rendered with another template, which is not part
+        # of the cache key.
+        with instrumentation.placeholder_timer(slot):
+            output = cache.get_placeholder_output(
+                request,
+                parent.pk,
+                slot,
+                render,
+                cachable=(
+                    cachable and
+                    not fallback_language and
+                    not template_name and
+                    isinstance(parent, tuple(utils.get_page_models()))
+                ),
+                timeouts=cache.get_revalidation_timeouts(parent, slot)
+            )
+        if output is None:
+            return "<!-- placeholder '{0}' does not yet exist -->".format(slot)
+
+        rendering.register_frontend_media(request, output.media)
+        return output.html
@@ -1,15 +1,46 @@
+import calendar
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
 from django.conf import settings
 from django.contrib import admin as django_admin
-from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache as django_cache
+from django.contrib.admin import helpers
+from django.contrib.auth.models import AnonymousUser, Permission
+from django.contrib.sites.models import Site
 from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.urlresolvers import reverse
+from django.db import connection
 from django.http import HttpRequest
-from django.template import TemplateDoesNotExist
-from django.test import TestCase
+from django.template import Context, Template, TemplateDoesNotExist
+from django.template.response import TemplateResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import six
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.inspect import get_func_args
 from django_dynamic_fixture import G
+from fluent_contents.models import Placeholder
+from fluent_contents.plugins.rawhtml.models import RawHtmlItem
+from fluent_contents.rendering.core import PlaceholderRenderingPipe
 from mezzanine_fluent_pages.mezzanine_layout_page.admin import FluentContentsLayoutPageAdmin
 
-from . import appsettings, admin, fields, forms, models, widgets
+from mezzanine.pages.models import Page
+
+from .. import cache
+from . import (
+    analysis, appsettings, admin, bulkimport, checks, fields, forms, layoutdata, managers,
+    middleware, models, page_processors, prefetch, receivers, relayout, templatefiles, validation,
+    widgets
+)
 
 # Fallback support for `Django1.4`.
 try:
@@ -19,6 +50,25 @@ except ImportError:
     from django.contrib.auth.models import User
 
 
+def create_layout(key, placeholders):
+    """
+    Create a layout with stored placeholder data and no template.
+
+    :param key: Key of the layout.
+    :param placeholders: List of `(slot, role)` tuples.
+    :return: `PageLayout` object.
+    """
+    layout = models.PageLayout.objects.create(
+        key=key, title=key, template_path='layouts/{0}.html'.format(key)
+    )
+    layout.placeholder_data = json.dumps([
+        {'slot': slot, 'title': slot.title(), 'role': role, 'fallback_language': None}
+        for slot, role in placeholders
+    ])
+    models.PageLayout.objects.filter(pk=layout.pk).update(placeholder_data=layout.placeholder_data)
+    return layout
+
+
 class Admin(TestCase):
     def setUp(self):
         self.admin_instance = admin.FluentContentsLayoutPageAdmin(
@@ -60,7 +110,7 @@ class Admin(TestCase):
     def test_fluentcontentslayoutpageadmin_get_urls(self):
         self.assertEqual(
             len(self.admin_instance.get_urls()),
-            len(super(FluentContentsLayoutPageAdmin, self.admin_instance).get_urls()) + 1
+            len(super(FluentContentsLayoutPageAdmin, self.admin_instance).get_urls()) + 2
         )
 
     def test_fluentcontentslayoutpageadmin_get_layout_view(self):
@@ -77,7 +127,7 @@ class Admin(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.jsondata['placeholders'][0]['slot'], 'main')
         self.assertEqual(response.jsondata['placeholders'][0]['role'], 'm')
-        self.assertEqual(response.jsondata['placeholders'][0]['allowed_plugins'], [])
+        self.assertEqual(response.jsondata['placeholders'][0]['allowed_plugins'], ['RawHtmlPlugin'])
         self.assertEqual(response.jsondata['placeholders'][0]['fallback_language'], None)
         self.assertEqual(response.jsondata['placeholders'][0]['title'], 'Main')
         self.assertEqual(response.jsondata['id'], 1)
@@ -85,6 +135,159 @@ class Admin(TestCase):
         self.assertEqual(response.jsondata['title'], '1')
         layout.delete()
 
+    def test_fluentcontentslayoutpageadmin_get_layout_view_conditional(self):
+        layout = G(
+            models.PageLayout,
+            template_path='layouts/default.html'
+        )
+        request_factory = RequestFactory()
+
+        response = self.admin_instance.get_layout_view(request_factory.get('/'), layout.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        # Test to see if a matching `If-None-Match` gets a not modified response.
+        response = self.admin_instance.get_layout_view(
+            request_factory.get('/', HTTP_IF_NONE_MATCH=etag),
+            layout.pk
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Test to see if `If-Modified-Since` is honoured without an `If-None-Match`.
+        response = self.admin_instance.get_layout_view(
+            request_factory.get('/', HTTP_IF_MODIFIED_SINCE=last_modified),
+            layout.pk
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.admin_instance.get_layout_view(
+            request_factory.get('/', HTTP_IF_MODIFIED_SINCE=http_date(0)),
+            layout.pk
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # Test to see if a change to the layout changes the `ETag`.
+        layout.title = 'changed'
+        layout.save()
+        response = self.admin_instance.get_layout_view(
+            request_factory.get('/', HTTP_IF_NONE_MATCH=etag),
+            layout.pk
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.jsondata['title'], 'changed')
+        layout.delete()
+
+    def test_fluentcontentslayoutpageadmin_get_layout_view_cached(self):
+        layout = G(
+            models.PageLayout,
+            template_path='layouts/default.html'
+        )
+        response = self.admin_instance.get_layout_view(None, layout.pk)
+
+        # Test to see if the cached metadata is served without queries.
+        with self.assertNumQueries(0):
+            cached_response = self.admin_instance.get_layout_view(None, layout.pk)
+        self.assertEqual(cached_response.jsondata, response.jsondata)
+
+        # Test to see if a stale layout gets a busy response while no analysis slot is free.
+        layout.save()
+        analysis_limiter = layoutdata.analysis_limiter
+        analysis_timeout = appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT
+        layoutdata.analysis_limiter = layoutdata.AnalysisLimiter(1)
+        appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT = 0
+        try:
+            with layoutdata.analysis_limiter.slot('other', 0):
+                response = self.admin_instance.get_layout_view(None, layout.pk)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertFalse(response.jsondata['success'])
+
+            response = self.admin_instance.get_layout_view(None, layout.pk)
+            self.assertEqual(response.status_code, 200)
+        finally:
+            layoutdata.analysis_limiter = analysis_limiter
+            appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT = analysis_timeout
+        layout.delete()
+
+    def test_fluentcontentslayoutpageadmin_get_layouts_view(self):
+        request = RequestFactory().get('/')
+        response = self.admin_instance.get_layouts_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.jsondata, {'layouts': []})
+        self.assertNotIn('Last-Modified', response)
+
+        layout = G(
+            models.PageLayout,
+            title='Default',
+            key='default',
+            template_path='layouts/default.html'
+        )
+        missing_layout = G(
+            models.PageLayout,
+            template_path='layouts/missing.html'
+        )
+        response = self.admin_instance.get_layouts_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.jsondata['layouts']), 1)
+        self.assertEqual(
+            response.jsondata['layouts'][0],
+            self.admin_instance.get_layout_view(request, layout.pk).jsondata
+        )
+        self.assertEqual(response.jsondata['layouts'][0]['placeholders'][0]['slot'], 'main')
+
+        # Test to see if the response supports conditional requests.
+        response = self.admin_instance.get_layouts_view(
+            RequestFactory().get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # Test to see if the metadata is read from the cache, only the missing template is
+        # analysed again.
+        analysed = []
+        get_layout_data = self.admin_instance.get_layout_data
+
+        def record_layout_data(layout):
+            analysed.append(layout.pk)
+            return get_layout_data(layout)
+
+        self.admin_instance.get_layout_data = record_layout_data
+        try:
+            response = self.admin_instance.get_layouts_view(request)
+        finally:
+            self.admin_instance.get_layout_data = get_layout_data
+        self.assertEqual(len(response.jsondata['layouts']), 1)
+        self.assertEqual(analysed, [missing_layout.pk])
+
+        # Test to see if layouts with a broken template or a busy analysis are left out.
+        file_path = os.path.join(appsettings.get_template_dir(), 'layouts', 'broken.html')
+        with open(file_path, 'w') as template_file:
+            template_file.write('{% if %}{% endif %}')
+        self.addCleanup(os.remove, file_path)
+        broken_layout = G(models.PageLayout, template_path='layouts/broken.html')
+        response = self.admin_instance.get_layouts_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.jsondata['layouts']), 1)
+
+        analysis_limiter = layoutdata.analysis_limiter
+        analysis_timeout = appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT
+        layoutdata.analysis_limiter = layoutdata.AnalysisLimiter(1)
+        appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT = 0
+        try:
+            layout.save()
+            with layoutdata.analysis_limiter.slot('other', 0):
+                response = self.admin_instance.get_layouts_view(request)
+        finally:
+            layoutdata.analysis_limiter = analysis_limiter
+            appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_TIMEOUT = analysis_timeout
+        self.assertEqual(response.jsondata, {'layouts': []})
+        broken_layout.delete()
+        missing_layout.delete()
+        layout.delete()
+
     def test_fluentcontentslayoutpageadmin_get_readonly_fields(self):
         layout = G(
             models.PageLayout,
@@ -133,53 +336,541 @@ class Admin(TestCase):
         layout_page.delete()
         layout.delete()
 
+    def test_fluentcontentslayoutpageadmin_query_count(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+
+        def count_queries(layouts, placeholders):
+            layout = create_layout('page{0}'.format(layouts), [
+                ('slot{0}'.format(i), 'm') for i in range(placeholders)
+            ])
+            for i in range(layouts):
+                create_layout('layout{0}-{1}'.format(layouts, i), [('main', 'm')])
+            layout_page = models.FluentContentsLayoutPage.objects.create(
+                title='Page', layout=layout
+            )
+            for i in range(placeholders):
+                placeholder = Placeholder.objects.create(
+                    parent=layout_page, slot='slot{0}'.format(i), role='m'
+                )
+                for sort_order in range(3):
+                    RawHtmlItem.objects.create(
+                        parent=layout_page, placeholder=placeholder, html='<p>Item</p>',
+                        sort_order=sort_order
+                    )
+            counts = []
+            for url in (
+                reverse(
+                    'admin:mezzanine_layout_page_fluentcontentslayoutpage_change',
+                    args=[layout_page.pk]
+                ),
+                reverse('admin:mezzanine_layout_page_fluentcontentslayoutpage_add'),
+            ):
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                counts.append(len(queries))
+            return counts
+
+        # Test to see if the number of queries does not grow with the layouts and placeholders.
+        change_queries, add_queries = count_queries(1, 1)
+        self.assertEqual(count_queries(10, 10), [change_queries, add_queries])
+        self.assertLessEqual(change_queries, 24)
+        self.assertLessEqual(add_queries, 16)
+
+    def test_pagelayoutadmin_move_pages(self):
+        old_layout = create_layout('old', [('main', 'm'), ('sidebar', 's')])
+        new_layout = create_layout('new', [('main', 'm'), ('aside', 's')])
+        layout_page = models.FluentContentsLayoutPage.objects.create(
+            title='Page', layout=old_layout
+        )
+        Placeholder.objects.create(parent=layout_page, slot='sidebar', role='s')
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        url = reverse('admin:mezzanine_layout_page_pagelayout_changelist')
+        data = {'action': 'move_pages', helpers.ACTION_CHECKBOX_NAME: [old_layout.pk]}
+
+        # Test to see if the new layout is asked for first.
+        response = self.client.post(url, data)
+        self.assertContains(response, 'Move 1 page of the layouts below to another layout.')
+        self.assertEqual(
+            list(response.context['form'].fields['layout'].queryset), [new_layout]
+        )
+
+        data.update(apply='1', layout=new_layout.pk)
+        response = self.client.post(url, data)
+        self.assertRedirects(response, url)
+        self.assertEqual(
+            models.FluentContentsLayoutPage.objects.get(pk=layout_page.pk).layout, new_layout
+        )
+        self.assertEqual(Placeholder.objects.get(parent_id=layout_page.pk).slot, 'aside')
+
+        # Test to see if the action needs the permission to change page layouts.
+        staff = User.objects.create_user('staff', 'staff@example.com', 'staff')
+        staff.is_staff = True
+        staff.save()
+        staff.user_permissions.add(Permission.objects.get(codename='change_pagelayout'))
+        self.client.login(username='staff', password='staff')
+        data['layout'] = old_layout.pk
+        data[helpers.ACTION_CHECKBOX_NAME] = [new_layout.pk]
+        self.client.post(url, data)
+        self.assertEqual(
+            models.FluentContentsLayoutPage.objects.get(pk=layout_page.pk).layout, new_layout
+        )
+
+    def test_pagelayoutadmin_move_pages_broken_template(self):
+        old_layout = create_layout('old', [('main', 'm')])
+        new_layout = create_layout('new', [('main', 'm')])
+        file_path = os.path.join(appsettings.get_template_dir(), 'layouts', 'broken.html')
+        with open(file_path, 'w') as template_file:
+            template_file.write('{% if %}{% endif %}')
+        self.addCleanup(os.remove, file_path)
+        broken_layout = models.PageLayout.objects.create(
+            key='broken', title='Broken', template_path='layouts/broken.html'
+        )
+        layout_page = models.FluentContentsLayoutPage.objects.create(
+            title='Page', layout=old_layout
+        )
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        url = reverse('admin:mezzanine_layout_page_pagelayout_changelist')
+        data = {
+            'action': 'move_pages',
+            helpers.ACTION_CHECKBOX_NAME: [old_layout.pk, broken_layout.pk],
+            'apply': '1',
+            'layout': new_layout.pk,
+        }
+
+        # Test to see if no page is moved when the template of a selected layout is broken.
+        response = self.client.post(url, data, follow=True)
+        self.assertContains(response, 'no pages were moved')
+        self.assertEqual(
+            models.FluentContentsLayoutPage.objects.get(pk=layout_page.pk).layout, old_layout
+        )
+
+    def test_pagelayoutadmin_page_counts(self):
+        layout = create_layout('used', [('main', 'm')])
+        unused_layout = create_layout('unused', [('main', 'm')])
+        other_site = Site.objects.create(domain='other.example.com')
+        for site_id in (settings.SITE_ID, settings.SITE_ID, other_site.pk):
+            models.FluentContentsLayoutPage.objects.create(
+                title='Page', layout=layout, site_id=site_id
+            )
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        url = reverse('admin:mezzanine_layout_page_pagelayout_changelist')
+
+        response = self.client.get(url)
+        layouts = {layout.key: layout for layout in response.context['cl'].result_list}
+        self.assertEqual((layouts['used'].page_count, layouts['used'].site_page_count), (3, 2))
+        self.assertEqual((layouts['unused'].page_count, layouts['unused'].site_page_count), (0, 0))
+
+        # Test to see if a layout in use is not deleted, nor are its pages.
+        delete_url = reverse('admin:mezzanine_layout_page_pagelayout_delete', args=[layout.pk])
+        response = self.client.get(delete_url)
+        self.assertRedirects(
+            response, reverse('admin:mezzanine_layout_page_pagelayout_change', args=[layout.pk])
+        )
+        self.client.post(url, {
+            'action': 'delete_selected',
+            helpers.ACTION_CHECKBOX_NAME: [layout.pk, unused_layout.pk],
+            'post': 'yes',
+        })
+        self.assertEqual(models.PageLayout.objects.count(), 2)
+
+        response = self.client.post(url, {
+            'action': 'delete_selected',
+            helpers.ACTION_CHECKBOX_NAME: [unused_layout.pk],
+            'post': 'yes',
+        })
+        self.assertEqual(list(models.PageLayout.objects.all()), [layout])
+
+
+class Analysis(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.analysed = []
+
+    def analyse(self):
+        self.analysed.append(True)
+        return [{'slot': 'main', 'title': 'Main', 'role': 'm', 'fallback_language': None}]
+
+    def test_get_placeholders(self):
+        placeholders = analysis.get_placeholders('layouts/default.html', 'hash', self.analyse)
+        self.assertEqual(placeholders, self.analyse())
+        self.analysed = []
+
+        # Test to see if the analysis is shared through the cache.
+        analysis.get_placeholders('layouts/default.html', 'hash', self.analyse)
+        self.assertEqual(self.analysed, [])
+
+        # Test to see if other versions and templates are analysed again.
+        analysis.get_placeholders('layouts/default.html', 'other', self.analyse)
+        analysis.get_placeholders('layouts/other.html', 'hash', self.analyse)
+        analysis.get_placeholders('layouts/default.html', '', self.analyse)
+        analysis.get_placeholders('layouts/default.html', '', self.analyse)
+        self.assertEqual(len(self.analysed), 4)
+
+    def test_get_placeholders_cache_dir(self):
+        cache_dir = os.path.join(tempfile.mkdtemp(), 'analysis')
+        self.addCleanup(shutil.rmtree, os.path.dirname(cache_dir))
+        cache_dir_setting = appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_CACHE_DIR
+        appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_CACHE_DIR = cache_dir
+        try:
+            analysis.get_placeholders('layouts/default.html', 'hash', self.analyse)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            # Test to see if the file is used when the cache was cleared.
+            django_cache.clear()
+            placeholders = analysis.get_placeholders('layouts/default.html', 'hash', self.analyse)
+            self.assertEqual(placeholders[0]['slot'], 'main')
+            self.assertEqual(len(self.analysed), 1)
+        finally:
+            appsettings.MEZZANINE_PAGES_LAYOUT_ANALYSIS_CACHE_DIR = cache_dir_setting
+
 
 class AppSettings(TestCase):
-    def test_mezzanine_pages_template_configuration(self):
+    def test_get_template_dir(self):
+        template_dir = appsettings.get_template_dir()
+        self.assertTrue(template_dir.endswith('/'))
+
+        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR='/layouts'):
+            self.assertEqual(appsettings.get_template_dir(), '/layouts/')
         with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR=None):
-            with self.assertRaises(ImproperlyConfigured) as cm:
-                six.moves.reload_module(appsettings)
+            self.assertIsNone(appsettings.get_template_dir())
+
+    def test_get_template_dir_setting(self):
+        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR='/layouts/'):
             self.assertEqual(
-                six.text_type(cm.exception),
-                'The setting `MEZZANINE_PAGES_TEMPLATE_DIR` or `TEMPLATE_DIRS[0]` need to be '
-                'defined!'
+                appsettings.get_template_dir_setting(),
+                ('MEZZANINE_PAGES_TEMPLATE_DIR', '/layouts/')
             )
 
-        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR='./test/'):
-            with self.assertRaises(ImproperlyConfigured) as cm:
-                six.moves.reload_module(appsettings)
+        with self.settings(
+            TEMPLATES=[
+                {'BACKEND': 'django.template.backends.jinja2.Jinja2', 'DIRS': ['/jinja2/']},
+                {'BACKEND': appsettings.DJANGO_TEMPLATES_BACKEND, 'DIRS': ['/templates/']},
+            ],
+            TEMPLATE_DIRS=['/template_dirs/']
+        ):
+            self.assertEqual(
+                appsettings.get_template_dir_setting(),
+                ("TEMPLATES[1]['DIRS'][0]", '/templates/')
+            )
+        with self.settings(TEMPLATES=[], TEMPLATE_DIRS=['/template_dirs/']):
             self.assertEqual(
-                six.text_type(cm.exception),
-                'The setting `MEZZANINE_PAGES_TEMPLATE_DIR` needs to be an absolute path!'
+                appsettings.get_template_dir_setting(),
+                ('TEMPLATE_DIRS[0]', '/template_dirs/')
+            )
+        with self.settings(TEMPLATES=[], TEMPLATE_DIRS=[]):
+            self.assertEqual(appsettings.get_template_dir_setting(), ('TEMPLATE_DIRS[0]', None))
+
+    def test_require_template_dir(self):
+        self.assertEqual(appsettings.require_template_dir(), appsettings.get_template_dir())
+        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR=None):
+            self.assertRaisesMessage(
+                ImproperlyConfigured,
+                appsettings.TEMPLATE_DIR_MISSING,
+                appsettings.require_template_dir
             )
 
-        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR='/test/'):
-            with self.assertRaises(ImproperlyConfigured) as cm:
-                six.moves.reload_module(appsettings)
+
+class BulkImport(TestCase):
+    def setUp(self):
+        self.layout = models.PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        Page.objects.create(title='About')
+
+    def get_lines(self, *records):
+        return [json.dumps(record) for record in records]
+
+    def test_import_layout_pages(self):
+        lines = self.get_lines(
+            {
+                'id': 1,
+                'title': 'About',
+                'layout': 'default',
+                'placeholders': {'main': [
+                    {'model': 'rawhtml.rawhtmlitem', 'html': '<p>first</p>'},
+                    {'model': 'rawhtml.rawhtmlitem', 'html': '<p>second</p>'},
+                ]},
+            },
+            {'id': 2, 'parent': 1, 'title': 'Team', 'layout': 'default'},
+            {'id': 3, 'parent': 1, 'title': 'Jobs', 'layout': 'default', 'status': 1},
+            {'parent': 2, 'title': 'Jane', 'layout': 'default', 'slug': '/people/jane/'},
+        )
+        result = bulkimport.import_layout_pages(lines, batch_size=2)
+        self.assertEqual(result, bulkimport.ImportResult(4, 1, 2))
+
+        # Test to see if the pages are created the way saving them would.
+        pages = sorted(models.FluentContentsLayoutPage.objects.all(), key=lambda page: page.pk)
+        self.assertEqual(
+            [(page.slug, page.titles, page._order) for page in pages],
+            [
+                ('about-1', 'About', 1),
+                ('about-1/team', 'About / Team', 0),
+                ('about-1/jobs', 'About / Jobs', 1),
+                ('people/jane', 'About / Team / Jane', 0),
+            ]
+        )
+        self.assertEqual(
+            [page.parent_id for page in pages],
+            [None, pages[0].pk, pages[0].pk, pages[1].pk]
+        )
+        self.assertEqual(pages[0].layout, self.layout)
+        self.assertEqual(pages[0].content_model, 'fluentcontentslayoutpage')
+        self.assertEqual(pages[2].status, 1)
+        self.assertIsNotNone(pages[0].publish_date)
+
+        placeholder = Placeholder.objects.get_by_slot(pages[0], 'main')
+        self.assertEqual(placeholder.role, 'm')
+        self.assertEqual(placeholder.title, 'Main')
+        self.assertEqual(
+            [item.html for item in placeholder.get_content_items()],
+            ['<p>first</p>', '<p>second</p>']
+        )
+        response = self.client.get(pages[0].get_absolute_url())
+        self.assertContains(response, '<p>first</p>')
+
+    def test_import_layout_pages_errors(self):
+        errors = [
+            ('not json', 'Line 1: Invalid JSON'),
+            ('[]', 'Line 1: A record needs to be a JSON object.'),
+            (
+                '{"title": "Page", "layout": "default", "color": "red"}',
+                'Line 1: Unknown keys: color.'
+            ),
+            ('{"layout": "default"}', 'Line 1: A record needs a title.'),
+            ('{"title": "Page", "layout": "other"}', 'Line 1: Unknown layout `other`.'),
+            ('{"title": "Page", "layout": "default", "parent": 1}', 'Line 1: Unknown parent `1`'),
+            (
+                '{"title": "Page", "layout": "default", "publish_date": "today"}',
+                'Line 1: Invalid `publish_date`.'
+            ),
+            (
+                '{"title": "Page", "layout": "default", '
+                '"placeholders": {"main": [{"model": "auth.user"}]}}',
+                'Line 1: Unknown content item model `auth.user`.'
+            ),
+            (
+                '{"title": "Page", "layout": "default", '
+                '"placeholders": {"main": [{"model": "rawhtml.rawhtmlitem", "color": "red"}]}}',
+                'Line 1: Invalid content item'
+            ),
+        ]
+        for line, message in errors:
+            with self.assertRaises(bulkimport.BulkImportError) as cm:
+                bulkimport.import_layout_pages([line])
+            self.assertTrue(six.text_type(cm.exception).startswith(message), cm.exception)
+
+        # Test to see if the batches before an invalid record are kept.
+        lines = self.get_lines(
+            {'id': 1, 'title': 'Page', 'layout': 'default'},
+            {'id': 1, 'title': 'Page', 'layout': 'default'},
+        )
+        with self.assertRaises(bulkimport.BulkImportError) as cm:
+            bulkimport.import_layout_pages(lines, batch_size=1)
+        self.assertEqual(cm.exception.line_number, 2)
+        self.assertEqual(models.FluentContentsLayoutPage.objects.count(), 1)
+
+    def test_layoutpageimporter_flush(self):
+        importer = bulkimport.LayoutPageImporter(batch_size=1)
+        importer.import_lines(self.get_lines(
+            {
+                'id': 1,
+                'title': 'About',
+                'layout': 'default',
+                'placeholders': {'main': [{'model': 'rawhtml.rawhtmlitem', 'html': '<p>1</p>'}]},
+            },
+            {'id': 2, 'parent': 1, 'title': 'Team', 'layout': 'default'},
+        ))
+
+        # Test to see if only what children need is kept of the created pages.
+        page = models.FluentContentsLayoutPage.objects.get(slug='about-1')
+        self.assertEqual(importer.pages[1], bulkimport.CreatedPage(page.pk, 'about-1', 'About'))
+        self.assertIsInstance(importer.pages[2], bulkimport.CreatedPage)
+        self.assertEqual(importer.pending, [])
+
+        importer.import_lines(self.get_lines({'parent': 1, 'title': 'Jobs', 'layout': 'default'}))
+        page = models.FluentContentsLayoutPage.objects.get(slug='about-1/jobs')
+        self.assertEqual((page.parent_id, page.titles, page._order), (
+            importer.pages[1].pk, 'About / Jobs', 1
+        ))
+
+
+class Checks(TestCase):
+    def test_check_template_dir(self):
+        self.assertEqual(checks.check_template_dir(None), [])
+
+        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR=None):
+            self.assertEqual(
+                [error.msg for error in checks.check_template_dir(None)],
+                [
+                    "The setting `MEZZANINE_PAGES_TEMPLATE_DIR`, `TEMPLATES[...]['DIRS']` or "
+                    "`TEMPLATE_DIRS[0]` need to be defined!"
+                ]
+            )
+
+        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR='./test/'):
             self.assertEqual(
-                six.text_type(cm.exception),
-                'The path `/test/` in the setting `MEZZANINE_PAGES_TEMPLATE_DIR` does not exist!'
+                [error.msg for error in checks.check_template_dir(None)],
+                ['The setting `MEZZANINE_PAGES_TEMPLATE_DIR` needs to be an absolute path!']
             )
 
-        with self.settings(TEMPLATE_DIRS=('./test/', )):
-            # mezzanine_pages_template_dir = settings.MEZZANINE_PAGES_TEMPLATE_DIR
-            # del settings.MEZZANINE_PAGES_TEMPLATE_DIR
+        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR='/test'):
+            self.assertEqual(
+                [error.msg for error in checks.check_template_dir(None)],
+                ['The path `/test/` in the setting `MEZZANINE_PAGES_TEMPLATE_DIR` does not exist!']
+            )
 
-            with self.assertRaises(ImproperlyConfigured) as cm:
-                six.moves.reload_module(appsettings)
+        with self.settings(TEMPLATES=[], TEMPLATE_DIRS=('./test/', )):
             self.assertEqual(
-                six.text_type(cm.exception),
-                'The setting `TEMPLATE_DIRS[0]` needs to be an absolute path!'
+                [error.id for error in checks.check_template_dir(None)],
+                ['mezzanine_layout_page.E002']
             )
 
-            # settings.MEZZANINE_PAGES_TEMPLATE_DIR = mezzanine_pages_template_dir
 
-        six.moves.reload_module(appsettings)
+class Commands(TestCase):
+    def test_check_layout_templates(self):
+        models.PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        django_cache.clear()
+        stdout = six.StringIO()
+        call_command('check_layout_templates', workers=1, write=True, verbosity=2, stdout=stdout)
+        self.assertIn('OK layouts/default.html (1 placeholders', stdout.getvalue())
+        self.assertIn('Checked 1 templates in', stdout.getvalue())
+        self.assertIn('Stored the analysis for 1 layouts.', stdout.getvalue())
+        self.assertIsNotNone(analysis.get_cached_analysis(
+            'layouts/default.html', templatefiles.get_template_file_hash('layouts/default.html')
+        ))
+
+        models.PageLayout.objects.create(
+            key='missing',
+            title='Missing',
+            template_path='layouts/missing.html'
+        )
+        stdout, stderr = six.StringIO(), six.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('check_layout_templates', workers=1, stdout=stdout, stderr=stderr)
+        self.assertIn('1 failed.', stdout.getvalue())
+        self.assertIn('layouts/missing.html: Missing file', stderr.getvalue())
+
+    def test_export_pages(self):
+        models.PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        stdout = six.StringIO()
+        call_command('export_pages', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 1)
+
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        file_path = os.path.join(path, 'pages.jsonl')
+        stdout = six.StringIO()
+        call_command('export_pages', output=file_path, stdout=stdout)
+        self.assertIn('Exported 1 layouts, 0 pages', stdout.getvalue())
+        with open(file_path) as pages_file:
+            self.assertIn('"key": "default"', pages_file.read())
+
+        with self.assertRaises(CommandError):
+            call_command('export_pages', output=os.path.join(path, 'missing', 'pages.jsonl'))
+
+    def test_export_static_site(self):
+        layout = models.PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        models.FluentContentsLayoutPage.objects.create(title='Page', layout=layout)
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        stdout, stderr = six.StringIO(), six.StringIO()
+        call_command('export_static_site', path, workers=1, stdout=stdout, stderr=stderr)
+        self.assertIn('Exported 1 pages in', stdout.getvalue())
+        self.assertIn('0 unchanged, 0 removed, 0 failed.', stdout.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(path, 'example.com', 'page', 'index.html')))
+
+        call_command(
+            'export_static_site', path, workers=1, incremental=True, stdout=stdout, stderr=stderr
+        )
+        self.assertIn('LocMemCache', stderr.getvalue())
+
+        # Test to see if failures are reported, the admin redirects to its login page.
+        models.FluentContentsLayoutPage.objects.create(title='Admin', layout=layout, slug='admin')
+        stdout, stderr = six.StringIO(), six.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('export_static_site', path, workers=1, stdout=stdout, stderr=stderr)
+        self.assertIn('1 failed.', stdout.getvalue())
+        self.assertIn('Failed to export /admin/', stderr.getvalue())
+
+    def test_import_layout_pages(self):
+        models.PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        file_path = os.path.join(path, 'pages.jsonl')
+        with open(file_path, 'w') as pages_file:
+            pages_file.write('{"title": "Page", "layout": "default"}\n')
+
+        stdout = six.StringIO()
+        call_command('import_layout_pages', file_path, stdout=stdout)
+        self.assertIn('Created 1 pages, 0 placeholders and 0 content items.', stdout.getvalue())
+
+        with open(file_path, 'w') as pages_file:
+            pages_file.write('{"title": "Page", "layout": "other"}\n')
+        with self.assertRaises(CommandError):
+            call_command('import_layout_pages', file_path, stdout=stdout)
+        with self.assertRaises(CommandError):
+            call_command('import_layout_pages', os.path.join(path, 'missing.jsonl'))
+
+    def test_rebuild_search_text(self):
+        stdout = six.StringIO()
+        call_command('rebuild_search_text', stdout=stdout)
+        self.assertIn('Stored the search text of 0 pages.', stdout.getvalue())
+
+    def test_warm_page_cache(self):
+        layout = models.PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        models.FluentContentsLayoutPage.objects.create(title='Page', layout=layout)
+        models.FluentContentsLayoutPage.objects.create(
+            title='Private page', layout=layout, login_required=True
+        )
+
+        stdout, stderr = six.StringIO(), six.StringIO()
+        call_command('warm_page_cache', workers=1, stdout=stdout, stderr=stderr)
+        self.assertIn('Rendering 1 pages.', stdout.getvalue())
+        self.assertIn('Rendered 1 pages in', stdout.getvalue())
+        self.assertIn('0 failed.', stdout.getvalue())
+        self.assertIn('default ', stdout.getvalue())
+        self.assertIn('LocMemCache', stderr.getvalue())
+
+        # Test to see if failures are reported, the admin redirects to its login page.
+        models.FluentContentsLayoutPage.objects.create(title='Admin', layout=layout, slug='admin')
+        stdout, stderr = six.StringIO(), six.StringIO()
+        call_command('warm_page_cache', workers=1, stdout=stdout, stderr=stderr)
+        self.assertIn('1 failed.', stdout.getvalue())
+        self.assertIn('Failed to render /admin/', stderr.getvalue())
 
 
 class Fields(TestCase):
     def setUp(self):
-        self.field = fields.TemplateFilePathField(path=appsettings.MEZZANINE_PAGES_TEMPLATE_DIR)
+        self.field = fields.TemplateFilePathField(path=appsettings.get_template_dir())
 
     def test_templatefilepathfield_init(self):
         self.assertEqual(self.field.recursive, True)
@@ -212,7 +903,7 @@ class Forms(TestCase):
         appsettings.MEZZANINE_PAGES_RELATIVE_TEMPLATE_DIR = False
 
         form = forms.TemplateFilePathFieldForm(
-            path=appsettings.MEZZANINE_PAGES_TEMPLATE_DIR,
+            path=appsettings.get_template_dir(),
             recursive=True
         )
 
@@ -221,11 +912,16 @@ class Forms(TestCase):
             [
                 (
                     '%sadmin/fluent_mezzanine/change_form.html' %
-                    appsettings.MEZZANINE_PAGES_TEMPLATE_DIR,
+                    appsettings.get_template_dir(),
                     u'admin/fluent_mezzanine/change_form.html'
                 ),
                 (
-                    '%slayouts/default.html' % appsettings.MEZZANINE_PAGES_TEMPLATE_DIR,
+                    '%sadmin/fluent_mezzanine/move_pages.html' %
+                    appsettings.get_template_dir(),
+                    u'admin/fluent_mezzanine/move_pages.html'
+                ),
+                (
+                    '%slayouts/default.html' % appsettings.get_template_dir(),
                     u'layouts/default.html'
                 )
             ]
@@ -234,7 +930,7 @@ class Forms(TestCase):
         appsettings.MEZZANINE_PAGES_RELATIVE_TEMPLATE_DIR = True
 
         form = forms.TemplateFilePathFieldForm(
-            path=appsettings.MEZZANINE_PAGES_TEMPLATE_DIR,
+            path=appsettings.get_template_dir(),
             recursive=True
         )
 
@@ -245,6 +941,10 @@ class Forms(TestCase):
                     'admin/fluent_mezzanine/change_form.html',
                     u'admin/fluent_mezzanine/change_form.html'
                 ),
+                (
+                    'admin/fluent_mezzanine/move_pages.html',
+                    u'admin/fluent_mezzanine/move_pages.html'
+                ),
                 (
                     'layouts/default.html',
                     u'layouts/default.html'
@@ -261,26 +961,26 @@ class Forms(TestCase):
     def test_templatefilepathfieldform_prepare_value(self):
         appsettings.MEZZANINE_PAGES_RELATIVE_TEMPLATE_DIR = False
         form = forms.TemplateFilePathFieldForm(
-            path=appsettings.MEZZANINE_PAGES_TEMPLATE_DIR,
+            path=appsettings.get_template_dir(),
             recursive=True
         )
 
         self.assertEqual(form.prepare_value(None), None)
         self.assertEqual(
-            form.prepare_value('%slayouts/default.html' % appsettings.MEZZANINE_PAGES_TEMPLATE_DIR),
-            '%slayouts/default.html' % appsettings.MEZZANINE_PAGES_TEMPLATE_DIR,
+            form.prepare_value('%slayouts/default.html' % appsettings.get_template_dir()),
+            '%slayouts/default.html' % appsettings.get_template_dir(),
         )
         self.assertEqual(
             form.prepare_value('layouts/default.html'),
-            '%slayouts/default.html' % appsettings.MEZZANINE_PAGES_TEMPLATE_DIR,
+            '%slayouts/default.html' % appsettings.get_template_dir(),
         )
         appsettings.MEZZANINE_PAGES_RELATIVE_TEMPLATE_DIR = True
         form = forms.TemplateFilePathFieldForm(
-            path=appsettings.MEZZANINE_PAGES_TEMPLATE_DIR,
+            path=appsettings.get_template_dir(),
             recursive=True
         )
         self.assertEqual(
-            form.prepare_value('%slayouts/default.html' % appsettings.MEZZANINE_PAGES_TEMPLATE_DIR),
+            form.prepare_value('%slayouts/default.html' % appsettings.get_template_dir()),
             'layouts/default.html'
         )
         self.assertEqual(
@@ -289,6 +989,132 @@ class Forms(TestCase):
         )
 
 
+class LayoutData(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+
+    def test_get_cached_layout_data(self):
+        self.assertIsNone(layoutdata.get_cached_layout_data(self.layout.pk))
+
+        version = layoutdata.get_layout_version(self.layout.pk)
+        entry = layoutdata.set_cached_layout_data(self.layout, version, {'id': 1}, None)
+        self.assertEqual(layoutdata.get_cached_layout_data(self.layout.pk), entry)
+
+        # Test to see if saving the layout makes the cached metadata stale.
+        self.layout.save()
+        self.assertIsNone(layoutdata.get_cached_layout_data(self.layout.pk))
+
+        # Test to see if changing the template file makes the cached metadata stale.
+        version = layoutdata.get_layout_version(self.layout.pk)
+        entry = layoutdata.set_cached_layout_data(self.layout, version, {'id': 1}, None)
+        entry['file_version'] = (0, 0)
+        django_cache.set(layoutdata.get_layout_data_cache_key(self.layout.pk), entry)
+        self.assertIsNone(layoutdata.get_cached_layout_data(self.layout.pk))
+
+    def test_acquire(self):
+        class Python2Lock(object):
+            # A lock without the timeout argument of Python 3.
+            def __init__(self):
+                self.lock = threading.Lock()
+
+            def acquire(self, blocking=True):
+                return self.lock.acquire(blocking)
+
+        for lock in (threading.Lock(), Python2Lock()):
+            self.assertTrue(layoutdata.acquire(lock, 0))
+            self.assertFalse(layoutdata.acquire(lock, 0.01))
+
+    def test_analysislimiter(self):
+        analysis_limiter = layoutdata.AnalysisLimiter(1)
+        with analysis_limiter.slot('first', 0):
+            self.assertIn('first', analysis_limiter.locks)
+            with self.assertRaises(layoutdata.AnalysisBusy):
+                with analysis_limiter.slot('second', 0):
+                    pass
+        self.assertEqual(analysis_limiter.locks, {})
+
+        with analysis_limiter.slot('second', 0):
+            pass
+
+        # Test to see if waiting for the analysis of the same key times out.
+        with analysis_limiter.slot('first', 0):
+            with self.assertRaises(layoutdata.AnalysisBusy):
+                with analysis_limiter.slot('first', 0.01):
+                    pass
+        self.assertEqual(analysis_limiter.locks, {})
+
+
+class Managers(TestCase):
+    def test_fluentcontentslayoutpagemanager_with_layout(self):
+        self.assertIsInstance(
+            models.FluentContentsLayoutPage.objects,
+            managers.FluentContentsLayoutPageManager
+        )
+        layout = G(models.PageLayout)
+        layout_page = models.FluentContentsLayoutPage.objects.create(title='Page', layout=layout)
+        with self.assertNumQueries(1):
+            page = models.FluentContentsLayoutPage.objects.with_layout().get(pk=layout_page.pk)
+            self.assertEqual(page.get_template_name(), layout.template_path)
+
+    def test_pagelayoutqueryset_with_page_counts(self):
+        layout = create_layout('used', [('main', 'm')])
+        create_layout('unused', [('main', 'm')])
+        models.FluentContentsLayoutPage.objects.create(title='Page', layout=layout)
+        other_site = Site.objects.create(domain='other.example.com')
+        models.FluentContentsLayoutPage.objects.create(
+            title='Page', layout=layout, site_id=other_site.pk
+        )
+
+        with self.assertNumQueries(1):
+            counts = {
+                layout.key: (layout.page_count, layout.site_page_count)
+                for layout in models.PageLayout.objects.with_page_counts(site_id=settings.SITE_ID)
+            }
+        self.assertEqual(counts, {'used': (2, 1), 'unused': (0, 0)})
+        self.assertEqual(list(models.PageLayout.objects.in_use()), [layout])
+
+
+class Middleware(TestCase):
+    def test_layouttemplatemiddleware_process_template_response(self):
+        layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        layout_page = models.FluentContentsLayoutPage.objects.create(title='Page', layout=layout)
+        request = RequestFactory().get('/')
+        request.page = Page.objects.get(pk=layout_page.pk)
+        layout_middleware = middleware.LayoutTemplateMiddleware()
+
+        # Test to see if the page view template names are replaced.
+        response = TemplateResponse(request, ['layouts/default.html', 'pages/page.html'])
+        response = layout_middleware.process_template_response(request, response)
+        self.assertIs(response.template_name, layout.get_template())
+
+        # Test to see if other template names are left alone.
+        response = TemplateResponse(request, ['pages/page.html'])
+        response = layout_middleware.process_template_response(request, response)
+        self.assertEqual(response.template_name, ['pages/page.html'])
+
+        # Test to see if a missing template falls back to the template names.
+        models.PageLayout.objects.filter(pk=layout.pk).update(template_path='layouts/missing.html')
+        request.page = Page.objects.get(pk=layout_page.pk)
+        response = TemplateResponse(request, ['layouts/missing.html', 'pages/page.html'])
+        response = layout_middleware.process_template_response(request, response)
+        self.assertEqual(response.template_name, ['layouts/missing.html', 'pages/page.html'])
+
+        # Test to see if requests without a layout page are left alone.
+        del request.page
+        response = TemplateResponse(request, ['layouts/default.html'])
+        response = layout_middleware.process_template_response(request, response)
+        self.assertEqual(response.template_name, ['layouts/default.html'])
+
+
 class Models(TestCase):
     def setUp(self):
         self.layout = G(
@@ -328,12 +1154,591 @@ class Models(TestCase):
 
         self.assertEqual(template.name, template_path)
 
+    def test_pagelayout_save(self):
+        # Test to see if a missing template does not prevent saving.
+        self.assertEqual(self.layout.placeholder_data, '')
+        self.assertEqual(self.layout.template_hash, '')
+
+        # Test to see if the template analysis is stored.
+        layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        layout = models.PageLayout.objects.get(pk=layout.pk)
+        self.assertEqual(
+            json.loads(layout.placeholder_data),
+            [{'slot': 'main', 'title': 'Main', 'role': 'm', 'fallback_language': None}]
+        )
+        self.assertEqual(
+            layout.template_hash,
+            templatefiles.get_template_file_hash('layouts/default.html')
+        )
+
+        # Test to see if a template with a syntax error does not prevent saving.
+        file_path = os.path.join(appsettings.get_template_dir(), 'layouts', 'broken.html')
+        with open(file_path, 'w') as template_file:
+            template_file.write('{% if %}{% endif %}')
+        self.addCleanup(os.remove, file_path)
+        layout = models.PageLayout.objects.create(
+            key='broken',
+            title='Broken',
+            template_path='layouts/broken.html'
+        )
+        self.assertEqual((layout.placeholder_data, layout.template_hash), ('', ''))
+
+    def test_pagelayout_get_template_cache(self):
+        layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        template = layout.get_template()
+        self.assertIs(models.PageLayout.objects.get(pk=layout.pk).get_template(), template)
+
+        # Test to see if saving the layout clears the cached template.
+        layout.save()
+        self.assertIsNot(layout.get_template(), template)
+
+    def test_pagelayout_get_last_modified(self):
+        # Test to see if the row modification time is used without a template file.
+        self.assertEqual(self.layout.get_last_modified(), self.layout.modified)
+
+        # Test to see if a newer template file is used.
+        layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        models.PageLayout.objects.filter(pk=layout.pk).update(
+            modified=datetime.datetime(2000, 1, 1, tzinfo=timezone.utc)
+        )
+        layout = models.PageLayout.objects.get(pk=layout.pk)
+        self.assertEqual(
+            calendar.timegm(layout.get_last_modified().utctimetuple()),
+            int(templatefiles.get_template_file_mtime('layouts/default.html'))
+        )
+
+    def test_pagelayout_get_placeholder_data(self):
+        layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        layout = models.PageLayout.objects.get(pk=layout.pk)
+
+        loaded = []
+        get_template = models.get_template
+        models.get_template = lambda name: loaded.append(name) or get_template(name)
+        try:
+            # Test to see if the stored analysis is used.
+            self.assertEqual([p.slot for p in layout.get_placeholder_data()], ['main'])
+            self.assertEqual(loaded, [])
+
+            # Test to see if an outdated analysis is refreshed and stored.
+            django_cache.clear()
+            models.PageLayout.objects.filter(pk=layout.pk).update(template_hash='outdated')
+            layout = models.PageLayout.objects.get(pk=layout.pk)
+            placeholder = layout.get_placeholder_data()[0]
+            self.assertEqual(loaded, ['layouts/default.html'])
+            self.assertEqual(
+                (placeholder.slot, placeholder.title, placeholder.role),
+                ('main', 'Main', 'm')
+            )
+            self.assertEqual(
+                models.PageLayout.objects.get(pk=layout.pk).template_hash,
+                templatefiles.get_template_file_hash('layouts/default.html')
+            )
+        finally:
+            models.get_template = get_template
+
+        # Test to see if a missing template still raises an exception.
+        with self.assertRaises(TemplateDoesNotExist):
+            self.layout.get_placeholder_data()
+
+    def test_pagelayout_is_in_use(self):
+        layout = create_layout('layout', [('main', 'm')])
+        self.assertFalse(layout.is_in_use())
+
+        # Test to see if pages of other sites are found.
+        other_site = Site.objects.create(domain='other.example.com')
+        models.FluentContentsLayoutPage.objects.create(
+            title='Page', layout=layout, site_id=other_site.pk
+        )
+        with self.assertNumQueries(1):
+            self.assertTrue(layout.is_in_use())
+
     def test_str(self):
         # Test the string representations for models.
         self.assertEqual(str(self.layout), self.layout.title)
         self.assertEqual(str(self.layout_page), self.layout_page.titles)
 
 
+class PageProcessors(TestCase):
+    def test_load_layout(self):
+        layout = G(models.PageLayout)
+        layout_page = models.FluentContentsLayoutPage.objects.create(title='Page', layout=layout)
+        page = Page.objects.get(pk=layout_page.pk)
+
+        with self.assertNumQueries(1):
+            page_processors.load_layout(None, page)
+        with self.assertNumQueries(0):
+            self.assertEqual(page.get_content_model().get_template_name(), layout.template_path)
+
+            # Test to see if an already loaded content model is kept.
+            content_model = page.get_content_model()
+            page_processors.load_layout(None, page)
+            self.assertIs(page.get_content_model(), content_model)
+
+
+class Prefetch(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        self.layout_page = models.FluentContentsLayoutPage.objects.create(
+            title='Page', layout=layout
+        )
+        for slot in ('main', 'sidebar', 'footer'):
+            placeholder = Placeholder.objects.create_for_object(self.layout_page, slot)
+            if slot != 'footer':
+                for sort_order in (2, 1):
+                    RawHtmlItem.objects.create_for_placeholder(
+                        placeholder,
+                        html='<p>{0} {1}</p>'.format(slot, sort_order),
+                        sort_order=sort_order
+                    )
+
+    def test_get_placeholder_content(self):
+        context = Context()
+        with self.assertNumQueries(3):
+            content = prefetch.get_placeholder_content(context, self.layout_page)
+        self.assertEqual(sorted(content.placeholders), ['footer', 'main', 'sidebar'])
+        main_items = content.items[content.placeholders['main'].pk]
+        self.assertEqual([item.html for item in main_items], ['<p>main 1</p>', '<p>main 2</p>'])
+        self.assertEqual(content.items[content.placeholders['footer'].pk], [])
+
+        # Test to see if the content is loaded once per render.
+        with self.assertNumQueries(0):
+            self.assertIs(prefetch.get_placeholder_content(context, self.layout_page), content)
+            self.assertIs(main_items[0].placeholder, content.placeholders['main'])
+
+    def test_page_placeholder(self):
+        template = Template(
+            '{% load fluent_mezzanine_layout_tags %}'
+            '{% page_placeholder page "main" %}{% page_placeholder page "sidebar" %}'
+            '{% page_placeholder page "footer" %}{% page_placeholder page "missing" %}'
+        )
+        context = Context({'page': self.layout_page, 'request': RequestFactory().get('/')})
+        # The placeholders, the content items and the raw HTML items, for all slots.
+        with self.assertNumQueries(3):
+            output = template.render(context)
+        self.assertIn(
+            '<p>main 1</p><p>main 2</p><p>sidebar 1</p><p>sidebar 2</p>'
+            "<!-- no items in placeholder 'footer' -->"
+            "<!-- placeholder 'missing' does not yet exist -->",
+            output
+        )
+
+    def test_prefetchedrenderingpipe(self):
+        # The pipe overrides a private method of `fluent_contents`, its arguments and result
+        # need to stay the same for the prefetched items to be used.
+        pipe = PlaceholderRenderingPipe(RequestFactory().get('/'))
+        self.assertEqual(
+            get_func_args(pipe._get_placeholder_items),
+            [
+                'placeholder', 'parent_object', 'limit_parent_language', 'fallback_language',
+                'try_cache'
+            ]
+        )
+        content = prefetch.get_placeholder_content(Context(), self.layout_page)
+        placeholder = content.placeholders['main']
+        items, is_fallback = pipe._get_placeholder_items(
+            placeholder, self.layout_page, True, False, False
+        )
+        self.assertFalse(is_fallback)
+        self.assertEqual(
+            [item.pk for item in items], [item.pk for item in content.items[placeholder.pk]]
+        )
+
+        # Test to see if the prefetched items render without queries.
+        with self.assertNumQueries(0):
+            output = prefetch.render_placeholder(
+                RequestFactory().get('/'), content, placeholder, self.layout_page
+            )
+        self.assertIn('<p>main 1</p><p>main 2</p>', output.html)
+
+
+class Receivers(TestCase):
+    def test_clear_layout_output(self):
+        django_cache.clear()
+        layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        layout_page = models.FluentContentsLayoutPage.objects.create(title='Page', layout=layout)
+        Placeholder.objects.create_for_object(layout_page, 'main')
+        cache_key = cache.get_placeholder_cache_key(layout_page.pk, 'main')
+        django_cache.set(cache_key, 'html')
+
+        layout.save()
+        self.assertIsNone(django_cache.get(cache_key))
+
+
+class Relayout(TestCase):
+    def setUp(self):
+        self.old_layout = create_layout(
+            'old', [('main', 'm'), ('sidebar', 's'), ('extra', 's'), ('legacy', 'r')]
+        )
+        self.new_layout = create_layout('new', [('main', 'm'), ('aside', 's')])
+
+    def create_page(self, placeholders):
+        page = models.FluentContentsLayoutPage.objects.create(title='Page', layout=self.old_layout)
+        for slot, role, sort_orders in placeholders:
+            placeholder = Placeholder.objects.create(parent=page, slot=slot, role=role)
+            for sort_order in sort_orders:
+                RawHtmlItem.objects.create_for_placeholder(
+                    placeholder, html='{0} {1}'.format(slot, sort_order), sort_order=sort_order
+                )
+        return page
+
+    def get_content(self, page):
+        return {
+            placeholder.slot: (placeholder.role, [
+                (item.html, item.sort_order) for item in placeholder.get_content_items()
+            ])
+            for placeholder in Placeholder.objects.parent(page)
+        }
+
+    def test_get_slot_mapping(self):
+        mapping = relayout.get_slot_mapping(
+            self.old_layout.get_placeholder_data(), self.new_layout.get_placeholder_data()
+        )
+        self.assertEqual(
+            {slot: target and target.slot for slot, target in mapping.items()},
+            {'main': 'main', 'sidebar': 'aside', 'extra': 'aside', 'legacy': None}
+        )
+
+        # Test to see if a single placeholder takes the content of every role.
+        single_layout = create_layout('single', [('content', 'm')])
+        mapping = relayout.get_slot_mapping(
+            self.old_layout.get_placeholder_data(), single_layout.get_placeholder_data()
+        )
+        self.assertEqual({target.slot for target in mapping.values()}, {'content'})
+
+    def test_relayout_pages(self):
+        page = self.create_page([
+            ('main', 'm', [0, 1]), ('sidebar', 's', [0]), ('extra', 's', [3]), ('legacy', 'r', [0])
+        ])
+        other_page = self.create_page([('aside', 's', [5]), ('sidebar', 's', [1, 2])])
+        untouched_page = models.FluentContentsLayoutPage.objects.create(
+            title='Page', layout=self.new_layout
+        )
+
+        result = relayout.relayout_pages(self.old_layout, self.new_layout, batch_size=1)
+        self.assertEqual(result, relayout.RelayoutResult(2, 3, 3))
+        self.assertEqual(
+            models.FluentContentsLayoutPage.objects.filter(layout=self.new_layout).count(), 3
+        )
+        self.assertEqual(self.get_content(page), {
+            'main': ('m', [('main 0', 0), ('main 1', 1)]),
+            'aside': ('s', [('sidebar 0', 0), ('extra 3', 1)]),
+            'legacy': ('r', [('legacy 0', 0)]),
+        })
+        self.assertEqual(self.get_content(other_page), {
+            'aside': ('s', [('aside 5', 5), ('sidebar 1', 6), ('sidebar 2', 7)]),
+        })
+        self.assertEqual(self.get_content(untouched_page), {})
+
+    def test_relayout_pages_page_ids(self):
+        page = self.create_page([('sidebar', 's', [0])])
+        other_page = self.create_page([('sidebar', 's', [0])])
+        result = relayout.relayout_pages(self.old_layout, self.new_layout, page_ids=[page.pk])
+        self.assertEqual(result, relayout.RelayoutResult(1, 1, 0))
+        self.assertEqual(list(self.get_content(page)), ['aside'])
+        self.assertEqual(list(self.get_content(other_page)), ['sidebar'])
+
+    def test_relayout_pages_clears_output(self):
+        page = self.create_page([('sidebar', 's', [0])])
+        django_cache.set(cache.get_placeholder_cache_key(page.pk, 'sidebar'), 'output')
+        version = cache.get_tag_versions([cache.get_page_tag(page.pk)])
+        relayout.relayout_pages(self.old_layout, self.new_layout)
+        self.assertIsNone(django_cache.get(cache.get_placeholder_cache_key(page.pk, 'sidebar')))
+        self.assertNotEqual(cache.get_tag_versions([cache.get_page_tag(page.pk)]), version)
+
+
+class TemplateFiles(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        for relative_path in (
+            'base.html',
+            'layouts/default.html',
+            'layouts/notes.txt',
+            'layouts/wide/full.html',
+            'includes/header.html',
+        ):
+            self.write(relative_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, relative_path):
+        file_path = os.path.join(self.path, relative_path)
+        if not os.path.isdir(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path))
+        open(file_path, 'w').close()
+
+    def relative_files(self, index):
+        return [f.replace(self.path + '/', '', 1) for f in index.get_files()]
+
+    def test_templateindex_get_files(self):
+        index = templatefiles.TemplateIndex(self.path, match=r'.*\.html$')
+        self.assertEqual(
+            self.relative_files(index),
+            [
+                'base.html',
+                'includes/header.html',
+                'layouts/default.html',
+                'layouts/wide/full.html',
+            ]
+        )
+
+    def test_templateindex_max_depth_and_exclude(self):
+        index = templatefiles.TemplateIndex(
+            self.path,
+            match=r'.*\.html$',
+            max_depth=1,
+            exclude=('includes/', 'base.*')
+        )
+        self.assertEqual(self.relative_files(index), ['layouts/default.html'])
+
+    def test_templateindex_detects_changes(self):
+        index = templatefiles.TemplateIndex(self.path, match=r'.*\.html$')
+        self.assertNotIn('layouts/new.html', self.relative_files(index))
+
+        self.write('layouts/new.html')
+        self.write('emails/welcome.html')
+        self.assertIn('layouts/new.html', self.relative_files(index))
+        self.assertIn('emails/welcome.html', self.relative_files(index))
+
+        shutil.rmtree(os.path.join(self.path, 'layouts'))
+        self.assertEqual(
+            self.relative_files(index),
+            ['base.html', 'emails/welcome.html', 'includes/header.html']
+        )
+
+    def test_templateindex_only_lists_changed_directories(self):
+        listed = []
+
+        class CountingTemplateIndex(templatefiles.TemplateIndex):
+            def _list_directory(self, relative_path, depth):
+                listed.append(relative_path)
+                return super(CountingTemplateIndex, self)._list_directory(relative_path, depth)
+
+        # Age the directories so their modification times are trusted.
+        for root, dirs, files in os.walk(self.path):
+            os.utime(root, (1, 1))
+
+        index = CountingTemplateIndex(self.path, match=r'.*\.html$')
+        index.get_files()
+        self.assertEqual(len(listed), 4)
+
+        del listed[:]
+        index.get_files()
+        self.assertEqual(listed, [])
+
+        os.utime(os.path.join(self.path, 'layouts'), (2, 2))
+        index.get_files()
+        self.assertEqual(listed, ['layouts'])
+
+        del listed[:]
+        index.refresh()
+        self.assertEqual(len(listed), 4)
+
+    def test_templateindex_check_interval(self):
+        index = templatefiles.TemplateIndex(self.path, match=r'.*\.html$', check_interval=60)
+        files = index.get_files()
+        self.write('layouts/new.html')
+        self.assertEqual(index.get_files(), files)
+        index.refresh()
+        self.assertNotEqual(index.get_files(), files)
+
+    def test_get_template_file_path(self):
+        self.assertEqual(
+            templatefiles.get_template_file_path('layouts/default.html'),
+            os.path.join(appsettings.get_template_dir(), 'layouts/default.html')
+        )
+        self.assertEqual(
+            templatefiles.get_template_file_path('/absolute/default.html'),
+            '/absolute/default.html'
+        )
+
+        # Test to see if a missing template dir is reported as a configuration error.
+        with self.settings(MEZZANINE_PAGES_TEMPLATE_DIR=None):
+            self.assertRaises(
+                ImproperlyConfigured, templatefiles.get_template_file_path, 'layouts/default.html'
+            )
+
+    def test_get_template_file_hash(self):
+        file_path = os.path.join(self.path, 'base.html')
+        self.assertEqual(
+            templatefiles.get_template_file_hash(file_path),
+            hashlib.sha1(b'').hexdigest()
+        )
+
+        with open(file_path, 'w') as template_file:
+            template_file.write('{% block main %}{% endblock %}')
+        self.assertEqual(
+            templatefiles.get_template_file_hash(file_path),
+            hashlib.sha1(b'{% block main %}{% endblock %}').hexdigest()
+        )
+
+        self.assertIsNone(templatefiles.get_template_file_hash(file_path + '.missing'))
+
+    def test_templatecache(self):
+        file_path = os.path.join(self.path, 'base.html')
+        loaded = []
+
+        def load(template_path):
+            loaded.append(template_path)
+            return object()
+
+        cache = templatefiles.TemplateCache()
+        template = cache.get(1, file_path, load)
+        self.assertIs(cache.get(1, file_path, load), template)
+        self.assertEqual(loaded, [file_path])
+
+        # Test to see if a changed path or file loads the template again.
+        other_file_path = os.path.join(self.path, 'layouts/default.html')
+        self.assertIsNot(cache.get(1, other_file_path, load), template)
+        template = cache.get(1, other_file_path, load)
+        with open(other_file_path, 'w') as template_file:
+            template_file.write('changed')
+        self.assertIsNot(cache.get(1, other_file_path, load), template)
+        self.assertEqual(len(loaded), 3)
+
+        # Test to see if clearing the cache loads the template again.
+        cache.clear(1)
+        cache.get(1, other_file_path, load)
+        cache.get(2, other_file_path, load)
+        cache.clear()
+        cache.get(1, other_file_path, load)
+        cache.get(2, other_file_path, load)
+        self.assertEqual(len(loaded), 7)
+
+    def test_get_template_index(self):
+        index = templatefiles.get_template_index(self.path, r'.*\.html$')
+        self.assertIs(templatefiles.get_template_index(self.path, r'.*\.html$'), index)
+        self.assertIsNot(templatefiles.get_template_index(self.path), index)
+
+        files = index.get_files()
+        index.check_interval = 60
+        self.write('layouts/new.html')
+        templatefiles.refresh_template_indexes()
+        self.assertEqual(len(index.get_files()), len(files) + 1)
+
+
+class TemplateTags(TestCase):
+    def test_page_placeholder(self):
+        django_cache.clear()
+        layout = models.PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        layout_page = models.FluentContentsLayoutPage.objects.create(title='Page', layout=layout)
+        template = Template(
+            '{% load fluent_mezzanine_layout_tags %}{% page_placeholder page "main" %}'
+        )
+        context = Context({'page': layout_page, 'request': RequestFactory().get('/')})
+        self.assertIn("placeholder 'main' does not yet exist", template.render(context))
+
+        placeholder = Placeholder.objects.create_for_object(layout_page, 'main')
+        item = RawHtmlItem.objects.create_for_placeholder(placeholder, html='<p>html</p>')
+        self.assertIn('<p>html</p>', template.render(context))
+
+        # Test to see if the cached output is rendered without any queries.
+        with self.assertNumQueries(0):
+            self.assertIn('<p>html</p>', template.render(context))
+
+        # Test to see if changed content is rendered.
+        item.html = '<p>changed</p>'
+        item.save()
+        self.assertIn('<p>changed</p>', template.render(context))
+
+
+class Validation(TestCase):
+    def test_analyse_template(self):
+        template = Template(
+            '{% load fluent_mezzanine_layout_tags %}'
+            '{% page_placeholder page "main" role="m" %}'
+            '{% page_placeholder page "sidebar" role="s" %}'
+            '{% page_placeholder page "main" role="s" %}'
+        )
+        placeholders, duplicates = validation.analyse_template(template)
+        self.assertEqual(
+            [(placeholder['slot'], placeholder['role']) for placeholder in placeholders],
+            [('main', 'm'), ('sidebar', 's')]
+        )
+        self.assertEqual(duplicates, ['main'])
+
+    def test_check_template(self):
+        result = validation.check_template('layouts/default.html')
+        self.assertEqual(result.errors, [])
+        self.assertEqual(result.placeholders[0]['slot'], 'main')
+        self.assertEqual(
+            result.template_hash, templatefiles.get_template_file_hash('layouts/default.html')
+        )
+
+        result = validation.check_template('layouts/missing.html')
+        self.assertIsNone(result.placeholders)
+        self.assertIn('Missing file', result.errors[0])
+
+        # Test to see if syntax errors are reported.
+        get_template = validation.get_template
+        validation.get_template = lambda name: Template('{% page_placeholder %}')
+        try:
+            result = validation.check_template('layouts/default.html')
+        finally:
+            validation.get_template = get_template
+        self.assertIsNone(result.placeholders)
+        self.assertIn('Syntax error', result.errors[0])
+
+    def test_check_templates(self):
+        results = list(validation.check_templates(['layouts/default.html', 'layouts/missing.html']))
+        self.assertEqual(
+            [bool(result.errors) for result in results],
+            [False, True]
+        )
+
+    def test_get_template_paths(self):
+        models.PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        self.assertEqual(validation.get_template_paths(), ['layouts/default.html'])
+        self.assertIn(
+            'admin/fluent_mezzanine/move_pages.html',
+            validation.get_template_paths(all_templates=True)
+        )
+
+    def test_store_analysis(self):
+        layout = create_layout('default', [('other', 'm')])
+        models.PageLayout.objects.filter(pk=layout.pk).update(
+            template_path='layouts/default.html'
+        )
+        result = validation.check_template('layouts/default.html')
+        self.assertEqual(validation.store_analysis(result), 1)
+        layout = models.PageLayout.objects.get(pk=layout.pk)
+        self.assertEqual(layout.template_hash, result.template_hash)
+        self.assertEqual([p.slot for p in layout.get_placeholder_data()], ['main'])
+
+
 class Widgets(TestCase):
     def test_layout_selector_renders(self):
         ls = widgets.LayoutSelector()
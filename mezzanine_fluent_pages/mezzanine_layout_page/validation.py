@@ -0,0 +1,148 @@
+"""
+Checking and analysing layout templates ahead of their use.
+
+A broken layout template otherwise shows up when an editor opens a page
+of the layout or a visitor requests one. Every template is compiled and
+analysed for its placeholders, in worker processes when more than one
+worker is used, reporting missing files, syntax errors and slots that are
+defined more than once (the analysis of `fluent_contents` silently keeps
+the first of those). The analysis can be stored for the web server
+processes to reuse, see the `analysis` module.
+"""
+import collections
+import json
+import os
+import time
+from multiprocessing import Pool
+
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from fluent_contents.templatetags.fluent_contents_tags import PagePlaceholderNode
+from template_analyzer.djangoanalyzer import get_node_instances
+
+from . import analysis, appsettings, models, templatefiles
+
+# The outcome of checking a template, `placeholders` is `None` when it could not be analysed.
+TemplateResult = collections.namedtuple(
+    'TemplateResult', ('template_path', 'template_hash', 'placeholders', 'duration', 'errors')
+)
+
+
+def get_template_paths(all_templates=False):
+    """
+    Return the template paths to check.
+
+    :param all_templates: Also include every `.html` file in
+    `MEZZANINE_PAGES_TEMPLATE_DIR`, not only the templates of the layouts.
+    :return: Sorted list of template paths as stored on a `PageLayout`.
+    """
+    template_paths = set(models.PageLayout.objects.values_list('template_path', flat=True))
+    if all_templates:
+        template_dir = appsettings.require_template_dir()
+        for file_path in templatefiles.get_template_index(template_dir, r'.*\.html$').get_files():
+            template_paths.add(os.path.relpath(file_path, template_dir))
+    return sorted(template_paths)
+
+
+def analyse_template(template):
+    """
+    Find the placeholders of a template and the slots defined more than once.
+
+    :param template: Template object.
+    :return: Tuple of a list of placeholder dictionaries, as made by
+    `PageLayout.analyse_template`, and a sorted list of duplicate slots.
+    """
+    placeholders = []
+    slots = collections.Counter()
+    for node in get_node_instances(template, PagePlaceholderNode):
+        slot = node.get_slot()
+        slots[slot] += 1
+        if slots[slot] == 1:
+            placeholders.append({
+                'slot': slot,
+                'title': node.get_title(),
+                'role': node.get_role(),
+                'fallback_language': node.get_fallback_language(),
+            })
+    return placeholders, sorted(slot for slot, count in slots.items() if count > 1)
+
+
+def check_template(template_path):
+    """
+    Compile and analyse a template.
+
+    :param template_path: Template path as stored on a `PageLayout`.
+    :return: `TemplateResult` tuple.
+    """
+    start = time.time()
+    template_hash = templatefiles.get_template_file_hash(template_path)
+    if template_hash is None:
+        return TemplateResult(
+            template_path, None, None, time.time() - start,
+            ['Missing file {0}'.format(templatefiles.get_template_file_path(template_path))]
+        )
+
+    try:
+        template = get_template(template_path)
+    except TemplateDoesNotExist as e:
+        return TemplateResult(
+            template_path, template_hash, None, time.time() - start,
+            ['Template does not exist: {0}'.format(e)]
+        )
+    except TemplateSyntaxError as e:
+        return TemplateResult(
+            template_path, template_hash, None, time.time() - start,
+            ['Syntax error: {0}'.format(e)]
+        )
+
+    try:
+        placeholders, duplicates = analyse_template(template)
+    except Exception as e:
+        # An extended or included template can be missing or broken as well.
+        return TemplateResult(
+            template_path, template_hash, None, time.time() - start,
+            ['Analysis failed: {0}: {1}'.format(e.__class__.__name__, e)]
+        )
+    errors = ['Duplicate slot "{0}"'.format(slot) for slot in duplicates]
+    return TemplateResult(template_path, template_hash, placeholders, time.time() - start, errors)
+
+
+def check_templates(template_paths, workers=1):
+    """
+    Compile and analyse templates, in worker processes when more than one
+    worker is used.
+
+    :param template_paths: List of template paths as stored on a `PageLayout`.
+    :param workers: Number of templates checked at the same time.
+    :return: Iterator of `TemplateResult` tuples, in order of completion.
+    """
+    if workers <= 1:
+        for template_path in template_paths:
+            yield check_template(template_path)
+        return
+
+    # The forked processes must not share the database connections.
+    for connection in connections.all():
+        connection.close()
+    pool = Pool(workers)
+    try:
+        for result in pool.imap_unordered(check_template, template_paths):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def store_analysis(result):
+    """
+    Store the analysis of a template for the layouts and processes using it.
+
+    :param result: `TemplateResult` tuple of a template that was analysed.
+    :return: Number of layouts using the template.
+    """
+    analysis.set_cached_analysis(result.template_path, result.template_hash, result.placeholders)
+    return models.PageLayout.objects.filter(template_path=result.template_path).update(
+        placeholder_data=json.dumps(result.placeholders),
+        template_hash=result.template_hash,
+    )
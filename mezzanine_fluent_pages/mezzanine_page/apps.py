@@ -7,3 +7,11 @@ class FluentMezzaninePageConfig(AppConfig):
     """
     label = 'fluent_mezzanine_page'
     name = 'mezzanine_fluent_pages.mezzanine_page'
+
+    def ready(self):
+        """
+        Connect the signal receivers.
+
+        :return: None.
+        """
+        from .. import receivers  # NOQA
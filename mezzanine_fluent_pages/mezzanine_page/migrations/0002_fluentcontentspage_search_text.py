@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fluent_mezzanine_page', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fluentcontentspage',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
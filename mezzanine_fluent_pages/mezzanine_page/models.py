@@ -1,12 +1,22 @@
+from django.db import models
 from fluent_contents.models import PlaceholderField
 from mezzanine.pages.models import Page
 
+from .. import cache
+
 
 class FluentContentsPage(Page):
     """
     A mezzanine `Page` type with fluent contents.
     """
     content = PlaceholderField('mezzanine_page_content')
+    # Denormalised text of the content items, see the `search` module.
+    search_text = models.TextField(
+        editable=False,
+        blank=True
+    )
+
+    search_fields = ('search_text',)
 
     def get_template_name(self):
         """
@@ -15,3 +25,11 @@ class FluentContentsPage(Page):
         :return: String of template location.
         """
         return 'fluent_mezzanine/fluent_contents_page.html'
+
+    def get_cache_dependencies(self):
+        """
+        Obtain what the rendered page depends on, for the page cache.
+
+        :return: Tuple of a list of tags and a list of template file paths.
+        """
+        return [cache.get_page_tag(self.pk)], []
@@ -0,0 +1,159 @@
+"""
+Template tags for page templates, load them with:
+
+.. code-block:: html+django
+
+    {% load fluent_mezzanine_page_tags %}
+
+`render_placeholder` takes the same arguments as the tag of
+`fluent_contents`, the output of the placeholder is cached per page, slot
+and language, and served while stale as configured by
+`MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE`. Output rendered with
+a `template` is left to the cache of `fluent_contents`.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.template import Library, TemplateSyntaxError, Variable, VariableDoesNotExist
+from django.utils import six
+from fluent_contents import rendering
+from fluent_contents.models import PlaceholderField
+from fluent_contents.templatetags.fluent_contents_tags import (
+    RenderPlaceholderNode, _get_placeholder_arg
+)
+from fluent_contents.utils.templatetags import extract_literal, is_true
+
+from ... import cache, instrumentation, utils
+
+register = Library()
+
+
+@register.tag
+def render_placeholder(parser, token):
+    """
+    Render the placeholder of a page. Syntax:
+
+    .. code-block:: html+django
+
+        {% render_placeholder page.get_content_model.content %}
+    """
+    return CachedRenderPlaceholderNode.parse(parser, token)
+
+
+def get_placeholder_field_parent(expression, context):
+    """
+    Return the object and slot a `PlaceholderField` expression refers to.
+
+    The field itself is not resolved, as its descriptor queries the
+    placeholder.
+
+    :param expression: `FilterExpression` of the placeholder argument.
+    :param context: Template context.
+    :return: Tuple of the parent object and slot name, or `None` when the
+    expression does not name a `PlaceholderField` of an object.
+    """
+    variable = expression.var
+    if expression.filters or not isinstance(variable, Variable) or not variable.lookups:
+        return None
+    lookups = variable.lookups
+    if len(lookups) < 2:
+        return None
+
+    try:
+        parent = Variable('.'.join(lookups[:-1])).resolve(context)
+        field = parent._meta.get_field(lookups[-1])
+    except (VariableDoesNotExist, AttributeError, FieldDoesNotExist):
+        return None
+    if not isinstance(field, PlaceholderField):
+        return None
+    return parent, field.slot
+
+
+class CachedRenderPlaceholderNode(RenderPlaceholderNode):
+    """
+    The template node of the `render_placeholder` tag.
+    """
+    def render(self, context):
+        """
+        Render the tag, leaving the placeholder argument unresolved.
+
+        :param context: Template context.
+        :return: HTML string.
+        """
+        tag_kwargs = {name: expr.resolve(context) for name, expr in six.iteritems(self.kwargs)}
+        return self.render_tag(context, self.args[0], **tag_kwargs)
+
+    def get_value(self, context, *tag_args, **tag_kwargs):
+        """
+        Render the placeholder, using the cached output when available.
+
+        The placeholder of a `PlaceholderField` is only fetched when its
+        output is rendered, so cached output is served without queries.
+
+        :param context: Template context.
+        :param tag_args: Unresolved `FilterExpression` of the placeholder.
+        :param tag_kwargs: Tag keyword arguments.
+        :return: HTML string.
+        """
+        request = self.get_request(context)
+        expression = tag_args[0]
+        template_name = tag_kwargs.get('template', None)
+        cachable = is_true(tag_kwargs.get('cachable', not bool(template_name)))
+        fallback_language = is_true(tag_kwargs.get('fallback', False))
+
+        if template_name and cachable and not extract_literal(self.kwargs['template']):
+            raise TemplateSyntaxError(
+                "{0} tag does not allow 'cachable' for variable template names!".format(
+                    self.tag_name
+                )
+            )
+
+        field_parent = get_placeholder_field_parent(expression, context)
+        if field_parent is None:
+            try:
+                placeholder = _get_placeholder_arg(self.args[0], expression.resolve(context))
+            except RuntimeWarning as e:
+                return u"<!-- {0} -->".format(e)
+            parent_id, slot = placeholder.parent_id, placeholder.slot
+            is_page = placeholder.parent_type_id in utils.get_page_type_ids()
+        else:
+            placeholder = None
+            parent, slot = field_parent
+            parent_id = parent.pk
+            is_page = isinstance(parent, tuple(utils.get_page_models()))
+
+        def render():
+            resolved_placeholder = placeholder
+            if resolved_placeholder is None:
+                try:
+                    resolved_placeholder = _get_placeholder_arg(
+                        self.args[0], expression.resolve(context)
+                    )
+                except RuntimeWarning:
+                    return None
+            return rendering.render_placeholder(
+                request,
+                resolved_placeholder,
+                resolved_placeholder.parent,
+                template_name=template_name,
+                cachable=cachable,
+                limit_parent_language=True,
+                fallback_language=fallback_language
+            )
+
+        # Only the output of pages is cleared when content changes. Output rendered with a
+        # fallback language is not cached either, as it is not cleared when content is added in
+        # the requested language, nor output rendered with another template, which is not part
+        # of the cache key.
+        with instrumentation.placeholder_timer(slot):
+            output = cache.get_placeholder_output(
+                request,
+                parent_id,
+                slot,
+                render,
+                cachable=cachable and not fallback_language and not template_name and is_page,
+                timeouts=cache.get_revalidation_timeouts(None, slot)
+            )
+        if output is None:
+            return u"<!-- placeholder '{0}' does not yet exist -->".format(slot)
+
+        rendering.register_frontend_media(request, output.media)
+        return output.html
@@ -1,4 +1,13 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+from fluent_contents.models import Placeholder
+from fluent_contents.plugins.rawhtml.models import RawHtmlItem
 
 from . import models
 
@@ -9,3 +18,52 @@ class Models(TestCase):
             models.FluentContentsPage().get_template_name(),
             'fluent_mezzanine/fluent_contents_page.html'
         )
+
+
+class TemplateTags(TestCase):
+    def test_render_placeholder(self):
+        django_cache.clear()
+        page = models.FluentContentsPage.objects.create(title='Page')
+        placeholder = Placeholder.objects.create_for_object(page, 'mezzanine_page_content')
+        item = RawHtmlItem.objects.create_for_placeholder(placeholder, html='<p>html</p>')
+        template = Template(
+            '{% load fluent_mezzanine_page_tags %}{% render_placeholder placeholder %}'
+        )
+        context = Context({'placeholder': placeholder, 'request': RequestFactory().get('/')})
+        self.assertIn('<p>html</p>', template.render(context))
+
+        # Test to see if the cached output is rendered without any queries.
+        with self.assertNumQueries(0):
+            self.assertIn('<p>html</p>', template.render(context))
+
+        # Test to see if changed content is rendered.
+        item.html = '<p>changed</p>'
+        item.save()
+        self.assertIn('<p>changed</p>', template.render(context))
+
+    def test_render_placeholder_field(self):
+        django_cache.clear()
+        page = models.FluentContentsPage.objects.create(title='Page')
+        placeholder = Placeholder.objects.create_for_object(page, 'mezzanine_page_content')
+        RawHtmlItem.objects.create_for_placeholder(placeholder, html='<p>html</p>')
+        template = Template(
+            '{% load fluent_mezzanine_page_tags %}{% render_placeholder page.content %}'
+        )
+        context = Context({'page': page, 'request': RequestFactory().get('/')})
+        self.assertIn('<p>html</p>', template.render(context))
+
+        # Test to see if the placeholder of the field is not fetched for the cached output.
+        with self.assertNumQueries(0):
+            self.assertIn('<p>html</p>', template.render(context))
+
+        # Test to see if output rendered with another template is not served from the cache.
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        with open(os.path.join(path, 'placeholder.html'), 'w') as template_file:
+            template_file.write('custom')
+        with self.settings(TEMPLATE_DIRS=list(settings.TEMPLATE_DIRS) + [path]):
+            template = Template(
+                '{% load fluent_mezzanine_page_tags %}'
+                '{% render_placeholder page.content template="placeholder.html" cachable=1 %}'
+            )
+            self.assertEqual(template.render(context), 'custom')
@@ -0,0 +1,247 @@
+import hashlib
+import re
+
+from django.core.cache import cache as django_cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import has_vary_header
+from mezzanine.utils.cache import cache_key_prefix
+from mezzanine.utils.urls import path_to_slug
+
+from . import appsettings, cache, instrumentation, utils
+
+try:
+    from django.utils.deprecation import MiddlewareMixin
+except ImportError:
+    # `Django<1.10` middleware are plain classes.
+    MiddlewareMixin = object
+
+
+class PageCacheMiddleware(MiddlewareMixin):
+    """
+    Cache the responses of fluent pages until something they depend on changes.
+
+    Every cached response records the versions of the tags of the page
+    (see `get_cache_dependencies()` on the page models) and of the
+    template files it was rendered with. A cached response is only served
+    while those are unchanged, so it can be kept for a long time.
+
+    Only anonymous `GET` requests for the URL of the page itself are
+    cached, and responses which use a CSRF token, the session or cookies,
+    or show messages are never stored.
+    """
+    def process_request(self, request):
+        """
+        Return the cached response of a page when it is still current.
+
+        :param request: Django request object.
+        :return: HttpResponse object or `None`.
+        """
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated():
+            return None
+
+        cache_key = self.get_cache_key(request)
+        any_tag_cache_key = cache.get_tag_cache_key(cache.ANY_TAG)
+        cached = django_cache.get_many([cache_key, any_tag_cache_key])
+        if request.method == 'GET':
+            # Remember the version of `ANY_TAG`, a change while the page renders prevents storing
+            # the response.
+            any_version = cached.get(any_tag_cache_key)
+            if any_version is None:
+                any_version = cache.get_tag_versions([cache.ANY_TAG])[cache.ANY_TAG]
+            request._page_cache_key = cache_key
+            request._page_cache_any_version = any_version
+
+        entry = cached.get(cache_key)
+        if entry is not None and self.is_current(entry):
+            return entry['response']
+        return None
+
+    def process_response(self, request, response):
+        """
+        Store the response of a page with the versions of its dependencies.
+
+        :param request: Django request object.
+        :param response: HttpResponse object.
+        :return: HttpResponse object.
+        """
+        cache_key = getattr(request, '_page_cache_key', None)
+        page = getattr(request, 'page', None)
+        if (
+            cache_key is None or
+            page is None or
+            page.login_required or
+            # `PageMiddleware` also sets the closest page for other views below it.
+            page.slug != path_to_slug(request.path_info) or
+            response.status_code != 200 or
+            getattr(response, 'streaming', False) or
+            response.cookies or
+            has_vary_header(response, 'Cookie') or
+            self.uses_session(request) or
+            'private' in response.get('Cache-Control', '') or
+            request.META.get('CSRF_COOKIE_USED') or
+            len(getattr(request, '_messages', ()))
+        ):
+            return response
+
+        content_model = page.get_content_model()
+        if not isinstance(content_model, tuple(utils.get_page_models())):
+            return response
+
+        tags, file_paths = cache.get_page_dependencies(content_model)
+        versions = cache.get_tag_versions(tags + [cache.ANY_TAG])
+        if versions.pop(cache.ANY_TAG) != request._page_cache_any_version:
+            return response
+
+        entry = {
+            'response': response,
+            'versions': versions,
+            'files': {file_path: utils.get_file_version(file_path) for file_path in file_paths},
+        }
+        django_cache.set(cache_key, entry, appsettings.MEZZANINE_PAGES_PAGE_CACHE_TIMEOUT)
+        return response
+
+    def uses_session(self, request):
+        """
+        Whether the response can depend on the session of the visitor.
+
+        Looking up the anonymous user always accesses the session, so a
+        session that holds no data and was not changed is not used.
+
+        :param request: Django request object.
+        :return: Boolean.
+        """
+        session = getattr(request, 'session', None)
+        return session is not None and (session.modified or bool(list(session.keys())))
+
+    def get_cache_key(self, request):
+        """
+        Return the cache key of the response for a request.
+
+        :param request: Django request object.
+        :return: Cache key string.
+        """
+        url = cache_key_prefix(request) + request.build_absolute_uri()
+        return 'mezzanine_fluent_pages.response.{0}'.format(
+            hashlib.md5(url.encode('utf-8')).hexdigest()
+        )
+
+    def is_current(self, entry):
+        """
+        Whether the dependencies of a cached response are unchanged.
+
+        :param entry: Cached response entry.
+        :return: Boolean.
+        """
+        for file_path, version in entry['files'].items():
+            if utils.get_file_version(file_path) != version:
+                return False
+        return cache.get_tag_versions(entry['versions']) == entry['versions']
+
+
+class PageRenderInstrumentationMiddleware(MiddlewareMixin):
+    """
+    Measure the queries and time spent rendering fluent pages.
+
+    See the `instrumentation` module for the recorded measurements.
+    """
+    def process_request(self, request):
+        """
+        Start measuring the request.
+
+        :param request: Django request object.
+        :return: None.
+        """
+        request._page_render = instrumentation.PageRender(path=request.path)
+        request._page_render.__enter__()
+
+    def process_response(self, request, response):
+        """
+        Record the measurements of the request when it rendered a fluent page.
+
+        :param request: Django request object.
+        :param response: HttpResponse object.
+        :return: HttpResponse object.
+        """
+        page_render = getattr(request, '_page_render', None)
+        if page_render is not None:
+            del request._page_render
+            page_render.page = getattr(request, 'page', None)
+            page_render.__exit__(None, None, None)
+        return response
+
+
+class ServerTimingMiddleware(MiddlewareMixin):
+    """
+    Add a `Server-Timing` header with the durations of the render phases.
+
+    The header breaks the response time of fluent pages down into the
+    phases of `instrumentation.PHASES` and the render of every placeholder,
+    so browser developer tools show where the time went. The middleware
+    removes itself unless `MEZZANINE_PAGES_SERVER_TIMING` is enabled.
+    """
+    def __init__(self, *args, **kwargs):
+        if not appsettings.MEZZANINE_PAGES_SERVER_TIMING:
+            raise MiddlewareNotUsed
+        super(ServerTimingMiddleware, self).__init__(*args, **kwargs)
+
+    def process_request(self, request):
+        """
+        Start measuring the request, unless it is measured already.
+
+        :param request: Django request object.
+        :return: None.
+        """
+        if instrumentation.get_current_render() is None:
+            request._server_timing = instrumentation.PageRender(count_queries=False, record=False)
+            request._server_timing.__enter__()
+
+    def process_response(self, request, response):
+        """
+        Add the `Server-Timing` header to responses of fluent pages.
+
+        :param request: Django request object.
+        :param response: HttpResponse object.
+        :return: HttpResponse object.
+        """
+        render = getattr(request, '_server_timing', None)
+        if render is not None:
+            del request._server_timing
+            render.__exit__(None, None, None)
+        else:
+            render = instrumentation.get_current_render()
+        if render is None:
+            return response
+
+        render.page = getattr(request, 'page', None)
+        if render.get_content_model() is not None:
+            response['Server-Timing'] = self.get_header(render)
+        return response
+
+    def get_header(self, render):
+        """
+        Return the `Server-Timing` header value of a render.
+
+        :param render: `PageRender` object.
+        :return: String.
+        """
+        metrics = [
+            (phase, render.phases[phase], description)
+            for phase, description in instrumentation.PHASES.items()
+            if phase in render.phases
+        ]
+        metrics.extend(
+            (
+                'placeholder-' + re.sub(r'[^\w-]', '-', slot),
+                duration,
+                'Placeholder {0}'.format(slot)
+            )
+            for slot, duration in render.placeholders.items()
+        )
+        if render.duration is not None:
+            metrics.append(('total', render.duration, 'Total'))
+        return ', '.join(
+            '{0};dur={1:.1f};desc="{2}"'.format(
+                name, duration * 1000, description.replace('\\', '').replace('"', '')
+            )
+            for name, duration, description in metrics
+        )
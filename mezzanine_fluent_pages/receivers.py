@@ -0,0 +1,100 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from fluent_contents.models import ContentItem, Placeholder
+from mezzanine.pages.models import Page
+
+from . import appsettings, cache, search, utils
+
+
+def get_page_placeholders(page_ids):
+    """
+    Return the placeholders of pages.
+
+    :param page_ids: Primary keys of the pages, or a queryset of them.
+    :return: Queryset of `(page_id, slot)` tuples.
+    """
+    return Placeholder.objects.filter(
+        parent_type__in=utils.get_page_type_ids(),
+        parent_id__in=page_ids,
+    ).values_list('parent_id', 'slot')
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def clear_content_item_output(sender, instance, **kwargs):
+    """
+    Remove the cached output of the placeholder and page of a content item that changed.
+
+    :param sender: `ContentItem` subclass.
+    :param instance: `ContentItem` object that changed.
+    :param kwargs: Additional keyword arguments.
+    :return: None.
+    """
+    if (
+        not isinstance(instance, ContentItem) or
+        instance.parent_type_id not in utils.get_page_type_ids()
+    ):
+        return
+
+    cache.expire_tags([cache.get_page_tag(instance.parent_id)])
+    search.schedule_search_text_update(
+        ContentType.objects.get_for_id(instance.parent_type_id).model_class(), instance.parent_id
+    )
+    try:
+        slot = instance.placeholder.slot
+    except Placeholder.DoesNotExist:
+        # Deleted along with the placeholder, which clears the output itself.
+        return
+    cache.clear_placeholder_output([(instance.parent_id, slot)])
+
+
+@receiver(post_save, sender=Placeholder)
+@receiver(post_delete, sender=Placeholder)
+def clear_placeholder_output(sender, instance, **kwargs):
+    """
+    Remove the cached output of a placeholder and its page that changed.
+
+    :param sender: `Placeholder` class.
+    :param instance: `Placeholder` object that changed.
+    :param kwargs: Additional keyword arguments.
+    :return: None.
+    """
+    if instance.parent_type_id in utils.get_page_type_ids():
+        cache.clear_placeholder_output([(instance.parent_id, instance.slot)])
+        cache.expire_tags([cache.get_page_tag(instance.parent_id)])
+
+
+def clear_page_output(sender, instance, **kwargs):
+    """
+    Remove the cached output of a page and all its placeholders that changed.
+
+    :param sender: `Page` class or subclass.
+    :param instance: `Page` object that changed.
+    :param kwargs: Additional keyword arguments.
+    :return: None.
+    """
+    page_model_names = {page_model._meta.model_name for page_model in utils.get_page_models()}
+    if instance.content_model in page_model_names:
+        cache.clear_placeholder_output(get_page_placeholders([instance.pk]))
+        cache.expire_tags([cache.get_page_tag(instance.pk)])
+
+
+for page_model in [Page] + utils.get_page_models():
+    post_save.connect(clear_page_output, sender=page_model)
+    post_delete.connect(clear_page_output, sender=page_model)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def expire_page_tree(sender, instance, **kwargs):
+    """
+    Make all cached pages stale when any page changed, as menus show the page tree.
+
+    :param sender: Model class.
+    :param instance: Model object that changed.
+    :param kwargs: Additional keyword arguments.
+    :return: None.
+    """
+    if isinstance(instance, Page) and appsettings.MEZZANINE_PAGES_PAGE_CACHE_TREE_DEPENDENCY:
+        cache.expire_tags([cache.TREE_TAG])
@@ -0,0 +1,206 @@
+"""
+Rendering of pages outside of a web request.
+
+Pages are requested through the complete request handling of the
+project, including its middleware, so that rendering a page fills the
+same caches a visitor would.
+"""
+import collections
+import threading
+import time
+import traceback
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q
+from django.dispatch import receiver
+from django.test import Client
+from django.test.signals import setting_changed
+from django.utils import timezone
+from mezzanine.core.models import CONTENT_STATUS_PUBLISHED
+
+from . import utils
+
+# A page to render, `layout` is the key of the layout or `None`, `secure`
+# whether the page is requested over https.
+PageTask = collections.namedtuple('PageTask', ('page_id', 'url', 'host', 'layout', 'secure'))
+
+# The outcome of rendering a page, `error` is `None` when it succeeded.
+PageResult = collections.namedtuple(
+    'PageResult', ('page_id', 'url', 'layout', 'status_code', 'duration', 'error')
+)
+
+# The test client of every worker thread or process.
+_clients = threading.local()
+
+
+@receiver(setting_changed)
+def reset_client(setting, **kwargs):
+    """
+    Discard the test client of the current thread when the middleware changes.
+
+    :param setting: Name of the changed setting.
+    :param kwargs: Additional signal arguments.
+    :return: None.
+    """
+    if setting in ('MIDDLEWARE', 'MIDDLEWARE_CLASSES'):
+        _clients.__dict__.clear()
+
+
+def get_client():
+    """
+    Return the test client of the current worker, without cookies.
+
+    A client loads the middleware on its first request, so every worker
+    thread or process reuses its own client instead of creating one per
+    page.
+
+    :return: `Client` instance.
+    """
+    client = getattr(_clients, 'client', None)
+    if client is None:
+        client = _clients.client = Client()
+    # Every page is requested as a new visitor.
+    client.cookies.clear()
+    return client
+
+
+def is_secure():
+    """
+    Return whether the project serves its pages over https.
+
+    The cache keys of the page cache include the scheme, so the pages are
+    rendered with the scheme visitors use.
+
+    :return: Whether `SECURE_SSL_REDIRECT` or `SESSION_COOKIE_SECURE` is set.
+    """
+    return bool(
+        getattr(settings, 'SECURE_SSL_REDIRECT', False) or settings.SESSION_COOKIE_SECURE
+    )
+
+
+def get_page_tasks(layout_keys=None, site_ids=None, subtree=None, secure=None):
+    """
+    Return the published pages of the installed page types to render.
+
+    Pages requiring a login are left out, as they are not rendered for
+    anonymous visitors.
+
+    :param layout_keys: Only include layout pages with these layout keys.
+    :param site_ids: Only include pages of these sites.
+    :param subtree: Only include the page with this slug and its
+    descendants.
+    :param secure: Whether the pages are requested over https, by default
+    when the project serves its pages over https.
+    :return: List of `PageTask` tuples ordered by page id.
+    """
+    if secure is None:
+        secure = is_secure()
+    now = timezone.now()
+    published = (
+        Q(status=CONTENT_STATUS_PUBLISHED) &
+        (Q(publish_date__lte=now) | Q(publish_date__isnull=True)) &
+        (Q(expiry_date__gte=now) | Q(expiry_date__isnull=True))
+    )
+    hosts = dict(Site.objects.values_list('pk', 'domain'))
+
+    tasks = []
+    for page_model in utils.get_page_models():
+        try:
+            page_model._meta.get_field('layout')
+        except FieldDoesNotExist:
+            has_layout = False
+        else:
+            has_layout = True
+        if layout_keys and not has_layout:
+            continue
+
+        # The default manager only returns the pages of the current site.
+        pages = page_model._base_manager.filter(published, login_required=False)
+        if has_layout:
+            pages = pages.select_related('layout')
+            if layout_keys:
+                pages = pages.filter(layout__key__in=layout_keys)
+        if site_ids:
+            pages = pages.filter(site_id__in=site_ids)
+        if subtree:
+            subtree = subtree.strip('/')
+            pages = pages.filter(Q(slug=subtree) | Q(slug__startswith=subtree + '/'))
+
+        for page in pages.iterator():
+            tasks.append(PageTask(
+                page.pk,
+                page.get_absolute_url(),
+                hosts.get(page.site_id),
+                page.layout.key if has_layout else None,
+                secure,
+            ))
+    tasks.sort(key=lambda task: task.page_id)
+    return tasks
+
+
+def render_page(task):
+    """
+    Request a page as an anonymous visitor.
+
+    :param task: `PageTask` tuple.
+    :return: `PageResult` tuple.
+    """
+    start = time.time()
+    try:
+        response = get_client().get(task.url, HTTP_HOST=task.host, secure=task.secure)
+    except Exception:
+        status_code, error = None, traceback.format_exc()
+    else:
+        status_code = response.status_code
+        error = None if status_code == 200 else 'HTTP status {0}'.format(status_code)
+    return PageResult(task.page_id, task.url, task.layout, status_code, time.time() - start, error)
+
+
+def render_pages(tasks, workers=1, processes=False):
+    """
+    Request pages, in parallel when more than one worker is used.
+
+    :param tasks: List of `PageTask` tuples.
+    :param workers: Number of pages rendered at the same time.
+    :param processes: Whether the workers are processes instead of
+    threads.
+    :return: Iterator of `PageResult` tuples, in order of completion.
+    """
+    return run_in_pool(render_page, tasks, workers=workers, processes=processes)
+
+
+def run_in_pool(function, tasks, workers=1, processes=False):
+    """
+    Call a function for every task, in parallel when more than one worker is used.
+
+    :param function: Module level function taking a task, so it can be
+    called in worker processes.
+    :param tasks: List of tasks.
+    :param workers: Number of tasks handled at the same time.
+    :param processes: Whether the workers are processes instead of
+    threads.
+    :return: Iterator of the results, in order of completion.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+
+    if processes:
+        # The forked processes must not share the database connections.
+        for connection in connections.all():
+            connection.close()
+        pool = Pool(workers)
+    else:
+        pool = ThreadPool(workers)
+    try:
+        for result in pool.imap_unordered(function, tasks):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,150 @@
+"""
+Plain text of the content of fluent pages, for the site search of Mezzanine.
+
+Mezzanine searches the fields named in the `search_fields` of a page model,
+the content of fluent pages lives in the tables of their content items.
+The text of the content items of a page is stored in the `search_text`
+field of both page models, so the search reads it from the row of the
+page. The text of a content item is the search text `fluent_contents`
+gives to indexers such as haystack: the fields in `search_fields` of its
+plugin, and its rendered output when the plugin sets `search_output`.
+
+The text of a page is stored again when its content items change, once
+the transaction they changed in commits.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from fluent_contents.extensions import PluginNotFound
+from fluent_contents.models import ContentItem, Placeholder
+from fluent_contents.rendering.core import SkipItem
+from fluent_contents.rendering.search import SearchRenderingPipe
+from fluent_contents.utils.search import get_cleaned_string
+
+from . import utils
+
+_pending = threading.local()
+
+
+def get_content_item_text(pipe, content_item):
+    """
+    Return the search text of a content item.
+
+    :param pipe: `SearchRenderingPipe` rendering the items.
+    :param content_item: `ContentItem` object of its own type.
+    :return: Plain text string.
+    """
+    try:
+        output = pipe.render_item(content_item)
+    except (PluginNotFound, SkipItem):
+        # The item is not indexed by its plugin, or its plugin is not installed.
+        return ''
+    return get_cleaned_string(output.html)
+
+
+def get_search_texts(model, page_ids):
+    """
+    Return the search text of pages.
+
+    The content is read in a query for the placeholders, one for the
+    content items and one per content item type.
+
+    :param model: Page model.
+    :param page_ids: List of primary keys of pages of the model.
+    :return: Dictionary of plain text strings by page id.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    placeholders = {}
+    for ids in utils.batches(page_ids):
+        placeholders.update(Placeholder.objects.filter(
+            parent_type=content_type, parent_id__in=ids
+        ).values_list('pk', 'parent_id'))
+
+    bits = {page_id: [] for page_id in page_ids}
+    pipe = SearchRenderingPipe(settings.LANGUAGE_CODE)
+    for ids in utils.batches(sorted(placeholders)):
+        for content_item in ContentItem.objects.filter(placeholder_id__in=ids).order_by(
+            'placeholder_id', 'sort_order', 'pk'
+        ):
+            bits[placeholders[content_item.placeholder_id]].append(
+                get_content_item_text(pipe, content_item)
+            )
+    return {page_id: ' '.join(' '.join(page_bits).split()) for page_id, page_bits in bits.items()}
+
+
+def update_search_texts(model, page_ids):
+    """
+    Store the search text of pages.
+
+    :param model: Page model.
+    :param page_ids: Primary keys of pages of the model.
+    :return: None.
+    """
+    for page_id, text in get_search_texts(model, list(page_ids)).items():
+        model._base_manager.filter(pk=page_id).update(search_text=text)
+
+
+def schedule_search_text_update(model, page_id):
+    """
+    Store the search text of a page when the current transaction commits.
+
+    The text of every page changed in the transaction is stored once, not
+    once per changed content item. Outside of a transaction it is stored
+    right away.
+
+    :param model: Page model.
+    :param page_id: Primary key of the page.
+    :return: None.
+    """
+    pending = getattr(_pending, 'pages', None)
+    if pending is None:
+        pending = _pending.pages = set()
+    pending.add((model, page_id))
+    on_commit = getattr(transaction, 'on_commit', None)
+    if on_commit is None:
+        # Django 1.8 has no commit hooks.
+        update_pending_search_texts()
+    else:
+        on_commit(update_pending_search_texts)
+
+
+def update_pending_search_texts():
+    """
+    Store the search text of the pages scheduled by `schedule_search_text_update`.
+
+    :return: None.
+    """
+    pending = getattr(_pending, 'pages', None)
+    if not pending:
+        return
+    _pending.pages = set()
+
+    by_model = {}
+    for model, page_id in pending:
+        by_model.setdefault(model, []).append(page_id)
+    for model, page_ids in by_model.items():
+        update_search_texts(model, page_ids)
+
+
+def rebuild_search_texts(chunk_size=500):
+    """
+    Store the search text of all pages of both page types.
+
+    :param chunk_size: Number of pages whose text is built at once.
+    :return: Number of pages.
+    """
+    count = 0
+    for model in utils.get_page_models():
+        pages = model._base_manager.order_by('pk')
+        last_pk = None
+        while True:
+            chunk = pages if last_pk is None else pages.filter(pk__gt=last_pk)
+            chunk = list(chunk.values_list('pk', flat=True)[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1]
+            update_search_texts(model, chunk)
+            count += len(chunk)
+    return count
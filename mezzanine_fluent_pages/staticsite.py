@@ -0,0 +1,316 @@
+"""
+Exporting the published fluent pages as a static site.
+
+Every page is requested through the complete request handling of the
+project, as in the `rendering` module, and its response is written to
+`<output dir>/<site domain>/<page path>/index.html`. Files are written
+atomically, so a web server serving the directory never sends a partial
+page.
+
+A manifest in the output directory records, for every exported page, its
+file and the versions of the tags and template files it was rendered with:
+the dependencies the page cache uses, and the template of the page with
+the templates it extends or includes. An incremental export only renders
+the pages whose dependencies changed since the previous export.
+The files of pages that are no longer published are removed.
+"""
+import collections
+import json
+import os
+import time
+import traceback
+
+from django.core.exceptions import FieldDoesNotExist
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.loader import get_template
+from django.template.loader_tags import ExtendsNode, IncludeNode
+from django.utils import six
+from django.utils.six.moves.urllib.parse import unquote, urlsplit
+
+from . import cache, rendering, utils
+
+# Name of the manifest file in the output directory.
+MANIFEST_FILE_NAME = '.mezzanine_fluent_pages.json'
+
+# Permissions of the exported files, readable by the web server.
+FILE_MODE = 0o644
+
+# A page to export, `file_path` is relative to `output_dir`.
+ExportTask = collections.namedtuple('ExportTask', ('page', 'output_dir', 'file_path'))
+
+# The outcome of exporting a page, `error` is `None` when it succeeded.
+ExportResult = collections.namedtuple(
+    'ExportResult', ('page_id', 'url', 'file_path', 'status_code', 'duration', 'error')
+)
+
+# The outcome of exporting a site, `results` only holds the pages that were rendered.
+ExportSummary = collections.namedtuple('ExportSummary', ('results', 'unchanged', 'removed'))
+
+
+def get_page_file_path(task):
+    """
+    Return the file a page is exported to.
+
+    :param task: `PageTask` tuple.
+    :return: File path relative to the output directory.
+    """
+    path = unquote(urlsplit(task.url).path)
+    # Leave out empty and relative segments, which could point outside of the output directory.
+    segments = [segment for segment in path.split('/') if segment not in ('', '.', '..')]
+    return os.path.join(task.host or 'default', *(segments + ['index.html']))
+
+
+def get_template_names(template_name, names=None):
+    """
+    Return a template name and the names of the templates it extends or includes.
+
+    Only templates named by a constant string are followed.
+
+    :param template_name: Template name.
+    :param names: List of the names found so far.
+    :return: List of template names.
+    """
+    if names is None:
+        names = []
+    if template_name in names:
+        return names
+    names.append(template_name)
+    try:
+        template = get_template(template_name)
+    except (TemplateDoesNotExist, TemplateSyntaxError):
+        return names
+
+    # The template of the Django backend wraps the compiled template.
+    nodelist = getattr(template, 'template', template).nodelist
+    expressions = [node.parent_name for node in nodelist.get_nodes_by_type(ExtendsNode)]
+    expressions.extend(node.template for node in nodelist.get_nodes_by_type(IncludeNode))
+    for expression in expressions:
+        name = getattr(expression, 'var', None)
+        if isinstance(name, six.string_types):
+            get_template_names(name, names)
+    return names
+
+
+def find_template_file(template_name):
+    """
+    Return the file the template loaders load a template from.
+
+    :param template_name: Template name.
+    :return: Absolute file path, or `None` when no loader finds a file.
+    """
+    for engine in engines.all():
+        # Only the Django template backend has loaders.
+        template_engine = getattr(engine, 'engine', None)
+        if template_engine is None:
+            continue
+        for loader in template_engine.template_loaders:
+            # The cached loader wraps the other loaders.
+            for source_loader in getattr(loader, 'loaders', [loader]):
+                get_template_sources = getattr(source_loader, 'get_template_sources', None)
+                if get_template_sources is None:
+                    continue
+                for source in get_template_sources(template_name):
+                    # `Django>=1.9` returns origins instead of file paths.
+                    file_path = getattr(source, 'name', source)
+                    if os.path.isfile(file_path):
+                        return file_path
+    return None
+
+
+def get_template_files(template_name):
+    """
+    Return the files of a template and the templates it extends or includes.
+
+    :param template_name: Template name.
+    :return: List of absolute file paths.
+    """
+    file_paths = []
+    for name in get_template_names(template_name):
+        file_path = find_template_file(name)
+        if file_path is not None and file_path not in file_paths:
+            file_paths.append(file_path)
+    return file_paths
+
+
+def get_page_versions(page_ids):
+    """
+    Return the versions of the tags and template files pages depend on.
+
+    The template files are those of the page cache dependencies and of the
+    template of the page, with the templates it extends or includes.
+
+    :param page_ids: List of primary keys of pages of the page models.
+    :return: Dictionary of dictionaries with `versions` of tags and
+    `files` versions by page id.
+    """
+    page_versions = {}
+    template_files = {}
+    for page_model in utils.get_page_models():
+        # The default manager only returns the pages of the current site.
+        pages = page_model._base_manager.all()
+        try:
+            page_model._meta.get_field('layout')
+        except FieldDoesNotExist:
+            pass
+        else:
+            pages = pages.select_related('layout')
+
+        for ids in utils.batches(page_ids):
+            pages_by_id = {page.pk: page for page in pages.filter(pk__in=ids)}
+            dependencies = {
+                page_id: cache.get_page_dependencies(page) for page_id, page in pages_by_id.items()
+            }
+            versions = cache.get_tag_versions({
+                tag for tags, file_paths in dependencies.values() for tag in tags
+            })
+            for page_id, (tags, file_paths) in dependencies.items():
+                template_name = pages_by_id[page_id].get_template_name()
+                if template_name not in template_files:
+                    template_files[template_name] = get_template_files(template_name)
+                file_versions = {}
+                for file_path in file_paths + template_files[template_name]:
+                    version = utils.get_file_version(file_path)
+                    # Stored as JSON, which has no tuples.
+                    file_versions[file_path] = list(version) if version is not None else None
+                page_versions[page_id] = {
+                    'versions': {tag: versions[tag] for tag in tags},
+                    'files': file_versions,
+                }
+    return page_versions
+
+
+def read_manifest(output_dir):
+    """
+    Return the manifest of the previous export to a directory.
+
+    :param output_dir: Output directory.
+    :return: Dictionary of manifest entries by page id, empty when there
+    is no readable manifest.
+    """
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE_NAME)) as manifest_file:
+            pages = json.load(manifest_file)['pages']
+    except (IOError, OSError, ValueError, KeyError):
+        return {}
+    return {int(page_id): entry for page_id, entry in pages.items()}
+
+
+def write_manifest(output_dir, entries):
+    """
+    Store the manifest of an export to a directory.
+
+    :param output_dir: Output directory.
+    :param entries: Dictionary of manifest entries by page id.
+    :return: None.
+    """
+    utils.write_file_atomically(
+        os.path.join(output_dir, MANIFEST_FILE_NAME),
+        json.dumps({'pages': entries}, indent=1, sort_keys=True).encode('utf-8'),
+    )
+
+
+def export_page(task):
+    """
+    Request a page as an anonymous visitor and write its response to a file.
+
+    :param task: `ExportTask` tuple.
+    :return: `ExportResult` tuple.
+    """
+    start = time.time()
+    page = task.page
+    try:
+        response = rendering.get_client().get(page.url, HTTP_HOST=page.host, secure=page.secure)
+        if response.status_code == 200:
+            if getattr(response, 'streaming', False):
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+            utils.write_file_atomically(
+                os.path.join(task.output_dir, task.file_path), content, mode=FILE_MODE
+            )
+    except Exception:
+        status_code, error = None, traceback.format_exc()
+    else:
+        status_code = response.status_code
+        error = None if status_code == 200 else 'HTTP status {0}'.format(status_code)
+    return ExportResult(
+        page.page_id, page.url, task.file_path, status_code, time.time() - start, error
+    )
+
+
+def remove_page_file(output_dir, file_path):
+    """
+    Remove the exported file of a page, when it still exists.
+
+    :param output_dir: Output directory.
+    :param file_path: File path relative to the output directory.
+    :return: Whether the file was removed.
+    """
+    try:
+        os.remove(os.path.join(output_dir, file_path))
+    except OSError:
+        return False
+    return True
+
+
+def export_site(
+    output_dir, site_ids=None, workers=1, processes=False, incremental=False, secure=None
+):
+    """
+    Export the published fluent pages to a directory.
+
+    The versions of the dependencies of the pages are read before they are
+    rendered, so a page changed while the export runs is exported again by
+    the next incremental export.
+
+    :param output_dir: Output directory, created when it is missing.
+    :param site_ids: Only export pages of these sites.
+    :param workers: Number of pages rendered at the same time.
+    :param processes: Whether the workers are processes instead of
+    threads.
+    :param incremental: Only render the pages whose dependencies changed
+    since the previous export to the directory.
+    :param secure: Whether the pages are requested over https, by default
+    when the project serves its pages over https.
+    :return: `ExportSummary` tuple.
+    """
+    page_tasks = rendering.get_page_tasks(site_ids=site_ids, secure=secure)
+    manifest = read_manifest(output_dir)
+    page_versions = get_page_versions([task.page_id for task in page_tasks])
+
+    entries = {}
+    new_entries = {}
+    tasks = []
+    for page_task in page_tasks:
+        file_path = get_page_file_path(page_task)
+        entry = dict(page_versions.get(page_task.page_id, {}), path=file_path)
+        if (
+            incremental and
+            manifest.get(page_task.page_id) == entry and
+            os.path.exists(os.path.join(output_dir, file_path))
+        ):
+            entries[page_task.page_id] = entry
+        else:
+            new_entries[page_task.page_id] = entry
+            tasks.append(ExportTask(page_task, output_dir, file_path))
+    unchanged = len(entries)
+
+    results = []
+    for result in rendering.run_in_pool(
+        export_page, tasks, workers=workers, processes=processes
+    ):
+        results.append(result)
+        if result.error is None:
+            entries[result.page_id] = new_entries[result.page_id]
+        elif result.page_id in manifest:
+            # The previously exported file is kept, and exported again by the next export.
+            entries[result.page_id] = manifest[result.page_id]
+
+    file_paths = {entry['path'] for entry in entries.values()}
+    removed = 0
+    for entry in manifest.values():
+        if entry['path'] not in file_paths and remove_page_file(output_dir, entry['path']):
+            file_paths.add(entry['path'])
+            removed += 1
+    write_manifest(output_dir, entries)
+    return ExportSummary(results, unchanged, removed)
@@ -0,0 +1,312 @@
+"""
+Benchmarks of the admin and front end hot paths.
+
+The benchmarks are not part of the test suite, run them with:
+
+    $ python manage.py test mezzanine_fluent_pages.tests.benchmarks
+
+A synthetic site is generated in the test database, its size is set with
+environment variables:
+
+* `BENCHMARK_PAGES`: number of layout pages and of plain pages (50).
+* `BENCHMARK_LAYOUTS`: number of layouts (5).
+* `BENCHMARK_PLACEHOLDERS`: number of placeholders per layout (3).
+* `BENCHMARK_ITEMS`: number of content items per placeholder (5).
+
+The wall time and number of queries of every benchmark are reported when
+the run finishes. Set `BENCHMARK_RESULTS` to a file path to also write the
+results as JSON, to compare them between runs.
+"""
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from django.contrib import admin as django_admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from fluent_contents.models import Placeholder
+from fluent_contents.plugins.rawhtml.models import RawHtmlItem
+
+from mezzanine_fluent_pages.mezzanine_layout_page import admin, appsettings, forms, templatefiles
+from mezzanine_fluent_pages.mezzanine_layout_page.models import (
+    FluentContentsLayoutPage, PageLayout
+)
+from mezzanine_fluent_pages.mezzanine_page.models import FluentContentsPage
+
+
+def get_size(name, default):
+    """
+    Return a size of the generated site from the environment.
+
+    :param name: Environment variable name.
+    :param default: Value when the variable is not set.
+    :return: Integer.
+    """
+    return int(os.environ.get(name, default))
+
+
+PAGES = get_size('BENCHMARK_PAGES', 50)
+LAYOUTS = get_size('BENCHMARK_LAYOUTS', 5)
+PLACEHOLDERS = get_size('BENCHMARK_PLACEHOLDERS', 3)
+ITEMS = get_size('BENCHMARK_ITEMS', 5)
+
+
+def create_layout_templates(template_dir):
+    """
+    Write a layout template with `PLACEHOLDERS` placeholders for every layout.
+
+    :param template_dir: Directory the templates are written to.
+    :return: List of template paths.
+    """
+    os.mkdir(os.path.join(template_dir, 'benchmark'))
+    template_paths = []
+    for layout_index in range(LAYOUTS):
+        template_path = 'benchmark/layout_{0}.html'.format(layout_index)
+        placeholders = ''.join(
+            '{{% page_placeholder page.get_content_model "slot_{0}" %}}'.format(slot_index)
+            for slot_index in range(PLACEHOLDERS)
+        )
+        with open(os.path.join(template_dir, template_path), 'w') as template_file:
+            template_file.write(
+                "{% extends 'base.html' %}{% load fluent_mezzanine_layout_tags %}"
+                "{% block main %}" + placeholders + "{% endblock %}"
+            )
+        template_paths.append(template_path)
+    return template_paths
+
+
+def create_items(page, slots):
+    """
+    Create `ITEMS` content items in every placeholder of a page.
+
+    :param page: Page object.
+    :param slots: Slot names of the placeholders.
+    :return: None.
+    """
+    for slot in slots:
+        placeholder = Placeholder.objects.create_for_object(page, slot)
+        for item_index in range(ITEMS):
+            RawHtmlItem.objects.create_for_placeholder(
+                placeholder, html='<p>{0} {1} {2}</p>'.format(page.pk, slot, item_index)
+            )
+
+
+@override_settings(
+    # Large enough to hold the output of every page and content item.
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmarks',
+            'OPTIONS': {'MAX_ENTRIES': 1000000},
+        },
+    },
+)
+class Benchmarks(TestCase):
+    """
+    Time the hot paths against a generated site and count their queries.
+    """
+    results = []
+
+    @classmethod
+    def setUpClass(cls):
+        # Generated layout templates are stored outside the project in a temporary directory.
+        cls.template_dir = tempfile.mkdtemp()
+        try:
+            cls.template_paths = create_layout_templates(cls.template_dir)
+        except Exception:
+            shutil.rmtree(cls.template_dir, ignore_errors=True)
+            raise
+        cls.template_settings = override_settings(
+            TEMPLATE_DIRS=[cls.template_dir, appsettings.get_template_dir()]
+        )
+        cls.template_settings.enable()
+        try:
+            super(Benchmarks, cls).setUpClass()
+        except Exception:
+            cls.remove_templates()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        super(Benchmarks, cls).tearDownClass()
+        cls.remove_templates()
+        cls.report()
+
+    @classmethod
+    def remove_templates(cls):
+        """
+        Restore the template directories and remove the generated layout templates.
+
+        :return: None.
+        """
+        cls.template_settings.disable()
+        shutil.rmtree(cls.template_dir, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        get_user_model().objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.layouts = [
+            PageLayout.objects.create(
+                key='layout_{0}'.format(layout_index),
+                title='Layout {0}'.format(layout_index),
+                template_path=template_path
+            )
+            for layout_index, template_path in enumerate(cls.template_paths)
+        ]
+        slots = ['slot_{0}'.format(slot_index) for slot_index in range(PLACEHOLDERS)]
+
+        # A tree five pages wide for both page types.
+        cls.layout_pages = []
+        cls.pages = []
+        for page_index in range(PAGES):
+            parent_index = (page_index - 1) // 5
+            layout_page = FluentContentsLayoutPage.objects.create(
+                title='Layout page {0}'.format(page_index),
+                layout=cls.layouts[page_index % LAYOUTS],
+                parent=cls.layout_pages[parent_index] if page_index else None,
+            )
+            create_items(layout_page, slots)
+            cls.layout_pages.append(layout_page)
+
+            page = FluentContentsPage.objects.create(
+                title='Page {0}'.format(page_index),
+                parent=cls.pages[parent_index] if page_index else None,
+            )
+            create_items(page, ['mezzanine_page_content'])
+            cls.pages.append(page)
+
+    def setUp(self):
+        django_cache.clear()
+        templatefiles.layout_templates.clear()
+        self.admin_instance = admin.FluentContentsLayoutPageAdmin(
+            FluentContentsLayoutPage,
+            django_admin.site
+        )
+
+    def measure(self, name, function, arguments):
+        """
+        Call a function for every argument, recording the time and queries taken.
+
+        :param name: Name of the benchmark.
+        :param function: Function to call with every argument.
+        :param arguments: List of arguments.
+        :return: None.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            for argument in arguments:
+                function(argument)
+            duration = time.time() - start
+        self.results.append({
+            'name': name,
+            'calls': len(arguments),
+            'duration': duration,
+            'queries': len(queries),
+        })
+
+    @classmethod
+    def report(cls):
+        """
+        Write the results of the benchmarks.
+
+        :return: None.
+        """
+        print('\nBenchmarks ({0} pages, {1} layouts, {2} placeholders, {3} items):'.format(
+            PAGES, LAYOUTS, PLACEHOLDERS, ITEMS
+        ), file=sys.stderr)
+        print('{0:<40} {1:>7} {2:>11} {3:>12} {4:>14}'.format(
+            'Benchmark', 'Calls', 'Total (ms)', 'Per call', 'Queries/call'
+        ), file=sys.stderr)
+        for result in cls.results:
+            print('{0:<40} {1:>7} {2:>11.0f} {3:>9.2f} ms {4:>14.1f}'.format(
+                result['name'],
+                result['calls'],
+                result['duration'] * 1000,
+                result['duration'] * 1000 / result['calls'],
+                float(result['queries']) / result['calls'],
+            ), file=sys.stderr)
+
+        results_path = os.environ.get('BENCHMARK_RESULTS')
+        if results_path:
+            with open(results_path, 'w') as results_file:
+                json.dump(cls.results, results_file, indent=2)
+
+    def login(self):
+        self.client.login(username='admin', password='admin')
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_add_view(self):
+        self.login()
+        url = reverse('admin:mezzanine_layout_page_fluentcontentslayoutpage_add')
+        self.measure('admin layout page add view', self.get, [url] * 10)
+
+        url = reverse('admin:fluent_mezzanine_page_fluentcontentspage_add')
+        self.measure('admin page add view', self.get, [url] * 10)
+
+    def test_admin_change_view(self):
+        self.login()
+        urls = [
+            reverse('admin:mezzanine_layout_page_fluentcontentslayoutpage_change', args=[page.pk])
+            for page in self.layout_pages[:10]
+        ]
+        self.measure('admin layout page change view', self.get, urls)
+
+        urls = [
+            reverse('admin:fluent_mezzanine_page_fluentcontentspage_change', args=[page.pk])
+            for page in self.pages[:10]
+        ]
+        self.measure('admin page change view', self.get, urls)
+
+    def test_get_layout_view(self):
+        self.measure(
+            'get_layout_view',
+            lambda layout: self.admin_instance.get_layout_view(None, layout.pk),
+            self.layouts * 10
+        )
+
+    def test_get_placeholder_data(self):
+        pages = list(FluentContentsLayoutPage.objects.all())
+        self.measure(
+            'get_placeholder_data',
+            lambda page: self.admin_instance.get_placeholder_data(None, page),
+            pages
+        )
+
+    def test_render_page(self):
+        layout_urls = [page.get_absolute_url() for page in self.layout_pages]
+        urls = [page.get_absolute_url() for page in self.pages]
+        self.measure('render layout page (cold)', self.get, layout_urls)
+        self.measure('render layout page (warm)', self.get, layout_urls)
+        self.measure('render page (cold)', self.get, urls)
+        self.measure('render page (warm)', self.get, urls)
+
+        # Test to see if the content was rendered.
+        self.assertContains(self.client.get(layout_urls[0]), '<p>{0} slot_0 0</p>'.format(
+            self.layout_pages[0].pk
+        ))
+        self.assertContains(self.client.get(urls[0]), '<p>{0} mezzanine_page_content 0</p>'.format(
+            self.pages[0].pk
+        ))
+
+    def test_template_file_path_field_form(self):
+        self.measure(
+            'TemplateFilePathFieldForm()',
+            lambda index: forms.TemplateFilePathFieldForm(
+                path=appsettings.get_template_dir(),
+                match=None,
+                recursive=True
+            ),
+            range(100)
+        )
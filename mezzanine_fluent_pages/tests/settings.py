@@ -26,6 +26,7 @@ INSTALLED_APPS = (
     'django.contrib.staticfiles',
     'django_wysiwyg',
     'fluent_contents',
+    'fluent_contents.plugins.rawhtml',
     'mezzanine.boot',
     'mezzanine.conf',
     'mezzanine.core',
@@ -0,0 +1,852 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache as django_cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, modify_settings, override_settings
+from django.utils import six
+from fluent_contents.models import ContentItem, ContentItemOutput, Placeholder
+from fluent_contents.plugins.rawhtml.content_plugins import RawHtmlPlugin
+from fluent_contents.plugins.rawhtml.models import RawHtmlItem
+from mezzanine.pages.models import Page
+
+from mezzanine_fluent_pages import (
+    appsettings, cache, export, instrumentation, middleware, rendering, search, staticsite, utils
+)
+from mezzanine_fluent_pages.mezzanine_layout_page.models import FluentContentsLayoutPage, PageLayout
+from mezzanine_fluent_pages.mezzanine_page.models import FluentContentsPage
+
+
+class Cache(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.request = RequestFactory().get('/')
+        self.rendered = []
+
+    def render(self):
+        self.rendered.append(True)
+        return ContentItemOutput('html')
+
+    def test_get_placeholder_output(self):
+        output = cache.get_placeholder_output(self.request, 1, 'main', self.render)
+        self.assertEqual(output.html, 'html')
+        cache.get_placeholder_output(self.request, 1, 'main', self.render)
+        self.assertEqual(len(self.rendered), 1)
+
+        # Test to see if other pages and slots are stored separately.
+        cache.get_placeholder_output(self.request, 2, 'main', self.render)
+        cache.get_placeholder_output(self.request, 1, 'sidebar', self.render)
+        self.assertEqual(len(self.rendered), 3)
+
+        # Test to see if uncachable output is not stored.
+        cache.get_placeholder_output(self.request, 1, 'main', self.render, cachable=False)
+        self.assertEqual(len(self.rendered), 4)
+
+        def render_uncacheable():
+            self.rendered.append(True)
+            return ContentItemOutput('html', cacheable=False)
+
+        cache.get_placeholder_output(self.request, 3, 'main', render_uncacheable)
+        cache.get_placeholder_output(self.request, 3, 'main', render_uncacheable)
+        self.assertEqual(len(self.rendered), 6)
+
+    def test_get_placeholder_output_disabled(self):
+        # Test to see if the edit mode of `fluent_contents` bypasses the cache.
+        self.request._fluent_contents_edit_mode = True
+        cache.get_placeholder_output(self.request, 1, 'main', self.render)
+        cache.get_placeholder_output(self.request, 1, 'main', self.render)
+        self.assertEqual(len(self.rendered), 2)
+
+        del self.request._fluent_contents_edit_mode
+        cache_placeholder_output = appsettings.MEZZANINE_PAGES_CACHE_PLACEHOLDER_OUTPUT
+        appsettings.MEZZANINE_PAGES_CACHE_PLACEHOLDER_OUTPUT = False
+        try:
+            cache.get_placeholder_output(self.request, 1, 'main', self.render)
+            cache.get_placeholder_output(self.request, 1, 'main', self.render)
+        finally:
+            appsettings.MEZZANINE_PAGES_CACHE_PLACEHOLDER_OUTPUT = cache_placeholder_output
+        self.assertEqual(len(self.rendered), 4)
+
+    def test_get_placeholder_output_stale(self):
+        timeouts = (60, 3600)
+        cache.get_placeholder_output(self.request, 1, 'main', self.render, timeouts=timeouts)
+        cache.get_placeholder_output(self.request, 1, 'main', self.render, timeouts=timeouts)
+        self.assertEqual(len(self.rendered), 1)
+
+        # Test to see if stale output is served while another process renders it again.
+        cache_key = cache.get_placeholder_cache_key(1, 'main')
+        django_cache.set(
+            cache_key, cache.RevalidatedOutput(ContentItemOutput('stale'), time.time() - 1)
+        )
+        django_cache.add('{0}.lock'.format(cache_key), True)
+        output = cache.get_placeholder_output(
+            self.request, 1, 'main', self.render, timeouts=timeouts
+        )
+        self.assertEqual((output.html, len(self.rendered)), ('stale', 1))
+
+        # Test to see if stale output is rendered again when no other process does.
+        django_cache.delete('{0}.lock'.format(cache_key))
+        output = cache.get_placeholder_output(
+            self.request, 1, 'main', self.render, timeouts=timeouts
+        )
+        self.assertEqual((output.html, len(self.rendered)), ('html', 2))
+        self.assertGreater(django_cache.get(cache_key).stale_at, time.time())
+        self.assertIsNone(django_cache.get('{0}.lock'.format(cache_key)))
+
+        # Test to see if the output is used when stale output is no longer served.
+        output = cache.get_placeholder_output(self.request, 1, 'main', self.render)
+        self.assertEqual((output.html, len(self.rendered)), ('html', 2))
+
+    def test_get_revalidation_timeouts(self):
+        self.assertIsNone(cache.get_revalidation_timeouts(None, 'main'))
+
+        timeouts_setting = appsettings.MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE
+        appsettings.MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE = {
+            'home:main': (10, 100),
+            'home:*': (20, 200),
+            '*:sidebar': (30, 300),
+        }
+        try:
+            page = FluentContentsLayoutPage(layout=PageLayout(key='home'))
+            self.assertEqual(cache.get_revalidation_timeouts(page, 'main'), (10, 100))
+            self.assertEqual(cache.get_revalidation_timeouts(page, 'sidebar'), (20, 200))
+            self.assertEqual(cache.get_revalidation_timeouts(None, 'sidebar'), (30, 300))
+            self.assertIsNone(cache.get_revalidation_timeouts(None, 'main'))
+        finally:
+            appsettings.MEZZANINE_PAGES_PLACEHOLDER_STALE_WHILE_REVALIDATE = timeouts_setting
+
+    def test_clear_placeholder_output(self):
+        cache.get_placeholder_output(self.request, 1, 'main', self.render)
+        cache.get_placeholder_output(self.request, 1, 'sidebar', self.render)
+        cache.clear_placeholder_output([(1, 'main')])
+
+        cache.get_placeholder_output(self.request, 1, 'main', self.render)
+        cache.get_placeholder_output(self.request, 1, 'sidebar', self.render)
+        self.assertEqual(len(self.rendered), 3)
+
+    def test_get_tag_versions(self):
+        versions = cache.get_tag_versions(['page.1', 'layout.1'])
+        self.assertEqual(sorted(versions), ['layout.1', 'page.1'])
+        self.assertEqual(cache.get_tag_versions(['page.1', 'layout.1']), versions)
+
+        # Test to see if expiring a tag only changes its own version and `ANY_TAG`.
+        any_versions = cache.get_tag_versions([cache.ANY_TAG])
+        cache.expire_tags(['page.1'])
+        new_versions = cache.get_tag_versions(['page.1', 'layout.1'])
+        self.assertNotEqual(new_versions['page.1'], versions['page.1'])
+        self.assertEqual(new_versions['layout.1'], versions['layout.1'])
+        self.assertNotEqual(cache.get_tag_versions([cache.ANY_TAG]), any_versions)
+
+    def test_get_placeholder_cache_key(self):
+        self.assertEqual(
+            cache.get_placeholder_cache_key(1, 'main', 'en'),
+            'mezzanine_fluent_pages.placeholder.1.main.en'
+        )
+        self.assertEqual(
+            cache.get_placeholder_cache_key(1, 'main'),
+            cache.get_placeholder_cache_key(1, 'main', 'en-us')
+        )
+
+
+class Export(TestCase):
+    def setUp(self):
+        self.layout = PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        self.layout_page = FluentContentsLayoutPage.objects.create(
+            title='Layout page', layout=self.layout
+        )
+        placeholder = Placeholder.objects.create_for_object(self.layout_page, 'main')
+        RawHtmlItem.objects.create_for_placeholder(placeholder, html='<p>2</p>', sort_order=2)
+        RawHtmlItem.objects.create_for_placeholder(placeholder, html='<p>1</p>', sort_order=1)
+        self.page = FluentContentsPage.objects.create(title='Page')
+        Placeholder.objects.create_for_object(self.page, 'mezzanine_page_content')
+
+    def export(self, **kwargs):
+        stream = six.StringIO()
+        result = export.export_pages(stream, **kwargs)
+        return result, [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def test_export_pages(self):
+        result, records = self.export()
+        self.assertEqual(result, export.ExportResult(1, 2, 2, 2))
+        self.assertEqual(len(records), 3)
+
+        self.assertEqual(records[0]['model'], 'mezzanine_layout_page.pagelayout')
+        self.assertEqual(records[0]['fields']['key'], 'default')
+        self.assertNotIn('placeholder_data', records[0]['fields'])
+
+        self.assertEqual(records[1]['model'], 'mezzanine_layout_page.fluentcontentslayoutpage')
+        self.assertEqual(records[1]['pk'], self.layout_page.pk)
+        self.assertEqual(records[1]['fields']['title'], 'Layout page')
+        self.assertEqual(records[1]['fields']['layout'], self.layout.pk)
+        placeholders = records[1]['placeholders']
+        self.assertEqual([placeholder['slot'] for placeholder in placeholders], ['main'])
+        content_items = placeholders[0]['content_items']
+        self.assertEqual([item['model'] for item in content_items], ['rawhtml.rawhtmlitem'] * 2)
+        self.assertEqual(
+            [item['fields']['html'] for item in content_items], ['<p>1</p>', '<p>2</p>']
+        )
+        self.assertEqual(content_items[0]['fields']['sort_order'], 1)
+
+        self.assertEqual(records[2]['model'], 'fluent_mezzanine_page.fluentcontentspage')
+        self.assertEqual(records[2]['placeholders'][0]['content_items'], [])
+
+    def test_export_pages_uninstalled_plugin(self):
+        # Test to see if content items of a content type without a model are left out.
+        content_type = ContentType.objects.create(app_label='removed', model='removeditem')
+        placeholder = Placeholder.objects.get_by_slot(self.page, 'mezzanine_page_content')
+        ContentItem.objects.bulk_create([ContentItem(
+            polymorphic_ctype=content_type,
+            parent_type=placeholder.parent_type,
+            parent_id=self.page.pk,
+            language_code='en',
+            placeholder=placeholder,
+            sort_order=1,
+        )])
+        result, records = self.export()
+        self.assertEqual(result, export.ExportResult(1, 2, 2, 2))
+        self.assertEqual(records[2]['placeholders'][0]['content_items'], [])
+
+    def test_export_pages_chunks(self):
+        # The layouts, the pages, the fields of the layout page, the placeholders and content
+        # items of both pages, the raw HTML items and the check for more pages.
+        with self.assertNumQueries(1 + 2 + 1 + 2 * 2 + 1 + 1):
+            result, records = self.export(chunk_size=1)
+        self.assertEqual(result.pages, 2)
+
+        result, records = self.export(site_ids=[0])
+        self.assertEqual(result, export.ExportResult(1, 0, 0, 0))
+
+
+class RecordHandler(logging.Handler):
+    """
+    Keep the handled log records.
+    """
+    def __init__(self):
+        super(RecordHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class Instrumentation(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        instrumentation.reset_layout_stats()
+        self.layout = PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        self.page = FluentContentsLayoutPage.objects.create(title='Page', layout=self.layout)
+        placeholder = Placeholder.objects.create_for_object(self.page, 'main')
+        RawHtmlItem.objects.create_for_placeholder(placeholder, html='<p>html</p>')
+
+    def tearDown(self):
+        instrumentation.reset_layout_stats()
+
+    def test_pagerender(self):
+        handler = RecordHandler()
+        instrumentation.logger.addHandler(handler)
+        instrumentation.logger.setLevel(logging.INFO)
+        self.addCleanup(instrumentation.logger.removeHandler, handler)
+        self.addCleanup(instrumentation.logger.setLevel, logging.NOTSET)
+
+        with instrumentation.PageRender(path='/page/') as render:
+            self.assertIs(instrumentation.get_current_render(), render)
+            render.page = Page.objects.get(pk=self.page.pk)
+            list(PageLayout.objects.all())
+            with instrumentation.placeholder_timer('main'):
+                pass
+        self.assertIsNone(instrumentation.get_current_render())
+        self.assertEqual(render.queries, 2)
+        self.assertEqual(list(render.placeholders), ['main'])
+
+        data = handler.records[0].page_render
+        self.assertEqual(data['page_id'], self.page.pk)
+        self.assertEqual(data['path'], '/page/')
+        self.assertEqual(data['content_model'], 'fluentcontentslayoutpage')
+        self.assertEqual(data['layout'], 'default')
+
+        stats = instrumentation.get_layout_stats()
+        self.assertEqual(list(stats), ['default'])
+        self.assertEqual(stats['default']['renders'], 1)
+        self.assertEqual(stats['default']['queries'], render.queries)
+        self.assertEqual(list(stats['default']['placeholders']), ['main'])
+
+        instrumentation.reset_layout_stats()
+        self.assertEqual(instrumentation.get_layout_stats(), {})
+
+    def test_pagerender_unrecorded(self):
+        # Test to see if renders of other pages, failed renders and placeholders rendered
+        # outside of a render are left out.
+        with instrumentation.placeholder_timer('main'):
+            pass
+        with instrumentation.PageRender(page=Page.objects.create(title='Other')):
+            pass
+        with self.assertRaises(ValueError):
+            with instrumentation.PageRender(page=self.page):
+                raise ValueError
+        self.assertEqual(instrumentation.get_layout_stats(), {})
+
+    def test_phase_timer(self):
+        self.assertIs(instrumentation.phase_timer('layout'), instrumentation.null_timer)
+        render = instrumentation.PageRender(page=self.page, count_queries=False, record=False)
+        with render:
+            with instrumentation.phase_timer('layout'):
+                pass
+            with instrumentation.phase_timer('layout'):
+                pass
+        self.assertEqual(list(render.phases), ['layout'])
+        self.assertEqual(render.queries, 0)
+        self.assertEqual(instrumentation.get_layout_stats(), {})
+
+
+class Middleware(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.layout = PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        self.page = FluentContentsLayoutPage.objects.create(title='Page', layout=self.layout)
+        self.middleware = middleware.PageCacheMiddleware()
+
+    def get_request(self, method='get'):
+        request = getattr(RequestFactory(), method)('/page/')
+        request.user = AnonymousUser()
+        return request
+
+    def get_response(self, request=None):
+        if request is None:
+            request = self.get_request()
+        response = self.middleware.process_request(request)
+        if response is None:
+            request.page = Page.objects.get(pk=self.page.pk)
+            response = self.middleware.process_response(request, HttpResponse('page'))
+            response.rendered = True
+        return response
+
+    def test_pagecachemiddleware(self):
+        response = self.get_response()
+        self.assertTrue(response.rendered)
+
+        # Test to see if the cached response is returned without any queries.
+        with self.assertNumQueries(0):
+            response = self.get_response()
+        self.assertFalse(getattr(response, 'rendered', False))
+        self.assertEqual(response.content, b'page')
+        self.assertFalse(getattr(self.get_response(self.get_request('head')), 'rendered', False))
+
+        # Test to see if changing the page, its content, layout or any page expires the response.
+        self.page.save()
+        self.assertTrue(self.get_response().rendered)
+        self.assertFalse(getattr(self.get_response(), 'rendered', False))
+
+        placeholder = Placeholder.objects.create_for_object(self.page, 'main')
+        self.assertTrue(self.get_response().rendered)
+        RawHtmlItem.objects.create_for_placeholder(placeholder, html='<p>html</p>')
+        self.assertTrue(self.get_response().rendered)
+
+        self.layout.save()
+        self.assertTrue(self.get_response().rendered)
+
+        Page.objects.create(title='Other page')
+        self.assertTrue(self.get_response().rendered)
+        self.assertFalse(getattr(self.get_response(), 'rendered', False))
+
+        # Test to see if other pages keep their cached response.
+        other_layout = PageLayout.objects.create(
+            key='other',
+            title='other',
+            template_path='layouts/default.html'
+        )
+        other_layout.save()
+        self.assertFalse(getattr(self.get_response(), 'rendered', False))
+
+    def test_pagecachemiddleware_uncached(self):
+        # Test to see if a change while the page renders prevents storing the response.
+        request = self.get_request()
+        self.assertIsNone(self.middleware.process_request(request))
+        cache.expire_tags(['layout.0'])
+        request.page = Page.objects.get(pk=self.page.pk)
+        self.middleware.process_response(request, HttpResponse('page'))
+        self.assertIsNone(self.middleware.process_request(self.get_request()))
+
+        # Test to see if responses setting cookies or with an error are not stored.
+        request = self.get_request()
+        self.middleware.process_request(request)
+        request.page = Page.objects.get(pk=self.page.pk)
+        response = HttpResponse('page')
+        response.set_cookie('name', 'value')
+        self.middleware.process_response(request, response)
+        request = self.get_request()
+        self.middleware.process_request(request)
+        request.page = Page.objects.get(pk=self.page.pk)
+        self.middleware.process_response(request, HttpResponse('page', status=500))
+        self.assertIsNone(self.middleware.process_request(self.get_request()))
+
+        # Test to see if responses varying on or using the session are not stored.
+        request = self.get_request()
+        self.middleware.process_request(request)
+        request.page = Page.objects.get(pk=self.page.pk)
+        response = HttpResponse('page')
+        response['Vary'] = 'Accept-Encoding, Cookie'
+        self.middleware.process_response(request, response)
+        request = self.get_request()
+        self.middleware.process_request(request)
+        request.page = Page.objects.get(pk=self.page.pk)
+        request.session = SessionStore()
+        request.session['cart'] = 'apple'
+        self.middleware.process_response(request, HttpResponse('page'))
+        self.assertIsNone(self.middleware.process_request(self.get_request()))
+
+        # Test to see if other pages and views are not stored.
+        request = self.get_request()
+        self.middleware.process_request(request)
+        self.middleware.process_response(request, HttpResponse('view'))
+        request.page = Page.objects.create(title='Other page')
+        self.middleware.process_response(request, HttpResponse('page'))
+        self.assertIsNone(self.middleware.process_request(self.get_request()))
+
+    @modify_settings(MIDDLEWARE_CLASSES={
+        'append': 'mezzanine_fluent_pages.middleware.PageCacheMiddleware',
+    })
+    def test_pagecachemiddleware_other_view(self):
+        # Test to see if the responses of other views below a page are not stored.
+        FluentContentsLayoutPage.objects.create(title='Shop', layout=self.layout, slug='shop')
+        alice, bob = Client(), Client()
+        alice.get('/shop/cart/?item=apple')
+        self.assertEqual(alice.get('/shop/cart/').content, b'Cart: apple')
+        self.assertEqual(bob.get('/shop/cart/').content, b'Cart: ')
+
+        # Test to see if the page itself is stored.
+        self.assertContains(bob.get('/shop/'), 'Shop')
+        FluentContentsLayoutPage.objects.filter(slug='shop').update(title='Changed')
+        self.assertContains(bob.get('/shop/'), 'Shop')
+
+    def test_pagecachemiddleware_is_current(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        file_path = os.path.join(path, 'layout.html')
+        with open(file_path, 'w') as layout_file:
+            layout_file.write('layout')
+
+        entry = {
+            'versions': cache.get_tag_versions(['page.1']),
+            'files': {file_path: utils.get_file_version(file_path)},
+        }
+        self.assertTrue(self.middleware.is_current(entry))
+
+        # Test to see if a changed template file makes the response stale.
+        with open(file_path, 'w') as layout_file:
+            layout_file.write('changed layout')
+        self.assertFalse(self.middleware.is_current(entry))
+
+    @modify_settings(MIDDLEWARE_CLASSES={
+        'append': 'mezzanine_fluent_pages.middleware.PageRenderInstrumentationMiddleware',
+    })
+    def test_pagerenderinstrumentationmiddleware(self):
+        instrumentation.reset_layout_stats()
+        self.addCleanup(instrumentation.reset_layout_stats)
+        placeholder = Placeholder.objects.create_for_object(self.page, 'main')
+        RawHtmlItem.objects.create_for_placeholder(placeholder, html='<p>html</p>')
+
+        response = self.client.get(self.page.get_absolute_url())
+        self.assertContains(response, '<p>html</p>')
+        self.assertFalse(hasattr(response.wsgi_request, '_page_render'))
+
+        stats = instrumentation.get_layout_stats()['key']
+        self.assertEqual(stats['renders'], 1)
+        self.assertGreater(stats['queries'], 0)
+        self.assertEqual(list(stats['placeholders']), ['main'])
+
+    @modify_settings(MIDDLEWARE_CLASSES={
+        'prepend': [
+            'mezzanine_fluent_pages.middleware.ServerTimingMiddleware',
+            'mezzanine_fluent_pages.mezzanine_layout_page.middleware.LayoutTemplateMiddleware',
+        ],
+    })
+    def test_servertimingmiddleware(self):
+        Placeholder.objects.create_for_object(self.page, 'main')
+        server_timing = appsettings.MEZZANINE_PAGES_SERVER_TIMING
+        appsettings.MEZZANINE_PAGES_SERVER_TIMING = True
+        try:
+            response = self.client.get(self.page.get_absolute_url())
+        finally:
+            appsettings.MEZZANINE_PAGES_SERVER_TIMING = server_timing
+        self.assertEqual(
+            [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')],
+            ['layout_page', 'layout', 'placeholder_data', 'placeholder-main', 'total']
+        )
+        self.assertIn('desc="Placeholder main"', response['Server-Timing'])
+
+        # Test to see if the middleware is left out unless it is enabled.
+        response = Client().get(self.page.get_absolute_url())
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertRaises(MiddlewareNotUsed, middleware.ServerTimingMiddleware)
+
+
+class Receivers(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.request = RequestFactory().get('/')
+        self.layout = PageLayout.objects.create(
+            key='key',
+            title='title',
+            template_path='layouts/default.html'
+        )
+        self.page = FluentContentsLayoutPage.objects.create(title='Page', layout=self.layout)
+        self.placeholder = Placeholder.objects.create_for_object(self.page, 'main')
+        self.item = RawHtmlItem.objects.create_for_placeholder(self.placeholder, html='<p>html</p>')
+        self.cache_output()
+
+    def cache_output(self):
+        cache.get_placeholder_output(
+            self.request, self.page.pk, 'main', lambda: ContentItemOutput('html')
+        )
+
+    def is_cached(self):
+        return django_cache.get(cache.get_placeholder_cache_key(self.page.pk, 'main')) is not None
+
+    def test_clear_content_item_output(self):
+        self.assertTrue(self.is_cached())
+        self.item.html = '<p>changed</p>'
+        self.item.save()
+        self.assertFalse(self.is_cached())
+
+        self.cache_output()
+        self.item.delete()
+        self.assertFalse(self.is_cached())
+
+    def test_clear_placeholder_output(self):
+        self.placeholder.save()
+        self.assertFalse(self.is_cached())
+
+    def test_clear_page_output(self):
+        self.page.save()
+        self.assertFalse(self.is_cached())
+
+        # Test to see if saving the page through the `Page` model clears the output.
+        self.cache_output()
+        self.page.page_ptr.save()
+        self.assertFalse(self.is_cached())
+
+
+class Rendering(TestCase):
+    def setUp(self):
+        self.layout = PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        self.layout_page = FluentContentsLayoutPage.objects.create(
+            title='Layout page', layout=self.layout
+        )
+        self.child_page = FluentContentsLayoutPage.objects.create(
+            title='Child', layout=self.layout, parent=self.layout_page
+        )
+        self.page = FluentContentsPage.objects.create(title='Page')
+        Placeholder.objects.create_for_object(self.page, 'mezzanine_page_content')
+
+    def test_get_client(self):
+        client = rendering.get_client()
+        client.cookies['sessionid'] = 'session'
+        self.assertIs(rendering.get_client(), client)
+        # Test to see if every page is requested without the cookies of the previous page.
+        self.assertEqual(len(client.cookies), 0)
+
+    def test_get_page_tasks(self):
+        tasks = rendering.get_page_tasks()
+        self.assertEqual(
+            [task.page_id for task in tasks],
+            [self.layout_page.pk, self.child_page.pk, self.page.pk]
+        )
+        self.assertEqual(tasks[0], rendering.PageTask(
+            self.layout_page.pk, '/layout-page/', 'example.com', 'default', False
+        ))
+        self.assertIsNone(tasks[2].layout)
+
+        # Test to see if the pages are requested over https when the project uses it.
+        self.assertTrue(rendering.get_page_tasks(secure=True)[0].secure)
+        with override_settings(SECURE_SSL_REDIRECT=True):
+            self.assertTrue(rendering.get_page_tasks()[0].secure)
+            self.assertFalse(rendering.get_page_tasks(secure=False)[0].secure)
+
+        # Test to see if the pages are filtered.
+        self.assertEqual(len(rendering.get_page_tasks(layout_keys=['default'])), 2)
+        self.assertEqual(len(rendering.get_page_tasks(layout_keys=['other'])), 0)
+        self.assertEqual(len(rendering.get_page_tasks(site_ids=[self.page.site_id])), 3)
+        self.assertEqual(len(rendering.get_page_tasks(site_ids=[0])), 0)
+        self.assertEqual(
+            [task.page_id for task in rendering.get_page_tasks(subtree='/layout-page/')],
+            [self.layout_page.pk, self.child_page.pk]
+        )
+
+        # Test to see if unpublished pages and pages requiring a login are left out.
+        FluentContentsPage.objects.filter(pk=self.page.pk).update(status=1)
+        FluentContentsLayoutPage.objects.filter(pk=self.child_page.pk).update(login_required=True)
+        self.assertEqual(len(rendering.get_page_tasks()), 1)
+
+    def test_render_page(self):
+        task = rendering.get_page_tasks()[0]
+        result = rendering.render_page(task)
+        self.assertEqual(result.page_id, task.page_id)
+        self.assertEqual(result.layout, 'default')
+        self.assertEqual(result.status_code, 200)
+        self.assertIsNone(result.error)
+
+        result = rendering.render_page(task._replace(url='/missing/'))
+        self.assertEqual(result.status_code, 404)
+        self.assertEqual(result.error, 'HTTP status 404')
+
+    @modify_settings(MIDDLEWARE_CLASSES={
+        'append': 'mezzanine_fluent_pages.middleware.PageCacheMiddleware',
+    })
+    def test_render_page_secure(self):
+        django_cache.clear()
+        task = rendering.get_page_tasks(secure=True)[0]
+        self.assertEqual(rendering.render_page(task).status_code, 200)
+
+        # Test to see if the page is cached for visitors using https.
+        FluentContentsLayoutPage.objects.filter(pk=self.layout_page.pk).update(title='Changed')
+        client = Client(HTTP_HOST=task.host)
+        self.assertContains(client.get(task.url, secure=True), 'Layout page')
+        self.assertContains(client.get(task.url), 'Changed')
+
+    def test_render_pages(self):
+        results = list(rendering.render_pages(rendering.get_page_tasks()))
+        self.assertEqual([result.status_code for result in results], [200, 200, 200])
+
+
+class Search(TestCase):
+    def setUp(self):
+        # The raw HTML plugin is not indexed by default.
+        RawHtmlPlugin.search_fields = ['html']
+        self.addCleanup(setattr, RawHtmlPlugin, 'search_fields', [])
+        search._pending.pages = set()
+
+        layout = PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        self.layout_page = FluentContentsLayoutPage.objects.create(
+            title='Layout page', layout=layout
+        )
+        self.page = FluentContentsPage.objects.create(title='Page')
+        for slot, html in (('main', '<p>Hello</p>\n<p>world</p>'), ('sidebar', '<b>again</b>')):
+            placeholder = Placeholder.objects.create_for_object(self.layout_page, slot)
+            RawHtmlItem.objects.create_for_placeholder(placeholder, html=html)
+
+    def test_get_search_texts(self):
+        # A query for the placeholders, one for the content items and one per content item type.
+        with self.assertNumQueries(3):
+            texts = search.get_search_texts(FluentContentsLayoutPage, [self.layout_page.pk])
+        self.assertEqual(texts, {self.layout_page.pk: 'Hello world again'})
+        self.assertEqual(search.get_search_texts(FluentContentsPage, [self.page.pk]), {
+            self.page.pk: ''
+        })
+
+    def test_schedule_search_text_update(self):
+        # Test to see if the text of changed pages is stored when the transaction commits.
+        self.assertEqual(
+            FluentContentsLayoutPage.objects.get(pk=self.layout_page.pk).search_text, ''
+        )
+        search.update_pending_search_texts()
+        self.assertEqual(
+            FluentContentsLayoutPage.objects.get(pk=self.layout_page.pk).search_text,
+            'Hello world again'
+        )
+        self.assertEqual(search._pending.pages, set())
+
+        # Test to see if the pages can be found by the text of their content.
+        self.assertEqual(
+            list(FluentContentsLayoutPage.objects.search('again')),
+            [FluentContentsLayoutPage.objects.get(pk=self.layout_page.pk)]
+        )
+
+    def test_rebuild_search_texts(self):
+        self.assertEqual(search.rebuild_search_texts(chunk_size=1), 2)
+        self.assertEqual(
+            FluentContentsLayoutPage.objects.get(pk=self.layout_page.pk).search_text,
+            'Hello world again'
+        )
+
+
+class StaticSite(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+        self.layout = PageLayout.objects.create(
+            key='default',
+            title='Default',
+            template_path='layouts/default.html'
+        )
+        self.layout_page = FluentContentsLayoutPage.objects.create(
+            title='Layout page', layout=self.layout
+        )
+        self.page = FluentContentsPage.objects.create(title='Page')
+        Placeholder.objects.create_for_object(self.page, 'mezzanine_page_content')
+
+    def get_file_path(self, page):
+        return os.path.join(self.output_dir, 'example.com', page.slug, 'index.html')
+
+    def test_get_page_file_path(self):
+        task = rendering.PageTask(1, '/about/team/', 'example.com', None, False)
+        self.assertEqual(
+            staticsite.get_page_file_path(task),
+            os.path.join('example.com', 'about', 'team', 'index.html')
+        )
+        self.assertEqual(
+            staticsite.get_page_file_path(task._replace(url='/', host=None)),
+            os.path.join('default', 'index.html')
+        )
+
+        # Test to see if the file stays inside the output directory.
+        self.assertEqual(
+            staticsite.get_page_file_path(task._replace(url='/a/../../b/?page=2')),
+            os.path.join('example.com', 'a', 'b', 'index.html')
+        )
+
+    def test_get_page_versions(self):
+        versions = staticsite.get_page_versions([self.layout_page.pk, self.page.pk])
+        layout_versions = versions[self.layout_page.pk]
+        self.assertEqual(sorted(layout_versions['versions']), [
+            cache.get_layout_tag(self.layout.pk),
+            cache.get_page_tag(self.layout_page.pk),
+            cache.TREE_TAG,
+        ])
+        self.assertIn(
+            self.layout_page.get_cache_dependencies()[1][0], layout_versions['files']
+        )
+        self.assertEqual(
+            sorted(versions[self.page.pk]['files']),
+            sorted(staticsite.get_template_files('fluent_mezzanine/fluent_contents_page.html'))
+        )
+
+        # Test to see if the versions change with the page.
+        self.assertEqual(staticsite.get_page_versions([self.page.pk]), {
+            self.page.pk: versions[self.page.pk]
+        })
+        cache.expire_tags([cache.get_page_tag(self.page.pk)])
+        self.assertNotEqual(
+            staticsite.get_page_versions([self.page.pk])[self.page.pk], versions[self.page.pk]
+        )
+
+    def test_get_template_files(self):
+        # Test to see if the extended template and the templates it includes are found.
+        names = staticsite.get_template_names('fluent_mezzanine/fluent_contents_page.html')
+        self.assertEqual(names[:2], ['fluent_mezzanine/fluent_contents_page.html', 'base.html'])
+        self.assertIn('includes/footer_scripts.html', names)
+        file_paths = staticsite.get_template_files('fluent_mezzanine/fluent_contents_page.html')
+        self.assertEqual(len(file_paths), len(names))
+        self.assertTrue(file_paths[0].endswith(
+            os.path.join('templates', 'fluent_mezzanine', 'fluent_contents_page.html')
+        ))
+        self.assertEqual(staticsite.get_template_files('missing.html'), [])
+
+    def test_export_page(self):
+        task = rendering.get_page_tasks()[0]
+        file_path = staticsite.get_page_file_path(task)
+        result = staticsite.export_page(staticsite.ExportTask(task, self.output_dir, file_path))
+        self.assertEqual(result.page_id, self.layout_page.pk)
+        self.assertEqual(result.status_code, 200)
+        self.assertIsNone(result.error)
+        with open(self.get_file_path(self.layout_page), 'rb') as page_file:
+            self.assertEqual(page_file.read(), Client().get('/layout-page/').content)
+        self.assertEqual(os.stat(self.get_file_path(self.layout_page)).st_mode & 0o777, 0o644)
+
+        # Test to see if failed pages are not written.
+        result = staticsite.export_page(staticsite.ExportTask(
+            task._replace(url='/missing/'), self.output_dir, 'missing.html'
+        ))
+        self.assertEqual(result.error, 'HTTP status 404')
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'missing.html')))
+
+    def test_export_site(self):
+        summary = staticsite.export_site(self.output_dir)
+        self.assertEqual(
+            [result.status_code for result in summary.results], [200, 200]
+        )
+        self.assertEqual((summary.unchanged, summary.removed), (0, 0))
+        self.assertTrue(os.path.exists(self.get_file_path(self.layout_page)))
+        self.assertTrue(os.path.exists(self.get_file_path(self.page)))
+        self.assertEqual(
+            sorted(staticsite.read_manifest(self.output_dir)), [self.layout_page.pk, self.page.pk]
+        )
+
+        # Test to see if only changed pages are exported again.
+        summary = staticsite.export_site(self.output_dir, incremental=True)
+        self.assertEqual((summary.results, summary.unchanged), ([], 2))
+        cache.expire_tags([cache.get_layout_tag(self.layout.pk)])
+        os.remove(self.get_file_path(self.page))
+        summary = staticsite.export_site(self.output_dir, incremental=True)
+        self.assertEqual(
+            [result.page_id for result in summary.results], [self.layout_page.pk, self.page.pk]
+        )
+        summary = staticsite.export_site(self.output_dir, workers=2, incremental=True)
+        self.assertEqual((summary.results, summary.unchanged), ([], 2))
+
+        # Test to see if a changed page template exports its pages again.
+        file_path = staticsite.find_template_file('fluent_mezzanine/fluent_contents_page.html')
+        stat = os.stat(file_path)
+        self.addCleanup(os.utime, file_path, (stat.st_atime, stat.st_mtime))
+        os.utime(file_path, (stat.st_atime, stat.st_mtime + 10))
+        summary = staticsite.export_site(self.output_dir, incremental=True)
+        self.assertEqual([result.page_id for result in summary.results], [self.page.pk])
+        self.assertEqual(summary.unchanged, 1)
+
+        # Test to see if the files of pages that are no longer published are removed.
+        FluentContentsPage.objects.filter(pk=self.page.pk).update(status=1)
+        summary = staticsite.export_site(self.output_dir, incremental=True)
+        self.assertEqual((summary.unchanged, summary.removed), (1, 1))
+        self.assertFalse(os.path.exists(self.get_file_path(self.page)))
+        self.assertEqual(list(staticsite.read_manifest(self.output_dir)), [self.layout_page.pk])
+
+    def test_read_manifest(self):
+        self.assertEqual(staticsite.read_manifest(self.output_dir), {})
+        staticsite.write_manifest(self.output_dir, {1: {'path': 'index.html'}})
+        self.assertEqual(staticsite.read_manifest(self.output_dir), {1: {'path': 'index.html'}})
+
+
+class Utils(TestCase):
+    def test_get_page_models(self):
+        self.assertEqual(utils.get_page_models(), [FluentContentsPage, FluentContentsLayoutPage])
+
+    def test_get_page_type_ids(self):
+        self.assertEqual(len(utils.get_page_type_ids()), 2)
+
+    def test_batches(self):
+        self.assertEqual(list(utils.batches([1, 2, 3], 2)), [[1, 2], [3]])
+        self.assertEqual(list(utils.batches([])), [])
+
+    def test_get_file_version(self):
+        self.assertIsNone(utils.get_file_version('/missing/file.html'))
+        self.assertEqual(len(utils.get_file_version(__file__)), 2)
+
+    def test_write_file_atomically(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        file_path = os.path.join(path, 'pages', 'index.html')
+        utils.write_file_atomically(file_path, b'<p>Page</p>', mode=0o644)
+        utils.write_file_atomically(file_path, b'<p>Changed</p>', mode=0o644)
+        with open(file_path, 'rb') as page_file:
+            self.assertEqual(page_file.read(), b'<p>Changed</p>')
+        self.assertEqual(os.listdir(os.path.dirname(file_path)), ['index.html'])
+        self.assertEqual(os.stat(file_path).st_mode & 0o777, 0o644)
@@ -1,8 +1,23 @@
 from django.conf.urls import include, url
 from django.contrib import admin
+from django.http import HttpResponse
+from django.views.generic import TemplateView
 
 admin.autodiscover()
 
+
+def cart(request):
+    """
+    A view depending on the session, below the URL of a page.
+    """
+    if 'item' in request.GET:
+        request.session['cart'] = request.GET['item']
+    return HttpResponse('Cart: {0}'.format(request.session.get('cart', '')))
+
+
 urlpatterns = [
     url(r'^admin/', include(admin.site.urls)),
+    url(r'^shop/cart/$', cart, name='cart'),
+    url(r'^$', TemplateView.as_view(template_name='base.html'), name='home'),
+    url(r'^', include('mezzanine.urls')),
 ]
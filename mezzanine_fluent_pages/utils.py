@@ -0,0 +1,99 @@
+import errno
+import os
+import tempfile
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+
+
+# The page models provided by this project as `(app_label, model_name)`.
+PAGE_MODELS = (
+    ('fluent_mezzanine_page', 'FluentContentsPage'),
+    ('mezzanine_layout_page', 'FluentContentsLayoutPage'),
+)
+
+# Number of values in `IN` lookups, below the limit of query parameters of SQLite.
+LOOKUP_BATCH_SIZE = 500
+
+
+def get_page_models():
+    """
+    Return the page models of the page types that are installed.
+
+    :return: List of model classes.
+    """
+    page_models = []
+    for app_label, model_name in PAGE_MODELS:
+        try:
+            page_models.append(apps.get_model(app_label, model_name))
+        except LookupError:
+            pass
+    return page_models
+
+
+def get_page_type_ids():
+    """
+    Return the content type ids of the installed page models.
+
+    :return: Set of content type ids.
+    """
+    content_types = ContentType.objects.get_for_models(*get_page_models())
+    return {content_type.pk for content_type in content_types.values()}
+
+
+def get_file_version(file_path):
+    """
+    Return a version of a file that changes with its content.
+
+    :param file_path: Absolute file path.
+    :return: Tuple of modification time and size, or `None` if the file
+    is missing.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def batches(values, size=LOOKUP_BATCH_SIZE):
+    """
+    Split values into lists that fit in an `IN` lookup.
+
+    :param values: List of values.
+    :param size: Maximum number of values per list.
+    :return: Iterator of lists.
+    """
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def write_file_atomically(file_path, content, mode=None):
+    """
+    Write a file under a temporary name and rename it, so other processes
+    never read a partial file.
+
+    The directory of the file is created when it is missing.
+
+    :param file_path: Absolute file path.
+    :param content: Bytes to write.
+    :param mode: Permissions of the file, the temporary file is only
+    readable by its owner when `None`.
+    :return: None.
+    """
+    directory = os.path.dirname(file_path)
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(content)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.rename(temp_path, file_path)
+    except Exception:
+        os.remove(temp_path)
+        raise
@@ -13,7 +13,8 @@ setuptools.setup(
     install_requires=[
         'Mezzanine',
         'coverage',
-        'django-fluent-contents[text]',
+        # The `prefetch` module overrides a private method of `fluent_contents`.
+        'django-fluent-contents[text]>=1.1,<1.2',
         'django-wysiwyg',
     ],
     extras_require={